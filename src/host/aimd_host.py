@@ -1,85 +1,81 @@
 from typing import List
-from matplotlib import pyplot as plt
 
+from host.congestion_window_host import CongestionWindowHost
 from network.network_interface import NetworkInterface
 from simulation.clock import Clock
+from util.rtt_sampler import PER_RTT
 from util.timeout_calculator import TimeoutCalculator
 from simulation import simulation_logger as log
 from network.packet import Packet
 
 """
 This class implements a host that follows the AIMD protocol.
+
+The window starts at 1 packet and grows by 1 packet per ACK ("slow start") until the first timeout. After that, it
+grows by 1 / window per ACK, i.e. by about 1 packet per RTT, and is halved on every loss event. Timeouts of packets
+sent before the last loss event was detected are part of that event, so the window is halved at most once per window
+of data. The window is fractional, and the host keeps int(window) packets inflight.
+
+Tracking inflight packets, retransmitting them and detecting loss events is done by CongestionWindowHost, which calls
+on_ack() and on_loss_event() below.
 """
 
 
-class AimdHost:
+class AimdHost(CongestionWindowHost):
 
-    def __init__(self, clock: Clock, network_interface: NetworkInterface, timeout_calculator: TimeoutCalculator):
-        # Host configuration
-        self.timeout_calculator: TimeoutCalculator = timeout_calculator
-        self.network_interface: NetworkInterface = network_interface
-        self.clock: Clock = clock
+    def __init__(self, clock: Clock, network_interface: NetworkInterface, timeout_calculator: TimeoutCalculator,
+                 rtt_sample_mode: str = PER_RTT, logger: log.SimulationLogger = None, plot_path: str | None = None):
+        # Host configuration, and the RttSampler that keeps the timeout calculator up to date
+        super().__init__(clock, network_interface, timeout_calculator, rtt_sample_mode=rtt_sample_mode, logger=logger)
+        # Where shutdown_hook() saves the plot of the window sizes, None not to plot them
+        self.plot_path = plot_path
 
         # TODO: Add any stateful information you might need to track the progress of this protocol as packets are
         #  sent and received. Your sliding window should be initialized to a size of 1, and should use the slow start
         #  algorithm until you hit your first timeout
         #    - Feel free to create new variables and classes, just don't delete any existing infrastructure.
         #    - In particular, you should make use of the network interface to interact with the network.
+        self.window_size = 1.0
+        self.slow_start = True
 
     def set_window_size(self, new_window_size: float, old_window_size: float):
-        if new_window_size < old_window_size:
-            log.add_event(type="Shrinking Window", desc=f"Old: {old_window_size}, New: {new_window_size}")
-        if old_window_size < new_window_size:
-            log.add_event(type="Expanding Window", desc=f"Old: {old_window_size}, New: {new_window_size}")
         # TODO: Update the sliding window
+        super().set_window_size(new_window_size, old_window_size)
 
     @staticmethod
-    def plot(window_sizes: List[int]):
-        plt.plot(window_sizes, label="Window Sizes", color="red", linewidth=2, alpha=0.5)
-        plt.ylabel("Window Size")
-        plt.xlabel("Tick")
-        plt.legend()
-        plt.savefig("aimd-window-sizes.png")
-        plt.close()
+    def plot(window_sizes: List[int], path: str = "aimd-window-sizes.png"):
+        # Imported lazily so that CLI runs which never plot don't pay for loading matplotlib. A Figure of its own
+        # (rather than pyplot's current figure) lets simulations running on several threads plot at the same time.
+        from matplotlib.figure import Figure
+
+        figure = Figure()
+        axis = figure.subplots()
+        axis.plot(window_sizes, label="Window Sizes", color="red", linewidth=2, alpha=0.5)
+        axis.set_ylabel("Window Size")
+        axis.set_xlabel("Tick")
+        axis.legend()
+        figure.savefig(path)
 
     def shutdown_hook(self):
         # TODO: Save the window sizes over time so that, when the simulation finishes, we can plot them over time.
         #  Then, pass those values in here
-        self.plot([])
-
-    def run_one_tick(self) -> int | None:
-        current_time = self.clock.read_tick()
+        if self.plot_path is not None:
+            self.plot(self.window_sizes, self.plot_path)
 
+    def on_ack(self, packet: Packet, now: int):
         # TODO: STEP 1 - Process newly received messages
-        #  - These will all be acknowledgement to messages this host has previously sent out.
-        #  - You should mark these messages as successfully delivered.
         #  - You should also increase the size of the window
         #      - You should start in "slow-start" mode to quickly ramp up to the bandwidth capacity.
         #      - Exit "slow-start" mode once your first timeout occurs
-        packets_received = self.network_interface.receive_all()
+        if self.slow_start:
+            self.set_window_size(self.window_size + 1, self.window_size)
+        else:
+            self.set_window_size(self.window_size + 1 / self.window_size, self.window_size)
 
+    def on_loss_event(self, packets: List[Packet], now: int):
         # TODO: STEP 2 - Retry any messages that have timed out
-        #  - When you transmit each packet (in steps 2 and 3), you should track that message as inflight
-        #  - Check to see if there are any inflight messages who's timeout has already passed
-        #  - If you find a timed out message, create a new packet and transmit it
-        #      - The new packet should have the same sequence number
-        #      - You should set the packet's retransmission_flag to true
-        #      - The sent time should be the current timestamp
-        #      - Use the transmit() function of the network interface to send the packet
         #  - Shrink the sliding window
         #      - This should happen at most once per RTT
         #      - The window size should not go below 1
-
-        # TODO: STEP 3 - Transmit new messages
-        #  - When you transmit each packet (in steps 2 and 3), you should track that message as inflight
-        #  - Check to see how many additional packets we can put inflight based on the sliding window spec
-        #  - Construct and transmit the packets
-        #      - Each new packet represents a new message that should have its own unique sequence number
-        #      - Sequence numbers start from 0 and increase by 1 for each new message
-        #      - Use the transmit() function of the network interface to send the packet
-
-        # TODO: STEP 4 - Return
-        #  - Return the largest in-order sequence number
-        #      - That is, the sequence number such that it, and all sequence numbers before, have been ACKed
-
-        return 0
+        self.slow_start = False
+        self.set_window_size(max(self.window_size / 2, 1.0), self.window_size)
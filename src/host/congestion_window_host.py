@@ -0,0 +1,147 @@
+from typing import Dict, List, Set
+
+from host.host import Host
+from network.network_interface import NetworkInterface
+from network.packet import Packet
+from simulation import simulation_logger as log
+from simulation.clock import Clock
+from util.rtt_sampler import PER_RTT, RttSampler
+from util.timeout_calculator import TimeoutCalculator
+
+"""
+Congestion Window Host
+======================
+
+The sliding window machinery shared by hosts whose window changes over time, like AIMD and Vegas.
+
+On each tick, the host:
+1. Processes ACKs, calling on_ack() for the first ACK of each sequence number
+2. Retransmits every inflight packet whose timeout has passed. If any of them were sent after the last loss event was
+   detected, this is a new loss event: the timeout is backed off and on_loss_event() is called. Timeouts of packets
+   sent before that are part of the same event, so the host reacts at most once per window of data.
+3. Transmits new packets until the number of inflight packets reaches the (possibly fractional) window size
+
+Subclasses decide how the window changes by implementing on_ack() and on_loss_event(), and calling set_window_size().
+The window never goes below MIN_WINDOW_SIZE. If the network interface is paced, the host sets the pacing rate to a
+window per RTT.
+"""
+
+
+class CongestionWindowHost(Host):
+    MIN_WINDOW_SIZE = 1.0
+
+    def __init__(self, clock: Clock, network_interface: NetworkInterface, timeout_calculator: TimeoutCalculator,
+                 initial_window_size: float = 1.0, rtt_sample_mode: str = PER_RTT, logger: log.SimulationLogger = None):
+        # Host configuration
+        self.timeout_calculator: TimeoutCalculator = timeout_calculator
+        self.network_interface: NetworkInterface = network_interface
+        self.clock: Clock = clock
+        # Where window changes are logged, defaults to the process-wide logger
+        self.logger = logger or log.default_logger()
+        # Measures RTTs from ACKs to keep the timeout calculator up to date
+        self.rtt_sampler = RttSampler(timeout_calculator, mode=rtt_sample_mode)
+
+        self.window_size = max(initial_window_size, self.MIN_WINDOW_SIZE)
+        # Window size at the end of every tick, for plotting
+        self.window_sizes: List[float] = []
+        # Sequence number of the next new packet
+        self.next_sequence_number = 0
+        # Lowest sequence number that hasn't been ACKed yet
+        self.next_up = 0
+        # Latest transmission of every unACKed sequence number, by sequence number
+        self.inflight: Dict[int, Packet] = {}
+        # ACKed sequence numbers above next_up
+        self.acked_out_of_order: Set[int] = set()
+        # Tick the last loss event was detected on, packets sent before it time out as part of that event
+        self.loss_event_tick: int | None = None
+        # ACKs received on the current tick, and packets to send on it, reused on every tick
+        self.received: List[Packet] = []
+        self.outgoing: List[Packet] = []
+
+    """
+    Called for the first ACK of each sequence number, with the ACKed packet and the tick it arrived on.
+    """
+    def on_ack(self, packet: Packet, now: int): pass
+
+    """
+    Called once per loss event, with the packets that timed out (before they are retransmitted).
+    """
+    def on_loss_event(self, packets: List[Packet], now: int): pass
+
+    def set_window_size(self, new_window_size: float, old_window_size: float):
+        new_window_size = max(new_window_size, self.MIN_WINDOW_SIZE)
+        if new_window_size < old_window_size:
+            self.logger.add_event(type="Shrinking Window", desc=f"Old: {old_window_size}, New: {new_window_size}")
+        if old_window_size < new_window_size:
+            self.logger.add_event(type="Expanding Window", desc=f"Old: {old_window_size}, New: {new_window_size}")
+        self.window_size = new_window_size
+
+    """
+    Transmit the packets in self.outgoing with a single call to the network interface, and track them as inflight.
+    """
+    def __transmit_outgoing(self):
+        outgoing = self.outgoing
+        if not outgoing:
+            return
+        self.network_interface.transmit_many(outgoing)
+        for packet in outgoing:
+            self.rtt_sampler.on_transmit(packet)
+            self.inflight[packet.sequence_number] = packet
+        outgoing.clear()
+
+    def run_one_tick(self) -> int | None:
+        current_time = self.clock.read_tick()
+        timeout = self.rtt_sampler.timeout()
+
+        # STEP 1 - Process newly received ACKs
+        received = self.received
+        received.clear()
+        self.network_interface.receive_into(received)
+        for packet in received:
+            self.rtt_sampler.on_ack(packet, current_time)
+            sequence_number = packet.sequence_number
+            if sequence_number not in self.inflight:
+                # Duplicate ACK of a retransmitted packet
+                continue
+            del self.inflight[sequence_number]
+            self.acked_out_of_order.add(sequence_number)
+            self.on_ack(packet, current_time)
+        while self.next_up in self.acked_out_of_order:
+            self.acked_out_of_order.remove(self.next_up)
+            self.next_up += 1
+
+        # STEP 2 - Retry any packets that have timed out
+        # Packets still waiting in a pacer haven't been sent, so they can't have timed out
+        timed_out = [packet for packet in self.inflight.values()
+                     if not packet.awaiting_release and current_time - packet.sent_timestamp > timeout]
+        if timed_out:
+            new_loss_event = self.loss_event_tick is None or any(
+                packet.sent_timestamp >= self.loss_event_tick for packet in timed_out)
+            if new_loss_event:
+                self.loss_event_tick = current_time
+                self.rtt_sampler.on_timeout()
+                self.on_loss_event(timed_out, current_time)
+            for packet in timed_out:
+                self.outgoing.append(Packet(sent_timestamp=current_time, sequence_number=packet.sequence_number,
+                                            retransmission_flag=True, ack_flag=False))
+            self.__transmit_outgoing()
+
+        # If the network interface paces its packets, spread a window's worth of packets over one RTT
+        mean_rtt = self.timeout_calculator.mean_estimate()
+        if mean_rtt:
+            self.network_interface.set_pacing_rate(self.window_size / mean_rtt)
+
+        # STEP 3 - Transmit new packets while the window has room
+        for _ in range(int(self.window_size) - len(self.inflight)):
+            self.outgoing.append(Packet(sent_timestamp=current_time, sequence_number=self.next_sequence_number,
+                                        retransmission_flag=False, ack_flag=False))
+            self.next_sequence_number += 1
+        self.__transmit_outgoing()
+
+        self.window_sizes.append(self.window_size)
+
+        # STEP 4 - Return the largest in-order ACKed sequence number
+        return self.next_up - 1
+
+    def inflight_count(self) -> int | None:
+        return len(self.inflight)
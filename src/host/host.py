@@ -29,3 +29,9 @@ class Host(metaclass=ABCMeta):
     This is a method the simulator will call on the host after the simulation is complete.
     """
     def shutdown_hook(self): pass
+
+    """
+    The number of packets this host currently has inflight, or None if the host doesn't track it.
+    This is only used for reporting metrics.
+    """
+    def inflight_count(self) -> int | None: return None
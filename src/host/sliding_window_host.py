@@ -4,6 +4,7 @@ from host.host import Host
 from network.network_interface import NetworkInterface
 from network.packet import Packet
 from simulation.clock import Clock
+from util.rtt_sampler import PER_RTT, RttSampler
 from util.timeout_calculator import TimeoutCalculator
 
 """
@@ -15,11 +16,13 @@ list of unACKed packets.
 class SlidingWindowHost(Host, ABC):
 
     def __init__(self, clock: Clock, network_interface: NetworkInterface, window_size: int,
-                 timeout_calculator: TimeoutCalculator):
+                 timeout_calculator: TimeoutCalculator, rtt_sample_mode: str = PER_RTT):
         # Host configuration
         self.timeout_calculator: TimeoutCalculator = timeout_calculator
         self.network_interface: NetworkInterface = network_interface
         self.clock: Clock = clock
+        # Measures RTTs from ACKs to keep the timeout calculator up to date
+        self.rtt_sampler = RttSampler(timeout_calculator, mode=rtt_sample_mode)
         
 
         # TODO: Add any stateful information you might need to track the progress of this protocol as packets are
@@ -37,7 +40,7 @@ class SlidingWindowHost(Host, ABC):
 
     def run_one_tick(self) -> int | None:
         current_time = self.clock.read_tick()
-        self.timeout = self.timeout_calculator.timeout()
+        self.timeout = self.rtt_sampler.timeout()
 
         # TODO: STEP 1 - Process newly received messages
         #  - These will all be acknowledgement to messages this host has previously sent out.
@@ -51,6 +54,7 @@ class SlidingWindowHost(Host, ABC):
 
         packets_received = self.network_interface.receive_all()
         for packet in packets_received:
+            self.rtt_sampler.on_ack(packet, current_time)
             if packet.sequence_number == self.next_up:
                 self.acked.append(packet)
                 if packet in self.inflight:
@@ -72,12 +76,22 @@ class SlidingWindowHost(Host, ABC):
         #      - The sent time should be the current timestamp
         #      - Use the transmit() function of the network interface to send the packet
 
+        # Packets are collected and handed to the network interface in one transmit_many() call per step
+        retransmissions = []
         for packet in self.inflight:
-            if (current_time - packet.sent_timestamp) > self.timeout:
+            # Packets still waiting in a pacer haven't been sent, so they can't have timed out
+            if not packet.awaiting_release and (current_time - packet.sent_timestamp) > self.timeout:
                 retransmission_packet = Packet(sent_timestamp=current_time, sequence_number=packet.sequence_number, retransmission_flag=True, ack_flag=False)
-                self.network_interface.transmit(retransmission_packet)
+                self.rtt_sampler.on_transmit(retransmission_packet)
                 self.inflight.remove(packet)
                 self.inflight.append(retransmission_packet)
+                retransmissions.append(retransmission_packet)
+        self.network_interface.transmit_many(retransmissions)
+        timed_out = bool(retransmissions)
+
+        # Back off the timeout once per tick in which packets timed out
+        if timed_out:
+            self.rtt_sampler.on_timeout()
 
 
 
@@ -91,13 +105,21 @@ class SlidingWindowHost(Host, ABC):
         #      - Sequence numbers start from 0 and increase by 1 for each new message
         #      - Use the transmit() function of the network interface to send the packet
 
+        # If the network interface paces its packets, spread a window's worth of packets over one RTT
+        mean_rtt = self.timeout_calculator.mean_estimate()
+        if mean_rtt:
+            self.network_interface.set_pacing_rate(self.window_size / mean_rtt)
+
         window_space = self.window_size - len(self.inflight)
         available_sequence_number = len(self.inflight) + self.next_up
+        new_packets = []
         for i in range (window_space):
             new_packet = Packet(sent_timestamp=current_time, sequence_number = available_sequence_number, retransmission_flag=False, ack_flag=False)
-            self.network_interface.transmit(new_packet)
+            self.rtt_sampler.on_transmit(new_packet)
             self.inflight.append(new_packet)
+            new_packets.append(new_packet)
             available_sequence_number += 1
+        self.network_interface.transmit_many(new_packets)
 
         # TODO: STEP 4 - Return
         #  - Return the largest in-order sequence number
@@ -106,3 +128,6 @@ class SlidingWindowHost(Host, ABC):
 
 
         return (self.next_up - 1)
+
+    def inflight_count(self) -> int | None:
+        return len(self.inflight)
@@ -4,6 +4,7 @@ from host.host import Host
 from network.network_interface import NetworkInterface
 from network.packet import Packet
 from simulation.clock import Clock
+from util.rtt_sampler import PER_RTT, RttSampler
 from util.timeout_calculator import TimeoutCalculator
 
 """
@@ -14,11 +15,14 @@ sends one packet in return of an acknowledgement.
 
 class StopAndWaitHost(Host, ABC):
 
-    def __init__(self, clock: Clock, network_interface: NetworkInterface, timeout_calculator: TimeoutCalculator):
+    def __init__(self, clock: Clock, network_interface: NetworkInterface, timeout_calculator: TimeoutCalculator,
+                 rtt_sample_mode: str = PER_RTT):
         # Host configuration
         self.timeout_calculator: TimeoutCalculator = timeout_calculator
         self.network_interface: NetworkInterface = network_interface
         self.clock: Clock = clock
+        # Measures RTTs from ACKs to keep the timeout calculator up to date
+        self.rtt_sampler = RttSampler(timeout_calculator, mode=rtt_sample_mode)
 
         # TODO: Add any stateful information you might need to track the progress of this protocol as packets are
         #  sent and received.
@@ -37,7 +41,7 @@ class StopAndWaitHost(Host, ABC):
 
         current_time = self.clock.read_tick()
         
-        self.timeout = self.timeout_calculator.timeout()
+        self.timeout = self.rtt_sampler.timeout()
 
         # TODO: STEP 1 - Process newly received messages
         #  - These will all be acknowledgement to messages this host has previously sent out.
@@ -47,6 +51,7 @@ class StopAndWaitHost(Host, ABC):
         # we also need to clear the inflight list
         packets_received = self.network_interface.receive_all()
         if packets_received and packets_received[0].sequence_number == self.next_up:
+            self.rtt_sampler.on_ack(packets_received[0], current_time)
             self.acked.append (packets_received[0])
             self.inflight.clear()
             self.next_up += 1
@@ -64,10 +69,14 @@ class StopAndWaitHost(Host, ABC):
         # if the timeout is exceeded, we make a packet with retransmission flag True and the same sequence number to simulate retransmission
         # also need to clear inflight array of the old packet and add new one to inflight
         
-        if self.inflight and (current_time - self.inflight[0].sent_timestamp) > self.timeout:
+        # a packet still waiting in a pacer hasn't been sent, so it can't have timed out
+        oldest = self.inflight[0] if self.inflight else None
+        if oldest is not None and not oldest.awaiting_release and (current_time - oldest.sent_timestamp) > self.timeout:
             self.inflight.clear()
             retransmission_packet = Packet(sent_timestamp=current_time, sequence_number=self.next_up, retransmission_flag=True, ack_flag=False)
             self.network_interface.transmit(retransmission_packet)
+            self.rtt_sampler.on_timeout()
+            self.rtt_sampler.on_transmit(retransmission_packet)
             self.inflight.append(retransmission_packet)
 
             
@@ -85,6 +94,7 @@ class StopAndWaitHost(Host, ABC):
         if not self.inflight:
             new_packet = Packet(sent_timestamp=current_time, sequence_number=self.next_up, retransmission_flag=False, ack_flag=False)
             self.network_interface.transmit(new_packet)
+            self.rtt_sampler.on_transmit(new_packet)
             self.inflight.append(new_packet)
 
         # TODO: STEP 4 - Return
@@ -94,3 +104,6 @@ class StopAndWaitHost(Host, ABC):
         # The last time we succesfully receive, next_up is moved to the next one being waited for, so next_up-1 is the last ack
         
         return (self.next_up - 1)
+
+    def inflight_count(self) -> int | None:
+        return len(self.inflight)
@@ -0,0 +1,92 @@
+from typing import List
+
+from host.congestion_window_host import CongestionWindowHost
+from network.network_interface import NetworkInterface
+from network.packet import Packet
+from simulation import simulation_logger as log
+from simulation.clock import Clock
+from util.rtt_sampler import PER_RTT
+from util.timeout_calculator import TimeoutCalculator
+
+"""
+This class implements a host that follows a delay-based protocol in the style of TCP Vegas.
+
+Rather than waiting for losses, the host compares the RTTs it measures against the smallest RTT it has seen, which is
+the RTT of the path with empty queues (rtt_min). Once per RTT, it estimates how many of its packets are sitting in
+queues:
+
+    queued = window * (1 - base RTT / smallest RTT of the last round)
+
+which is the difference between the throughput it would get without queueing (window / base RTT) and the throughput
+it actually got (window / RTT), in packets. It then:
+ - grows the window by 1 packet if fewer than `alpha` packets are queued, since the bottleneck may have spare capacity
+ - shrinks the window by 1 packet if more than `beta` packets are queued, since the queue is building up
+ - leaves the window alone otherwise
+
+So the bottleneck stays busy while only a few packets are kept in its queue.
+
+Like AIMD, the host starts in slow start, growing by 1 packet per ACK, but it leaves slow start as soon as more than
+`gamma` packets are queued, dropping the window back to the number of packets the path holds without queueing.
+Loss events still halve the window, at most once per window of data: timeouts of packets sent before the last loss
+event was detected are part of that event (see CongestionWindowHost). The window is fractional, never goes below
+MIN_WINDOW_SIZE, and the host keeps int(window) packets inflight.
+"""
+
+
+class VegasHost(CongestionWindowHost):
+
+    def __init__(self, clock: Clock, network_interface: NetworkInterface, timeout_calculator: TimeoutCalculator,
+                 alpha: float = 2, beta: float = 4, gamma: float = 1, rtt_sample_mode: str = PER_RTT,
+                 logger: log.SimulationLogger = None):
+        assert 0 <= alpha <= beta, "Vegas needs 0 <= alpha <= beta"
+        super().__init__(clock, network_interface, timeout_calculator, rtt_sample_mode=rtt_sample_mode, logger=logger)
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.slow_start = True
+
+        # Smallest RTT measured so far, our estimate of the RTT without any queueing
+        self.base_rtt = None
+        # Smallest RTT measured in the current round
+        self.round_min_rtt = None
+        # The current round ends once a packet with this sequence number or higher is ACKed, i.e. after one RTT
+        self.round_end_sequence_number = 0
+
+    """
+    Estimated number of this host's packets waiting in queues, from the RTTs of the last round
+    """
+    def queued_packets(self) -> float | None:
+        if self.base_rtt is None or self.round_min_rtt is None:
+            return None
+        return self.window_size * (1 - self.base_rtt / self.round_min_rtt)
+
+    def on_ack(self, packet: Packet, now: int):
+        # ACKs are the packets we sent, so the RTT is exact even for retransmissions
+        rtt = now - packet.sent_timestamp
+        self.base_rtt = rtt if self.base_rtt is None else min(self.base_rtt, rtt)
+        self.round_min_rtt = rtt if self.round_min_rtt is None else min(self.round_min_rtt, rtt)
+
+        if self.slow_start:
+            self.set_window_size(self.window_size + 1, self.window_size)
+
+        if packet.sequence_number < self.round_end_sequence_number:
+            return
+
+        # A full RTT has passed since the round started, adjust the window once
+        queued = self.queued_packets()
+        self.round_end_sequence_number = self.next_sequence_number
+        self.round_min_rtt = None
+
+        if self.slow_start:
+            if queued > self.gamma:
+                # Leave slow start with a window the path can carry without queueing
+                self.slow_start = False
+                self.set_window_size(self.window_size - queued, self.window_size)
+        elif queued < self.alpha:
+            self.set_window_size(self.window_size + 1, self.window_size)
+        elif queued > self.beta:
+            self.set_window_size(self.window_size - 1, self.window_size)
+
+    def on_loss_event(self, packets: List[Packet], now: int):
+        self.slow_start = False
+        self.set_window_size(self.window_size / 2, self.window_size)
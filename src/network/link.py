@@ -1,28 +1,54 @@
 # Required for dropping packets at random
-import queue
 import random
-from typing import List
+from typing import Callable, List
 
 from network.packet import Packet
+from network.packet_ring import PacketRing
+from network.queue_discipline import DropTail, QueueDiscipline
 from simulation import simulation_logger as log
+from simulation.clock import Clock
+from util.latency_histogram import LatencyHistogram
 
 """
-A class to represent a link with a finite capacity of 1 packet per tick
-We can generalize this to other capacities, but we're keeping the assignment simple
+A class to represent a link with a finite capacity, 1 packet per tick by default
+The assignment only uses the default, links with a higher capacity are used by multi-hop paths (see simulation/path.py)
+
+The link's queue is managed by a queue discipline (see queue_discipline.py), which defaults to drop-tail.
 """
 
 
 class Link:
 
-    def __init__(self, loss_ratio, queue_limit, verbose=True):
-        # queue of packets at the link
-        self.link_queue = queue.Queue()
+    def __init__(self, loss_ratio, queue_limit, verbose=True, clock: Clock = None,
+                 queue_discipline: QueueDiscipline = None, loss_fn: Callable[[Packet], bool] = None,
+                 capacity: int = 1, rng: random.Random = None, logger: log.SimulationLogger = None,
+                 queue_time_histogram: LatencyHistogram | None = None):
         # probability of dropping packets when link dequeues them
         self.loss_ratio = loss_ratio
+        # optional function deciding whether each dequeued packet is lost, overrides loss_ratio
+        self.loss_fn = loss_fn
         # Max size of queue in packets
         self.queue_limit = queue_limit
+        # queue of packets at the link
+        # (an empty discipline is falsy, since it has a length)
+        self.link_queue = queue_discipline if queue_discipline is not None else DropTail(queue_limit)
         # Whether to print statements
         self.verbose = verbose
+        # Time source for queue disciplines that look at how long packets have been queued
+        self.clock = clock
+        # Max. number of packets the link sends per tick
+        self.capacity = capacity
+        # Largest number of packets the queue has held
+        self.peak_queue_depth = 0
+        # source of randomness for the losses, defaults to the global random module
+        self.rng = rng or random
+        # where lost packets are logged, defaults to the process-wide logger
+        self.logger = logger or log.default_logger()
+        # optional histogram of the number of ticks packets spend in the queue (see util/latency_histogram.py)
+        self.queue_time_histogram = queue_time_histogram
+
+    def __now(self) -> int:
+        return self.clock.read_tick() if self.clock is not None else 0
 
     """
     Function to receive packets from a device connected at either
@@ -30,16 +56,30 @@ class Link:
     network device.
 
     The device connected to the link needs to call the enqueue function to put
-    packet on to the link. If link's queue is full, it starts dropping packets
-    and does not receive any more packets.
+    packet on to the link. The queue discipline decides which packets are dropped,
+    with drop-tail the link stops receiving packets once its queue is full.
     """
 
     def enqueue(self, packets: List[Packet]):
+        now = self.__now()
         for packet in packets:
-            if self.link_queue.qsize() < self.queue_limit:
-                self.link_queue.put(packet)  # append to the queue
-            else:
-                log.add_event(type="Buffer capacity exceeded", desc=f"Dropping packet, Sequence number: {packet.sequence_number}")
+            if self.queue_time_histogram is not None:
+                packet.link_enqueue_tick = now
+            self.link_queue.enqueue(packet, now)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self.link_queue))
+
+    """
+    Same as enqueue(), but consumes the packets from a ring, leaving it empty.
+    """
+
+    def enqueue_from(self, ring: PacketRing):
+        now = self.__now()
+        while ring:
+            packet = ring.popleft()
+            if self.queue_time_histogram is not None:
+                packet.link_enqueue_tick = now
+            self.link_queue.enqueue(packet, now)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self.link_queue))
 
     """
     This function dequeues the packets that should leave the link during this tick and returns them.
@@ -47,15 +87,42 @@ class Link:
 
     def dequeue(self) -> List[Packet]:
         packets_to_dequeue = []
+        self.drain_into(packets_to_dequeue)
+        return packets_to_dequeue
 
+    """
+    Same as dequeue(), but appends the packets leaving the link to `sink` (a list or PacketRing) instead of
+    allocating a new list.
+    """
+
+    def drain_into(self, sink):
         # Execute on every tick
-        # Dequeue from link queue if queue is not empty
-        if self.link_queue.qsize() != 0:
-            head = self.link_queue.get()
-            if random.uniform(0.0, 1) < (1 - self.loss_ratio):
+        # Dequeue up to `capacity` packets from link queue, stopping early if the queue is empty
+        now = self.__now()
+        for _ in range(self.capacity):
+            head = self.link_queue.dequeue(now)
+            if head is None:
+                break
+            if self.queue_time_histogram is not None:
+                self.queue_time_histogram.record(now - head.link_enqueue_tick)
+            lost = self.loss_fn(head) if self.loss_fn is not None else self.random_loss(head)
+            if not lost:
                 # dequeue and send to prop delay box
-                packets_to_dequeue.append(head)
+                sink.append(head)
             else:
-                log.add_event(type="Randomly dropping data in network", desc=f"Sequence number: {head.sequence_number}")
+                self.logger.add_event(type="Randomly dropping data in network",
+                                      desc=f"Sequence number: {head.sequence_number}")
 
-        return packets_to_dequeue
+    """
+    The loss decision used when there is no loss_fn: each packet is lost independently with probability loss_ratio.
+    """
+
+    def random_loss(self, packet: Packet) -> bool:
+        return not self.rng.uniform(0.0, 1) < (1 - self.loss_ratio)
+
+    """
+    Number of packets currently waiting in the link's queue
+    """
+
+    def queue_depth(self) -> int:
+        return len(self.link_queue)
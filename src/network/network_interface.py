@@ -1,8 +1,11 @@
-from typing import List
+from typing import Dict, List
 
+from .pacer import TokenBucketPacer
 from .packet import Packet
+from .packet_ring import PacketRing
 from simulation.clock import Clock
 import simulation.simulation_logger as log
+from util.latency_histogram import PacketLatencyStats
 
 """
 Network Interface
@@ -13,16 +16,38 @@ The host can send messages by calling transmit.
 The packet will then be added to the network interface's buffer, who will then flush that buffer to the simulation.
 Similarly, the simulation will send messages destined for your host to this buffer.
 The host can then call receive to get all messages destined for it that are currently buffered.
+
+Both buffers are preallocated PacketRings, so moving packets through the interface doesn't allocate on every tick.
+
+If the interface has a pacer (see pacer.py), transmitted packets go through it on their way out, so they are released
+to the network at the pacing rate instead of all at once. Hosts can set the pacing rate with set_pacing_rate().
+
+If the interface has latency stats (see util/latency_histogram.py), it records the send to ACK latency of every ACK it
+receives, and how many times each sequence number was retransmitted before it was first ACKed.
 """
 
 
 class NetworkInterface:
 
-    def __init__(self, clock: Clock):
+    def __init__(self, clock: Clock, pacer: TokenBucketPacer | None = None, logger: log.SimulationLogger | None = None,
+                 latency_stats: PacketLatencyStats | None = None):
         self.clock = clock
+        # Where transmitted and received packets are logged, defaults to the process-wide logger
+        self.logger = logger or log.default_logger()
+        # Optional pacer that packets go through before they are sent out to the network
+        self.pacer = pacer
         self.next_sequence_number = 0
-        self.transmission_buffer: List[Packet] = []
-        self.receive_buffer: List[Packet] = []
+        self.transmission_buffer = PacketRing()
+        self.receive_buffer = PacketRing()
+        # Packets the pacer released, on their way to pull_packets_from_network_interface()'s list
+        self.released = PacketRing()
+        # Running totals of packets handed to transmit(), used for metrics
+        self.transmitted_count = 0
+        self.retransmitted_count = 0
+        # Optional histograms of ACK latencies and retransmissions
+        self.latency_stats = latency_stats
+        # Number of times each sequence number that hasn't been ACKed yet was sent, only tracked with latency stats
+        self.transmissions: Dict[int, int] = {}
 
     """
     Place a packet on the egress buffer.
@@ -30,30 +55,96 @@ class NetworkInterface:
     """
     def transmit(self, packet: Packet):
         if not packet.retransmission_flag:
-            log.add_event(type="Transmit", desc=f"Sequence number: {packet.sequence_number}")
+            self.logger.add_event(type="Transmit", desc=f"Sequence number: {packet.sequence_number}")
+            self.transmitted_count += 1
         else:
-            log.add_event(type="Retransmit", desc=f"Sequence number: {packet.sequence_number}")
+            self.logger.add_event(type="Retransmit", desc=f"Sequence number: {packet.sequence_number}")
+            self.retransmitted_count += 1
+        if self.latency_stats is not None:
+            self.__count_transmission(packet)
         self.transmission_buffer.append(packet)
 
+    """
+    Place several packets on the egress buffer, in order, with a single batched log call.
+    """
+    def transmit_many(self, packets: List[Packet]):
+        for packet in packets:
+            if packet.retransmission_flag:
+                self.retransmitted_count += 1
+            else:
+                self.transmitted_count += 1
+            if self.latency_stats is not None:
+                self.__count_transmission(packet)
+            self.transmission_buffer.append(packet)
+        self.logger.add_packet_events(packets, type="Transmit", retransmit_type="Retransmit")
+
+    def __count_transmission(self, packet: Packet):
+        sequence_number = packet.sequence_number
+        if not packet.retransmission_flag:
+            self.transmissions[sequence_number] = 1
+        elif sequence_number in self.transmissions:
+            self.transmissions[sequence_number] += 1
+        # Otherwise this retransmits a packet that was already ACKed, which was counted when its first ACK came in
+
+    """
+    Ask the pacer to release packets at `rate` packets per tick, e.g. the host's window divided by its RTT estimate.
+    This does nothing if the interface isn't paced, or if its pacer has a fixed rate.
+    """
+    def set_pacing_rate(self, rate: float):
+        if self.pacer is not None:
+            self.pacer.set_host_rate(rate)
+
     """
     Retrieve all packets currently on the ingress buffer
     """
     def receive_all(self) -> List[Packet]:
-        packets = self.receive_buffer
-        self.receive_buffer = []
-        for packet in packets:
-            log.add_event(type="Receive", desc=f"Sequence number: {packet.sequence_number}")
+        packets = []
+        self.receive_into(packets)
         return packets
 
+    """
+    Allocation-free version of receive_all(), appending the packets on the ingress buffer to `packets`, so hosts can
+    reuse one list on every tick.
+    """
+    def receive_into(self, packets: List[Packet]):
+        start = len(packets)
+        self.receive_buffer.drain_into_list(packets)
+        received = packets[start:] if start else packets
+        self.logger.add_packet_events(received, type="Receive")
+        if self.latency_stats is not None:
+            self.__record_acks(received)
+
+    def __record_acks(self, packets: List[Packet]):
+        now = self.clock.read_tick()
+        ack_latency = self.latency_stats.ack_latency
+        for packet in packets:
+            ack_latency.record(now - packet.sent_timestamp)
+            transmissions = self.transmissions.pop(packet.sequence_number, None)
+            if transmissions is not None:
+                self.latency_stats.retransmissions.record(transmissions - 1)
+
     """
     This function should only be used by the simulation to pull packets from the egress buffer to send them out to the network.
     You shouldn't need to call this directly. It's an implementation detail of this simulator.
     """
     def pull_packets_from_network_interface(self) -> List[Packet]:
-        packets = self.transmission_buffer
-        self.transmission_buffer = []
+        packets = []
+        if self.pacer is not None:
+            self.drain_into(self.released)
+            self.released.drain_into_list(packets)
+        else:
+            self.transmission_buffer.drain_into_list(packets)
         return packets
 
+    """
+    Allocation-free version of pull_packets_from_network_interface(), moving the egress buffer into `ring`.
+    """
+    def drain_into(self, ring: PacketRing):
+        if self.pacer is not None:
+            self.pacer.release_into(self.transmission_buffer, ring, self.clock.read_tick())
+        else:
+            self.transmission_buffer.drain_into(ring)
+
     """
     This function should only be used by the simulation to push packets to the ingress buffer from the network.
     You shouldn't need to call this directly. It's an implementation detail of this simulator.
@@ -0,0 +1,79 @@
+from network.packet_ring import PacketRing
+
+"""
+Token Bucket Pacer
+==================
+
+Hosts like the sliding window host hand a whole window of packets to the network interface in a single tick. On their
+own, these bursts fill the link queue and inflate the RTT of every packet behind them.
+
+A pacer sits between the network interface's egress buffer and the link, and spreads packets out over time instead.
+It holds a bucket of tokens that fills up at `rate` tokens per tick, up to `burst` tokens. Releasing a packet costs one
+token, and packets that can't be released yet wait in the pacer's release queue, in order.
+
+The rate is either fixed, or computed by the host (typically its window divided by its RTT estimate), in which case
+the pacer releases INITIAL_RATE packets per tick until the host has an estimate.
+
+A packet is only sent when the pacer releases it. While it waits, its awaiting_release flag is set, and hosts don't
+time it out. On release, the pacer clears the flag and sets its sent_timestamp to the tick it is released on. Hosts
+keep the packet objects they transmit, so their RTT samples and timeouts are measured from the release, and don't
+include the time spent waiting in the pacer.
+"""
+
+
+class TokenBucketPacer:
+    # Packets per tick released before the host has computed a rate, the capacity of a default link
+    INITIAL_RATE = 1.0
+
+    def __init__(self, rate: float | None = None, burst: float = 1.0):
+        assert rate is None or rate > 0, "The pacing rate must be positive"
+        assert burst >= 1, "The bucket must hold at least one token, or no packet could ever be released"
+        # The configured rate in packets per tick, or None if the host computes it
+        self.fixed_rate = rate
+        # The rate packets are currently released at, in packets per tick
+        self.rate = rate if rate is not None else self.INITIAL_RATE
+        # Max. number of tokens the bucket holds, i.e. the largest burst released after an idle period
+        self.burst = burst
+        self.tokens = burst
+        # Tick the bucket was last refilled on
+        self.last_refill_tick = None
+        # Packets waiting for a token, in the order they were transmitted
+        self.release_queue = PacketRing()
+        # Largest number of packets the release queue has held
+        self.peak_queue_depth = 0
+
+    """
+    Set the rate computed by the host. This is ignored if the pacer was configured with a fixed rate.
+    """
+    def set_host_rate(self, rate: float):
+        if self.fixed_rate is None and rate > 0:
+            self.rate = rate
+
+    def __refill(self, now: int):
+        if self.last_refill_tick is not None:
+            self.tokens = min(self.burst, self.tokens + self.rate * (now - self.last_refill_tick))
+        self.last_refill_tick = now
+
+    """
+    Move the packets in `pending` (leaving it empty) to the back of the release queue, then move as many packets as
+    there are tokens for from the front of the release queue to `ring`.
+    """
+    def release_into(self, pending: PacketRing, ring: PacketRing, now: int):
+        while pending:
+            packet = pending.popleft()
+            packet.awaiting_release = True
+            self.release_queue.append(packet)
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self.release_queue))
+        self.__refill(now)
+        while self.release_queue and self.tokens >= 1:
+            packet = self.release_queue.popleft()
+            packet.awaiting_release = False
+            packet.sent_timestamp = now
+            ring.append(packet)
+            self.tokens -= 1
+
+    """
+    Number of packets waiting to be released
+    """
+    def __len__(self) -> int:
+        return len(self.release_queue)
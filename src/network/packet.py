@@ -20,3 +20,13 @@ class Packet:
     but all messages received by the host will be ACKs.
     """
     ack_flag: bool = False
+    """
+    The flow this packet belongs to, used by per-flow queue disciplines like DRR to share a link fairly.
+    All packets from a host share a flow.
+    """
+    flow_id: int = 0
+    """
+    Set while the packet waits in a pacer's release queue (see pacer.py). It hasn't been sent yet, so hosts don't start
+    its retransmission timer until the pacer releases it and sets its sent_timestamp.
+    """
+    awaiting_release: bool = False
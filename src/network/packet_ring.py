@@ -0,0 +1,84 @@
+from typing import Iterable, Iterator
+
+from network.packet import Packet
+
+"""
+Packet Ring
+===========
+
+A FIFO ring buffer of packets, backed by a preallocated list of slots.
+
+The simulator uses these to hand packets from one stage to the next on every tick. Unlike swapping in a fresh list
+per tick, moving packets through a ring doesn't allocate anything once the ring has grown to the largest batch it
+has seen, so long simulations don't churn the allocator or trigger the garbage collector.
+The capacity is always a power of two, and doubles whenever the ring is full.
+"""
+
+
+class PacketRing:
+
+    def __init__(self, capacity: int = 64):
+        capacity = max(1, capacity)
+        # round up to a power of two, so indices can be wrapped with a mask
+        capacity = 1 << (capacity - 1).bit_length()
+        self.slots: list = [None] * capacity
+        self.mask = capacity - 1
+        # index of the oldest packet, and number of packets in the ring
+        self.head = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __grow(self):
+        old_slots = self.slots
+        old_capacity = len(old_slots)
+        # unroll the ring so the oldest packet is at index 0
+        self.slots = [old_slots[(self.head + i) & self.mask] for i in range(old_capacity)] + [None] * old_capacity
+        self.mask = 2 * old_capacity - 1
+        self.head = 0
+
+    def append(self, packet: Packet):
+        if self.size > self.mask:
+            self.__grow()
+        self.slots[(self.head + self.size) & self.mask] = packet
+        self.size += 1
+
+    def extend(self, packets: Iterable[Packet]):
+        for packet in packets:
+            self.append(packet)
+
+    """
+    Iterate over the packets in the ring, oldest first, without removing them.
+    """
+    def __iter__(self) -> Iterator[Packet]:
+        slots, mask = self.slots, self.mask
+        for i in range(self.size):
+            yield slots[(self.head + i) & mask]
+
+    def popleft(self) -> Packet:
+        assert self.size, "pop from an empty PacketRing"
+        packet = self.slots[self.head]
+        # drop the reference so the packet can be freed
+        self.slots[self.head] = None
+        self.head = (self.head + 1) & self.mask
+        self.size -= 1
+        return packet
+
+    """
+    Move every packet in this ring to the end of `other`, leaving this ring empty.
+    """
+    def drain_into(self, other: "PacketRing"):
+        while self.size:
+            other.append(self.popleft())
+
+    """
+    Move every packet in this ring to the end of a list, leaving this ring empty.
+    """
+    def drain_into_list(self, packets: list):
+        while self.size:
+            packets.append(self.popleft())
+
+    def clear(self):
+        while self.size:
+            self.popleft()
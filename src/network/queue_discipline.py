@@ -0,0 +1,353 @@
+import math
+import random
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from typing import Dict, Set
+
+from network.packet import Packet
+from simulation import simulation_logger as log
+
+"""
+Queue Disciplines
+=================
+
+A queue discipline decides which packets the Link's queue accepts, and which packet leaves it next.
+All disciplines keep their packets in deques, so enqueue and dequeue are constant time.
+
+ - DropTail: accept packets until the queue limit is reached, then drop new arrivals. This is what Link always did.
+ - RED (Random Early Detection): drop arriving packets with a probability that grows with the average queue length,
+   so senders see losses before the queue is full.
+ - CoDel (Controlled Delay): drop packets at the head of the queue when they have been queued for longer than a target
+   delay for a whole interval, with drops getting closer together until the delay comes back down.
+ - DRR (Deficit Round Robin): fair queuing between flows (see Packet.flow_id). Each flow has its own queue, and the
+   flows with packets queued take turns sending up to `quantum` packets, so one aggressive sender can't monopolize
+   the link. When the queue is full, the flow with the most packets queued loses its oldest one (or the new packet, if
+   it is that flow).
+
+Disciplines log the packets they drop to their logger (the process-wide one by default), just like the Link logs the
+packets it loses.
+"""
+
+QUEUE_DISCIPLINES = ["drop-tail", "red", "codel", "drr"]
+
+
+class QueueDiscipline(metaclass=ABCMeta):
+
+    """
+    Offer a packet to the queue at tick `now`. Returns False if the packet was dropped.
+    """
+    @abstractmethod
+    def enqueue(self, packet: Packet, now: int) -> bool: raise NotImplementedError
+
+    """
+    Remove and return the next packet to send at tick `now`, or None if there is nothing to send.
+    """
+    @abstractmethod
+    def dequeue(self, now: int) -> Packet | None: raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int: raise NotImplementedError
+
+
+class DropTail(QueueDiscipline):
+
+    def __init__(self, queue_limit: int, logger: log.SimulationLogger = None):
+        self.queue = deque()
+        self.queue_limit = queue_limit
+        self.logger = logger or log.default_logger()
+
+    def enqueue(self, packet: Packet, now: int) -> bool:
+        if len(self.queue) < self.queue_limit:
+            self.queue.append(packet)
+            return True
+        self.logger.add_event(type="Buffer capacity exceeded",
+                              desc=f"Dropping packet, Sequence number: {packet.sequence_number}")
+        return False
+
+    def dequeue(self, now: int) -> Packet | None:
+        if self.queue:
+            return self.queue.popleft()
+        return None
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+
+class RED(QueueDiscipline):
+
+    def __init__(
+            self,
+            queue_limit: int,
+            min_threshold: float = 5,
+            max_threshold: float = 15,
+            max_drop_probability: float = 0.1,
+            weight: float = 0.002,
+            rng: random.Random = None,
+            logger: log.SimulationLogger = None,
+    ):
+        self.queue = deque()
+        self.queue_limit = queue_limit
+        self.logger = logger or log.default_logger()
+        # Below min_threshold nothing is dropped early, above max_threshold everything is
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.max_drop_probability = max_drop_probability
+        # EWMA weight for the average queue length
+        self.weight = weight
+        self.rng = rng or random
+
+        self.average_queue_length = 0.0
+        # Packets accepted since the last early drop, used to spread drops out evenly
+        self.count = 0
+
+    def __drop(self, packet: Packet, reason: str) -> bool:
+        self.logger.add_event(type=reason, desc=f"Dropping packet, Sequence number: {packet.sequence_number}")
+        self.count = 0
+        return False
+
+    def enqueue(self, packet: Packet, now: int) -> bool:
+        self.average_queue_length = (1 - self.weight) * self.average_queue_length + self.weight * len(self.queue)
+
+        if len(self.queue) >= self.queue_limit:
+            return self.__drop(packet, "Buffer capacity exceeded")
+
+        if self.average_queue_length >= self.max_threshold:
+            return self.__drop(packet, "RED forced drop")
+
+        if self.average_queue_length >= self.min_threshold:
+            self.count += 1
+            base_probability = self.max_drop_probability * (self.average_queue_length - self.min_threshold) \
+                / (self.max_threshold - self.min_threshold)
+            # Grow the drop probability with the number of packets since the last drop
+            if self.count * base_probability >= 1:
+                drop_probability = 1.0
+            else:
+                drop_probability = base_probability / (1 - self.count * base_probability)
+            if self.rng.random() < drop_probability:
+                return self.__drop(packet, "RED early drop")
+        else:
+            self.count = 0
+
+        self.queue.append(packet)
+        return True
+
+    def dequeue(self, now: int) -> Packet | None:
+        if self.queue:
+            return self.queue.popleft()
+        return None
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+
+class CoDel(QueueDiscipline):
+
+    def __init__(self, queue_limit: int, target: int = 5, interval: int = 100, logger: log.SimulationLogger = None):
+        # queue of (enqueue tick, packet)
+        self.queue = deque()
+        self.queue_limit = queue_limit
+        self.logger = logger or log.default_logger()
+        # Acceptable standing queue delay, in ticks
+        self.target = target
+        # Time the delay must stay above target before we start dropping, in ticks
+        self.interval = interval
+
+        # Tick at which the sojourn time will have been above target for a whole interval, or None if it is below
+        self.first_above_time = None
+        self.dropping = False
+        self.drop_next = 0
+        # Number of drops in the current dropping state
+        self.count = 0
+        self.last_count = 0
+
+    def enqueue(self, packet: Packet, now: int) -> bool:
+        if len(self.queue) >= self.queue_limit:
+            self.logger.add_event(type="Buffer capacity exceeded",
+                                  desc=f"Dropping packet, Sequence number: {packet.sequence_number}")
+            return False
+        self.queue.append((now, packet))
+        return True
+
+    def __control_law(self, t: float) -> float:
+        return t + self.interval / math.sqrt(self.count)
+
+    def __pop(self, now: int) -> tuple[Packet | None, bool]:
+        # Returns the head packet, and whether it is OK to drop it (its sojourn time has been too high for too long)
+        if not self.queue:
+            self.first_above_time = None
+            return None, False
+
+        enqueue_time, packet = self.queue.popleft()
+        sojourn_time = now - enqueue_time
+        if sojourn_time < self.target or not self.queue:
+            # Went below target, or the queue is draining anyway
+            self.first_above_time = None
+            return packet, False
+        if self.first_above_time is None:
+            self.first_above_time = now + self.interval
+            return packet, False
+        return packet, now >= self.first_above_time
+
+    def __drop(self, packet: Packet):
+        self.logger.add_event(type="CoDel drop", desc=f"Dropping packet, Sequence number: {packet.sequence_number}")
+
+    def dequeue(self, now: int) -> Packet | None:
+        packet, ok_to_drop = self.__pop(now)
+        if packet is None:
+            self.dropping = False
+            return None
+
+        if self.dropping:
+            if not ok_to_drop:
+                self.dropping = False
+            else:
+                # Each time the drop time passes, drop the head and schedule the next drop a bit sooner
+                while self.dropping and now >= self.drop_next:
+                    self.__drop(packet)
+                    self.count += 1
+                    packet, ok_to_drop = self.__pop(now)
+                    if packet is None or not ok_to_drop:
+                        self.dropping = False
+                    else:
+                        self.drop_next = self.__control_law(self.drop_next)
+        elif ok_to_drop:
+            # Enter the dropping state, dropping this packet
+            self.__drop(packet)
+            packet, ok_to_drop = self.__pop(now)
+            self.dropping = True
+            # If we were dropping recently, resume with a similar drop rate
+            delta = self.count - self.last_count
+            if delta > 1 and now - self.drop_next < 16 * self.interval:
+                self.count = delta
+            else:
+                self.count = 1
+            self.drop_next = self.__control_law(now)
+            self.last_count = self.count
+
+        return packet
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+
+class DRR(QueueDiscipline):
+
+    def __init__(self, queue_limit: int, quantum: int = 1, logger: log.SimulationLogger = None):
+        assert quantum >= 1, "DRR needs a quantum of at least one packet"
+        self.queue_limit = queue_limit
+        self.logger = logger or log.default_logger()
+        # Packets a flow can send per turn. Packets all have the same size, so deficits are counted in packets.
+        self.quantum = quantum
+
+        # Queues of the flows that have packets queued, by flow id. Idle flows are forgotten, so they cost nothing.
+        # (A flow emptied by an overflow drop is only forgotten when its turn comes.)
+        self.flows: Dict[int, deque] = {}
+        # Ids of the flows in self.flows, in the order they take turns. The flow at the front is sending.
+        self.active_flows = deque()
+        # Packets the flow at the front can still send in its current turn, 0 if its turn hasn't started
+        self.deficit = 0
+        self.length = 0
+
+        # Flow ids by queue length, and the longest length, so the longest flow is found in constant time when the
+        # queue overflows. Queue lengths only ever change by one, so the longest length can be kept up to date.
+        self.flows_by_length: Dict[int, Set[int]] = {}
+        self.longest = 0
+
+    def __resize(self, flow_id: int, old_length: int, new_length: int):
+        flows_by_length = self.flows_by_length
+        if old_length:
+            flows = flows_by_length[old_length]
+            if len(flows) == 1:
+                del flows_by_length[old_length]
+                if old_length == self.longest and new_length < old_length:
+                    self.longest = new_length
+            else:
+                flows.discard(flow_id)
+        if new_length:
+            flows = flows_by_length.get(new_length)
+            if flows is None:
+                flows_by_length[new_length] = {flow_id}
+                if new_length > self.longest:
+                    self.longest = new_length
+            else:
+                flows.add(flow_id)
+
+    def __pop(self, flow_id: int) -> Packet:
+        queue = self.flows[flow_id]
+        packet = queue.popleft()
+        self.length -= 1
+        length = len(queue)
+        self.__resize(flow_id, length + 1, length)
+        return packet
+
+    def __forget(self, flow_id: int):
+        # The flow is at the front of active_flows, and has no packets left
+        del self.flows[flow_id]
+        self.active_flows.popleft()
+        self.deficit = 0
+
+    def enqueue(self, packet: Packet, now: int) -> bool:
+        flow_id = packet.flow_id
+        queue = self.flows.get(flow_id)
+        length = len(queue) if queue is not None else 0
+
+        if self.length >= self.queue_limit:
+            if length >= self.longest:
+                # This flow already has the most packets queued, so it loses the new one
+                self.logger.add_event(type="Buffer capacity exceeded",
+                              desc=f"Dropping packet, Sequence number: {packet.sequence_number}")
+                return False
+            # Make room by dropping the oldest packet of the longest flow
+            victim = next(iter(self.flows_by_length[self.longest]))
+            dropped = self.__pop(victim)
+            self.logger.add_event(type="DRR longest flow drop",
+                          desc=f"Dropping packet, Sequence number: {dropped.sequence_number}")
+            # If that emptied the victim's queue, it stays in active_flows until its turn comes, where dequeue()
+            # forgets it. Removing it from the middle of active_flows now would take linear time.
+
+        if queue is None:
+            queue = self.flows[flow_id] = deque()
+            # New flows wait for their turn at the back
+            self.active_flows.append(flow_id)
+        queue.append(packet)
+        self.length += 1
+        self.__resize(flow_id, length, length + 1)
+        return True
+
+    def dequeue(self, now: int) -> Packet | None:
+        if not self.length:
+            return None
+        flow_id = self.active_flows[0]
+        while not self.flows[flow_id]:
+            # Emptied by an overflow drop
+            self.__forget(flow_id)
+            flow_id = self.active_flows[0]
+        if self.deficit == 0:
+            # Start of the flow's turn
+            self.deficit = self.quantum
+        packet = self.__pop(flow_id)
+        self.deficit -= 1
+
+        if not self.flows[flow_id]:
+            # A flow that runs out of packets loses the rest of its turn
+            self.__forget(flow_id)
+        elif self.deficit == 0:
+            # End of the flow's turn, the next flow goes
+            self.active_flows.rotate(-1)
+        return packet
+
+    def __len__(self) -> int:
+        return self.length
+
+
+def make_queue_discipline(name: str, queue_limit: int, rng: random.Random = None,
+                          logger: log.SimulationLogger = None) -> QueueDiscipline:
+    if name == "drop-tail":
+        return DropTail(queue_limit, logger=logger)
+    elif name == "red":
+        return RED(queue_limit, rng=rng, logger=logger)
+    elif name == "codel":
+        return CoDel(queue_limit, logger=logger)
+    elif name == "drr":
+        return DRR(queue_limit, logger=logger)
+    raise ValueError(f"Unknown queue discipline: {name}")
@@ -0,0 +1,141 @@
+import asyncio
+import socket
+import struct
+from collections import deque
+from typing import Dict, Tuple
+
+from .network_interface import NetworkInterface
+from .pacer import TokenBucketPacer
+from .packet import Packet
+from .packet_ring import PacketRing
+from simulation.clock import Clock
+import simulation.simulation_logger as log
+from util.timeout_calculator import TimeoutCalculator
+
+"""
+UDP Network Interface
+=====================
+
+A NetworkInterface whose packets travel over a real UDP socket on the loopback interface, to the link emulator (see
+simulation/emulation.py), instead of being handed to the simulator's link. Hosts use it exactly like the simulated
+interface: they transmit() packets and receive_all() ACKs on every tick.
+
+The emulation loop calls flush() after running the host on each tick, which sends the packets on the egress buffer as
+datagrams. Datagrams that arrive between ticks are decoded by the event loop and put on the ingress buffer.
+
+In the simulator, the ACK a host receives is the very packet object it transmitted, marked as an ACK by the delay box,
+and hosts rely on this, e.g. to find the ACKed packet in their list of inflight packets. To keep that behaviour, every
+datagram carries an id, and the interface hands the host back the packet it sent with that id, marked as an ACK.
+Lost packets are never ACKed, so packets are forgotten once they are older than the host's max timeout: by then the
+host has retransmitted them, and a late ACK gets a copy of the packet decoded from the datagram instead.
+"""
+
+# sent_timestamp, sequence_number, packet id, flow id, flags
+_PACKET_FORMAT = struct.Struct("!qqQIB")
+_RETRANSMISSION_FLAG = 1
+_ACK_FLAG = 2
+
+# Large enough for the biggest bursts hosts send in a single tick, the kernel caps it at net.core.rmem_max
+SOCKET_BUFFER_BYTES = 4 * 1024 * 1024
+
+
+def encode_packet(packet: Packet, packet_id: int) -> bytes:
+    flags = (_RETRANSMISSION_FLAG if packet.retransmission_flag else 0) | (_ACK_FLAG if packet.ack_flag else 0)
+    return _PACKET_FORMAT.pack(packet.sent_timestamp, packet.sequence_number, packet_id, packet.flow_id, flags)
+
+
+def decode_packet(data: bytes) -> Tuple[Packet, int]:
+    sent_timestamp, sequence_number, packet_id, flow_id, flags = _PACKET_FORMAT.unpack(data)
+    packet = Packet(
+        sent_timestamp=sent_timestamp,
+        sequence_number=sequence_number,
+        retransmission_flag=bool(flags & _RETRANSMISSION_FLAG),
+        ack_flag=bool(flags & _ACK_FLAG),
+        flow_id=flow_id,
+    )
+    return packet, packet_id
+
+
+def enlarge_socket_buffers(transport: asyncio.DatagramTransport):
+    sock = transport.get_extra_info("socket")
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_BYTES)
+
+
+class _InterfaceProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, interface: "UdpNetworkInterface"):
+        self.interface = interface
+
+    def datagram_received(self, data: bytes, addr):
+        self.interface.datagram_received(data)
+
+
+class UdpNetworkInterface(NetworkInterface):
+
+    def __init__(self, clock: Clock, pacer: TokenBucketPacer | None = None, logger: log.SimulationLogger | None = None,
+                 max_timeout: int = TimeoutCalculator.DEFAULT_MAX_TIMEOUT):
+        super().__init__(clock, pacer=pacer, logger=logger)
+        self.transport: asyncio.DatagramTransport | None = None
+        # Packets sent but not ACKed yet, by the id their datagram carries
+        self.unacked: Dict[int, Packet] = {}
+        # (tick, packet id) of the datagrams sent in the last max_timeout ticks, in the order they were sent. Packets
+        # that are still unacked after that have timed out in the host, and are removed from unacked.
+        self.send_ticks = deque()
+        self.max_timeout = max_timeout
+        self.next_packet_id = 0
+        # Packets released from the egress buffer on this tick, reused on every flush
+        self.outgoing = PacketRing()
+        # Running totals of datagrams sent and received
+        self.sent_datagrams = 0
+        self.received_datagrams = 0
+
+    """
+    Open a UDP socket on the loopback interface, connected to the emulator's address.
+    """
+    async def connect(self, remote_address: Tuple[str, int]):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: _InterfaceProtocol(self),
+            local_addr=("127.0.0.1", 0),
+            remote_addr=remote_address,
+        )
+        enlarge_socket_buffers(self.transport)
+
+    """
+    Send the packets on the egress buffer (or, if the interface is paced, those the pacer releases) to the emulator.
+    """
+    def flush(self):
+        now = self.clock.read_tick()
+        self.__forget_timed_out(now)
+        self.drain_into(self.outgoing)
+        while self.outgoing:
+            packet = self.outgoing.popleft()
+            packet_id = self.next_packet_id
+            self.next_packet_id += 1
+            self.unacked[packet_id] = packet
+            self.send_ticks.append((now, packet_id))
+            self.transport.sendto(encode_packet(packet, packet_id))
+            self.sent_datagrams += 1
+
+    def __forget_timed_out(self, now: int):
+        send_ticks = self.send_ticks
+        while send_ticks and now - send_ticks[0][0] > self.max_timeout:
+            _, packet_id = send_ticks.popleft()
+            # Packets that were ACKed are already gone
+            self.unacked.pop(packet_id, None)
+
+    def datagram_received(self, data: bytes):
+        ack, packet_id = decode_packet(data)
+        self.received_datagrams += 1
+        # Hand back the packet the host sent, like the simulator does, unless it was forgotten after timing out
+        packet = self.unacked.pop(packet_id, ack)
+        packet.ack_flag = True
+        self.receive_buffer.append(packet)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        self.unacked.clear()
+        self.send_ticks.clear()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import argparse
+import os
+
+from simulation.batch import HOST_TYPES, SimulationConfig
+from simulation.sequential_runner import METRICS, run_until_confident
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(
+        description="Run a configuration with more and more seeds until the confidence interval on its result is "
+                    "narrower than a target width"
+    )
+    arg_def.add_argument("--host-type", dest="host_type", choices=HOST_TYPES, required=True)
+    arg_def.add_argument("--window-size", dest="window_size", type=int, default=None,
+                         help="Window size in packets for sliding window sender")
+    arg_def.add_argument("--rtt-min", dest="rtt_min", type=int, required=True,
+                         help="Minimum round-trip time in tick units")
+    arg_def.add_argument("--ticks", dest="ticks", type=int, required=True,
+                         help="Number of ticks to run each simulation for")
+    arg_def.add_argument("--loss-ratio", dest="loss_ratio", type=float, default=0.0,
+                         help="independent and identically distributed loss probability, default 0")
+    arg_def.add_argument("--queue-limit", dest="queue_limit", type=int, default=1000000,
+                         help="max. queue size of link queue, defaults to 1M packets")
+    arg_def.add_argument("--metric", dest="metric", choices=METRICS, default=METRICS[0],
+                         help="The result the confidence interval is computed for")
+    arg_def.add_argument("--target-width", dest="target_width", type=float, required=True,
+                         help="Stop once the confidence interval is at most this wide")
+    arg_def.add_argument("--confidence", dest="confidence", type=float, default=0.95)
+    arg_def.add_argument("--min-runs", dest="min_runs", type=int, default=3)
+    arg_def.add_argument("--max-runs", dest="max_runs", type=int, default=100)
+    arg_def.add_argument("--workers", dest="workers", type=int, default=os.cpu_count(),
+                         help="Number of seeds to run in parallel, defaults to the number of CPUs")
+    arg_def.add_argument("--first-seed", dest="first_seed", type=int, default=1)
+
+    args = arg_def.parse_args()
+
+    config = SimulationConfig(
+        host_type=args.host_type,
+        window_size=args.window_size,
+        rtt_min=args.rtt_min,
+        ticks=args.ticks,
+        loss_ratio=args.loss_ratio,
+        queue_limit=args.queue_limit,
+    )
+    result = run_until_confident(
+        config,
+        target_width=args.target_width,
+        metric=args.metric,
+        confidence=args.confidence,
+        min_runs=args.min_runs,
+        max_runs=args.max_runs,
+        workers=args.workers,
+        first_seed=args.first_seed,
+    )
+
+    print(f"Metric: {result.metric}")
+    print(f"Mean: {result.mean}")
+    print(f"{result.confidence:.0%} confidence interval: [{result.low()}, {result.high()}]")
+    print(f"Runs used: {result.runs()}")
+    if not result.converged:
+        print(f"Warning: the interval did not get narrower than {args.target_width} within {args.max_runs} runs")
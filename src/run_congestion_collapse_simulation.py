@@ -1,34 +1,40 @@
 #!/usr/bin/env python3
-import random
+import argparse
 
-import matplotlib.pyplot as plt
 from host.host import Host
 from network.network_interface import NetworkInterface
-from simulation.clock import Clock
+from simulation.context import SimulationContext
 from simulation.simulatorv2 import SimulatorV2 as Simulator
 from host.sliding_window_host import SlidingWindowHost
+from network.queue_discipline import QUEUE_DISCIPLINES
 from util.timeout_calculator import TimeoutCalculator
-from simulation import simulation_logger as log
 
 
 DURATION = 10000
+QUEUE_LIMIT = 1000000
+SEED = 1000
 
 
-def return_congested_simulator(host: Host, network_interface: NetworkInterface, clock: Clock):
-    random.seed(1000)
+def return_congested_simulator(host: Host, network_interface: NetworkInterface, context: SimulationContext,
+                               queue_limit: int = QUEUE_LIMIT, queue_discipline: str = "drop-tail"):
     return Simulator(
         host=host,
         network_interface=network_interface,
-        clock=clock,
+        clock=context.clock,
         loss_ratio=0.0,
-        queue_limit=1000000,
+        queue_limit=queue_limit,
         rtt_min=10,  # TODO: You're allowed to modify the RTT
+        queue_discipline=queue_discipline,
+        rng=context.rng,
+        logger=context.logger,
     )
 
 
-def tick_and_get_seq_number(window):
-    clock = Clock()
-    network_interface = NetworkInterface(clock=clock)
+def tick_and_get_seq_number(window, queue_limit: int = QUEUE_LIMIT, queue_discipline: str = "drop-tail"):
+    # Every run gets its own clock, logger and random numbers, seeded the same way
+    context = SimulationContext.create(SEED)
+    clock = context.clock
+    network_interface = NetworkInterface(clock=clock, logger=context.logger)
     timeout_calculator = TimeoutCalculator(alpha=0.125, beta=0.25, k=4)
     host = SlidingWindowHost(
         clock=clock,
@@ -36,10 +42,12 @@ def tick_and_get_seq_number(window):
         window_size=window,
         timeout_calculator=timeout_calculator
     )
-    simulator = return_congested_simulator(host=host, network_interface=network_interface, clock=clock)
-    log.set_clock(clock)
+    simulator = return_congested_simulator(host=host, network_interface=network_interface, context=context,
+                                           queue_limit=queue_limit, queue_discipline=queue_discipline)
     simulator.run(DURATION)
 
+    # The link serves 1 packet per tick, so the peak queue depth is also the worst queueing delay in ticks
+    print(f"Window {window}: peak link queue depth {simulator.link.peak_queue_depth}")
     # Return the largest sequence number that has been received in order
     print(f"Maximum in order received sequence number {simulator.max_in_order_received_sequence_number()}")
     return simulator.max_in_order_received_sequence_number()
@@ -50,6 +58,9 @@ def get_window_sizes():
     return [1, 10, 20, 30, 40, 50, 60, 70, 80, 90]
 
 def plot(window_sizes, sequence_numbers):
+    # Imported lazily so that importing this module (e.g. from a sweep driver) doesn't load matplotlib
+    import matplotlib.pyplot as plt
+
     throughput = list(map(lambda seq_num: seq_num / DURATION, sequence_numbers))
 
     fig, window_sizes_axis = plt.subplots()
@@ -66,6 +77,31 @@ def plot(window_sizes, sequence_numbers):
 
 
 if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(
+        description="Sweep the sliding window size to show a congestion collapse curve"
+    )
+    arg_def.add_argument(
+        "--queue-limit",
+        dest="queue_limit",
+        type=int,
+        help="max. queue size of link queue, defaults to 1M packets, which is practically infinite",
+        default=QUEUE_LIMIT,
+    )
+    arg_def.add_argument(
+        "--queue-discipline",
+        dest="queue_discipline",
+        choices=QUEUE_DISCIPLINES,
+        help="how the link queue decides which packets to drop, defaults to drop-tail",
+        default="drop-tail",
+    )
+    arg_def.add_argument(
+        "--store",
+        dest="store",
+        help="directory of a result store (see util/result_store.py) to append the sweep's results to",
+        default=None,
+    )
+    args = arg_def.parse_args()
+
     # TODO: Select a progression of window sizes, which show a congestion collapse curve.
 
     window_sizes = get_window_sizes()
@@ -77,9 +113,27 @@ if __name__ == "__main__":
     # TODO: For each window size, call tick_and_get_seq_number
     sequence_numbers = []
     for size in window_sizes:
-        seq = tick_and_get_seq_number(size)
+        seq = tick_and_get_seq_number(size, queue_limit=args.queue_limit, queue_discipline=args.queue_discipline)
         sequence_numbers.append(seq)
 
     # TODO: Collect the results
     # TODO: Plot the results using the plot() function
     plot(window_sizes, sequence_numbers)
+
+    if args.store is not None:
+        # Imported lazily, like matplotlib, since it loads NumPy
+        from util.result_store import ResultStore, code_version
+
+        chunk = ResultStore(args.store).append(
+            columns={
+                "window_size": window_sizes,
+                "queue_limit": [args.queue_limit] * len(window_sizes),
+                "queue_discipline": [args.queue_discipline] * len(window_sizes),
+                "duration": [DURATION] * len(window_sizes),
+                "seed": [SEED] * len(window_sizes),
+                "max_in_order_sequence_number": sequence_numbers,
+                "throughput": [seq_num / DURATION for seq_num in sequence_numbers],
+            },
+            labels={"sweep": "congestion_collapse", "code_version": code_version()},
+        )
+        print(f"Appended {chunk.rows} results to {args.store} as {chunk.name}")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import argparse
+
+from network.queue_discipline import QUEUE_DISCIPLINES
+from simulation.batch import HOST_TYPES, SimulationConfig, run_simulation
+from simulation.emulation import run_emulation
+
+"""
+Emulation Benchmark
+===================
+
+Runs a host against the loopback UDP link emulator (see simulation/emulation.py), and reports:
+ - the packets per second the host sent and received, and how many ticks ran late
+ - the CPU time of the host process per packet (sent or received), i.e. the cost of the protocol logic, the
+   interface and the event loop's socket I/O, and the part of it spent in the host's run_one_tick()
+ - the goodput, next to the goodput SimulatorV2 reaches with the same configuration. The two differ when ticks run
+   late, or when the kernel drops datagrams.
+
+The event loop's timers only have millisecond resolution on Linux, so with ticks much shorter than the default 2 ms,
+ACKs can miss the host's tick they are due on, and the emulated goodput drops below the simulated one.
+"""
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(description="Measure a host's packet rate and CPU cost over loopback UDP")
+    arg_def.add_argument("--host", dest="host_type", choices=HOST_TYPES, default="sliding-window")
+    arg_def.add_argument("--window-size", dest="window_size", type=int, default=10,
+                         help="Window size in packets, only used by the sliding window host")
+    arg_def.add_argument("--rtt-min", dest="rtt_min", type=int, default=10)
+    arg_def.add_argument("--ticks", dest="ticks", type=int, default=5000)
+    arg_def.add_argument("--loss-ratio", dest="loss_ratio", type=float, default=0.0)
+    arg_def.add_argument("--queue-limit", dest="queue_limit", type=int, default=1000000)
+    arg_def.add_argument("--queue-discipline", dest="queue_discipline", choices=QUEUE_DISCIPLINES,
+                         default="drop-tail")
+    arg_def.add_argument("--jitter", dest="jitter", type=int, default=0)
+    arg_def.add_argument("--tick-interval", dest="tick_interval", type=float, default=2.0,
+                         help="Length of a tick in milliseconds, default 2")
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1)
+    args = arg_def.parse_args()
+
+    config = SimulationConfig(
+        host_type=args.host_type,
+        window_size=args.window_size,
+        rtt_min=args.rtt_min,
+        ticks=args.ticks,
+        loss_ratio=args.loss_ratio,
+        queue_limit=args.queue_limit,
+        queue_discipline=args.queue_discipline,
+        jitter=args.jitter,
+        seed=args.seed,
+    )
+    result = run_emulation(config, tick_interval=args.tick_interval / 1000)
+    simulated = run_simulation(config)
+
+    packets = result.sent_packets + result.received_packets
+    print(f"Host: {args.host_type}, {args.ticks} ticks of {args.tick_interval} ms")
+    print(f"Wall time: {result.wall_time:.2f}s, host process CPU time: {result.cpu_time:.2f}s")
+    print(f"Packets sent: {result.sent_packets} ({result.sent_packets / result.wall_time:.0f}/s), "
+          f"ACKs received: {result.received_packets} ({result.received_packets / result.wall_time:.0f}/s)")
+    if packets:
+        print(f"CPU per packet: {result.cpu_time / packets * 1e6:.1f} us, "
+              f"of which run_one_tick(): {result.host_time / packets * 1e6:.1f} us")
+    print(f"Late ticks: host {result.late_ticks}, emulator {result.emulator.late_ticks}")
+    print(f"Emulator: received {result.emulator.received}, delivered {result.emulator.delivered}, "
+          f"peak queue depth {result.emulator.peak_queue_depth}")
+    if result.emulator.received < result.sent_packets:
+        print(f"Datagrams the emulator didn't receive: {result.sent_packets - result.emulator.received}")
+    print(f"Goodput: emulated {result.goodput:.3f}, simulated {simulated.goodput:.3f} packets/tick")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import argparse
+import math
+import sys
+
+from simulation.equivalence import REFERENCE_ENGINE, check_equivalence, load_engine, random_configs
+
+"""
+Equivalence Check
+=================
+
+Runs a candidate engine against the reference SimulatorV2 on randomized configurations (see simulation/equivalence.py),
+and reports for each configuration whether the two behaved identically, the first tick on which they diverged if not,
+and how much faster the candidate was. Exits with status 1 if any configuration diverged.
+
+For example, to check an engine defined in simulation/fast_simulator.py:
+
+    python run_equivalence_check.py --candidate simulation.fast_simulator:FastSimulator
+"""
+
+
+def describe(config) -> str:
+    network = f"{len(config.hops)} hops" if config.hops else \
+        f"rtt_min={config.rtt_min} loss={config.loss_ratio} queue={config.queue_limit} {config.queue_discipline}"
+    window = f" window={config.window_size}" if config.window_size is not None else ""
+    return f"{config.host_type}{window} {network} seed={config.seed}"
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(description="Check that an engine behaves exactly like SimulatorV2")
+    arg_def.add_argument("--candidate", dest="candidate", type=str, required=True,
+                         help="The engine to check, as module:Class")
+    arg_def.add_argument("--reference", dest="reference", type=str, default=REFERENCE_ENGINE,
+                         help=f"The engine to check against, as module:Class, defaults to {REFERENCE_ENGINE}")
+    arg_def.add_argument("--configs", dest="configs", type=int, default=20,
+                         help="Number of random configurations")
+    arg_def.add_argument("--ticks", dest="ticks", type=int, default=5000)
+    arg_def.add_argument("--repeats", dest="repeats", type=int, default=3,
+                         help="Each engine's time is the best of this many runs")
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1,
+                         help="Seed the random configurations are drawn with")
+    args = arg_def.parse_args()
+
+    reference = load_engine(args.reference)
+    candidate = load_engine(args.candidate)
+
+    results = []
+    for config in random_configs(args.configs, args.ticks, args.seed):
+        result = check_equivalence(config, candidate, reference=reference, repeats=args.repeats)
+        results.append(result)
+        status = "identical" if result.identical() else f"DIVERGED at tick {result.first_divergent_tick}"
+        print(f"{describe(config)}: {status}, reference {result.reference_time * 1000:.1f} ms, "
+              f"candidate {result.candidate_time * 1000:.1f} ms, speedup {result.speedup():.2f}x")
+        if not result.identical():
+            print(f"  reference: {'; '.join(result.reference_events)}")
+            print(f"  candidate: {'; '.join(result.candidate_events)}")
+
+    diverged = [result for result in results if not result.identical()]
+    speedups = [result.speedup() for result in results]
+    print()
+    print(f"{len(results) - len(diverged)} of {len(results)} configurations identical")
+    print(f"Speedup: geometric mean {math.exp(sum(map(math.log, speedups)) / len(speedups)):.2f}x, "
+          f"min {min(speedups):.2f}x, max {max(speedups):.2f}x")
+    sys.exit(1 if diverged else 0)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import argparse
+import time
+
+from network.link import Link
+from network.packet import Packet
+from network.queue_discipline import make_queue_discipline
+from simulation.context import SimulationContext
+
+"""
+Fair Queuing Benchmark
+======================
+
+Compares the drop-tail FIFO against deficit round robin (see network/queue_discipline.py) in two ways:
+
+1. Fairness: one aggressive flow sends more packets per tick than the link can carry, while a number of light flows
+   send a packet every few ticks. We report the aggressive flow's share of the link, the share of the light flows'
+   packets that got through, and their mean queueing delay. Behind a FIFO the aggressive flow keeps the queue full,
+   so the light flows lose packets and wait behind the whole queue. DRR should deliver all of the light flows'
+   packets with little delay.
+2. Cost: with a queue of --cost-packets packets spread over an increasing number of flows, the time one enqueue
+   plus one dequeue takes. DRR should stay within a constant factor of the FIFO however many flows there are.
+"""
+
+DISCIPLINES = ["drop-tail", "drr"]
+
+
+def run_fairness(discipline: str, args) -> tuple[float, float, float]:
+    # Each discipline runs in its own context, so both see the same arrivals
+    context = SimulationContext.create(args.seed)
+    clock = context.clock
+    link = Link(loss_ratio=0.0, queue_limit=args.queue_limit, clock=clock, rng=context.rng, logger=context.logger,
+                queue_discipline=make_queue_discipline(discipline, args.queue_limit, rng=context.rng,
+                                                       logger=context.logger))
+    light_sent = light_delivered = aggressive_delivered = delivered = 0
+    light_delay = 0
+    sequence_number = 0
+
+    for tick in range(args.ticks):
+        clock.set_tick(tick)
+        arriving = []
+        for _ in range(args.aggressive_rate):
+            arriving.append(Packet(sent_timestamp=tick, sequence_number=sequence_number, flow_id=0))
+            sequence_number += 1
+        for flow_id in range(1, args.light_flows + 1):
+            # Stagger the light flows, so they don't all send on the same tick
+            if (tick + flow_id) % args.light_interval == 0:
+                arriving.append(Packet(sent_timestamp=tick, sequence_number=sequence_number, flow_id=flow_id))
+                sequence_number += 1
+                light_sent += 1
+        context.rng.shuffle(arriving)
+        link.enqueue(arriving)
+
+        for packet in link.dequeue():
+            delivered += 1
+            if packet.flow_id == 0:
+                aggressive_delivered += 1
+            else:
+                light_delivered += 1
+                light_delay += tick - packet.sent_timestamp
+
+    return (
+        aggressive_delivered / delivered if delivered else 0.0,
+        light_delivered / light_sent if light_sent else 0.0,
+        light_delay / light_delivered if light_delivered else 0.0,
+    )
+
+
+def enqueue_dequeue_cost_ns(discipline: str, flows: int, packets: int, operations: int, seed: int) -> float:
+    context = SimulationContext.create(seed)
+    queue = make_queue_discipline(discipline, packets + 1, rng=context.rng, logger=context.logger)
+    for sequence_number in range(packets):
+        queue.enqueue(Packet(sent_timestamp=0, sequence_number=sequence_number, flow_id=sequence_number % flows), 0)
+    arriving = [Packet(sent_timestamp=0, sequence_number=packets + i, flow_id=context.rng.randrange(flows))
+                for i in range(operations)]
+
+    start = time.perf_counter_ns()
+    for packet in arriving:
+        queue.enqueue(packet, 0)
+        queue.dequeue(0)
+    return (time.perf_counter_ns() - start) / operations
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(description="Compare the fairness and cost of the FIFO and DRR queues")
+    arg_def.add_argument("--ticks", dest="ticks", type=int, default=10000)
+    arg_def.add_argument("--queue-limit", dest="queue_limit", type=int, default=50)
+    arg_def.add_argument("--aggressive-rate", dest="aggressive_rate", type=int, default=2,
+                         help="Packets the aggressive flow sends per tick")
+    arg_def.add_argument("--light-flows", dest="light_flows", type=int, default=9)
+    arg_def.add_argument("--light-interval", dest="light_interval", type=int, default=20,
+                         help="Ticks between two packets of a light flow")
+    arg_def.add_argument("--flow-counts", dest="flow_counts", type=int, nargs="+",
+                         default=[1, 10, 100, 1000, 10000])
+    arg_def.add_argument("--cost-packets", dest="cost_packets", type=int, default=20000,
+                         help="Packets queued while timing enqueue and dequeue")
+    arg_def.add_argument("--cost-operations", dest="cost_operations", type=int, default=200000)
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1)
+    args = arg_def.parse_args()
+
+    print(f"{'Discipline':<10} {'Aggressive share':>17} {'Light delivered':>16} {'Light mean delay':>17}")
+    for discipline in DISCIPLINES:
+        aggressive_share, light_delivered, light_delay = run_fairness(discipline, args)
+        print(f"{discipline:<10} {aggressive_share:>17.3f} {light_delivered:>16.3f} {light_delay:>17.1f}")
+
+    print()
+    print(f"{'Flows':>7} {'drop-tail ns/op':>16} {'drr ns/op':>10} {'Ratio':>6}")
+    for flows in args.flow_counts:
+        costs = []
+        for discipline in DISCIPLINES:
+            costs.append(enqueue_dequeue_cost_ns(discipline, flows, args.cost_packets, args.cost_operations,
+                                                 args.seed))
+        fifo_cost, drr_cost = costs
+        print(f"{flows:>7} {fifo_cost:>16.0f} {drr_cost:>10.0f} {drr_cost / fifo_cost:>6.1f}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import argparse
+import time
+
+from simulation.batch import SimulationConfig, run_batch
+from simulation.fluid import in_validity_range, run_fluid_batch
+
+"""
+Fluid Model Validation
+======================
+
+Runs the same sweeps through SimulatorV2 and the fluid model (see simulation/fluid.py), and reports the goodput of
+both, their absolute error, the mean absolute error of each curve, and how much faster the fluid model was.
+
+The model isn't fitted to these sweeps, they only show where it can be trusted. Points outside of its validity range
+(see in_validity_range()), such as the congestion collapse region of the sliding window host, are only run through
+SimulatorV2, and are reported without a fluid goodput.
+
+The sweeps are:
+ - the congestion collapse curve: the sliding window host with growing fixed windows, for each queue limit
+ - AIMD over a grid of rtt_min and loss ratios
+"""
+
+
+def collapse_configs(args) -> list:
+    return [
+        SimulationConfig(
+            host_type="sliding-window",
+            window_size=window_size,
+            rtt_min=args.rtt_min,
+            ticks=args.ticks,
+            queue_limit=queue_limit,
+            seed=args.seed,
+        )
+        for queue_limit in args.queue_limits
+        for window_size in args.window_sizes
+    ]
+
+
+def aimd_configs(args) -> list:
+    return [
+        SimulationConfig(
+            host_type="aimd",
+            rtt_min=rtt_min,
+            ticks=args.ticks,
+            loss_ratio=loss_ratio,
+            queue_limit=args.aimd_queue_limit,
+            seed=args.seed,
+        )
+        for rtt_min in args.aimd_rtt_mins
+        for loss_ratio in args.aimd_loss_ratios
+    ]
+
+
+def curve_name(config: SimulationConfig) -> str:
+    if config.host_type == "aimd":
+        return f"aimd rtt_min={config.rtt_min}"
+    return f"sliding-window queue_limit={config.queue_limit}"
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(description="Compare the fluid model against SimulatorV2")
+    arg_def.add_argument("--ticks", dest="ticks", type=int, default=10000)
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1)
+    arg_def.add_argument("--workers", dest="workers", type=int, default=None)
+    arg_def.add_argument("--rtt-min", dest="rtt_min", type=int, default=10,
+                         help="rtt_min of the congestion collapse curve")
+    arg_def.add_argument("--window-sizes", dest="window_sizes", type=int, nargs="+",
+                         default=[1, 5, 10, 20, 50, 80, 100, 150, 300])
+    arg_def.add_argument("--queue-limits", dest="queue_limits", type=int, nargs="+", default=[1000000, 50])
+    arg_def.add_argument("--aimd-rtt-mins", dest="aimd_rtt_mins", type=int, nargs="+", default=[10, 50])
+    arg_def.add_argument("--aimd-loss-ratios", dest="aimd_loss_ratios", type=float, nargs="+",
+                         default=[0.0, 0.001, 0.01, 0.05])
+    arg_def.add_argument("--aimd-queue-limit", dest="aimd_queue_limit", type=int, default=50)
+    args = arg_def.parse_args()
+
+    configs = collapse_configs(args) + aimd_configs(args)
+
+    start = time.perf_counter()
+    packet_results = run_batch(configs, workers=args.workers)
+    packet_time = time.perf_counter() - start
+    start = time.perf_counter()
+    fluid_results = iter(run_fluid_batch([config for config in configs if in_validity_range(config)]))
+    fluid_time = time.perf_counter() - start
+
+    # Errors of every curve, and its number of points
+    errors = {}
+    points = {}
+    print(f"{'Curve':>34} {'Window':>7} {'Loss':>6} {'SimulatorV2':>12} {'Fluid':>7} {'Error':>7}")
+    for packet_result in packet_results:
+        config = packet_result.config
+        name = curve_name(config)
+        points[name] = points.get(name, 0) + 1
+        window = config.window_size if config.window_size is not None else "-"
+        line = f"{name:>34} {window:>7} {config.loss_ratio:>6} {packet_result.goodput:>12.3f}"
+        if not in_validity_range(config):
+            print(f"{line} {'-':>7} {'-':>7}")
+            continue
+        fluid_goodput = next(fluid_results).goodput
+        error = abs(fluid_goodput - packet_result.goodput)
+        errors.setdefault(name, []).append(error)
+        print(f"{line} {fluid_goodput:>7.3f} {error:>7.3f}")
+
+    print()
+    print("Mean absolute goodput error per curve, over the points in the model's validity range")
+    for name, count in points.items():
+        curve_errors = errors.get(name, [])
+        mean_error = f"{sum(curve_errors) / len(curve_errors):.3f}" if curve_errors else "-"
+        print(f"  {name}: {mean_error} ({len(curve_errors)} of {count} points)")
+    print()
+    print(f"SimulatorV2: {packet_time:.2f}s, fluid model: {fluid_time:.2f}s, "
+          f"speedup: {packet_time / fluid_time:.1f}x")
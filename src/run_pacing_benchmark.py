@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import argparse
+
+from simulation.batch import SimulationConfig, run_batch
+from simulation.packet_latency import packet_latencies, percentile
+
+"""
+Pacing Benchmark
+================
+
+Runs the sliding window host with and without token bucket pacing (see network/pacer.py), and compares:
+ - the goodput, which pacing shouldn't lower. With a small --queue-limit, the bursts of an unpaced host overflow the
+   link queue and the resulting drops and retransmissions lower it
+ - the peak link queue depth, sampled at the end of every tick
+ - the median and tail latency of each packet, from its first transmission to its first delivery back to the host.
+   For paced runs this includes the time spent waiting in the pacer.
+"""
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(
+        description="Compare peak link queue depth and latency of the sliding window host with and without pacing"
+    )
+    arg_def.add_argument("--rtt-min", dest="rtt_min", type=int, default=20)
+    arg_def.add_argument("--ticks", dest="ticks", type=int, default=5000)
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1)
+    arg_def.add_argument("--queue-limit", dest="queue_limit", type=int, default=1000000)
+    arg_def.add_argument("--window-sizes", dest="window_sizes", type=int, nargs="+", default=[10, 20, 40])
+    arg_def.add_argument("--pacing-burst", dest="pacing_burst", type=float, default=1.0)
+    arg_def.add_argument("--workers", dest="workers", type=int, default=None)
+    args = arg_def.parse_args()
+
+    configs = [
+        SimulationConfig(
+            host_type="sliding-window",
+            rtt_min=args.rtt_min,
+            ticks=args.ticks,
+            window_size=window_size,
+            queue_limit=args.queue_limit,
+            seed=args.seed,
+            pacing=pacing,
+            pacing_burst=args.pacing_burst,
+            keep_events=True,
+            collect_metrics=True,
+            # More than one bucket per tick (a full buffer gets downsampled), so the peak isn't averaged away
+            metrics_capacity=2 * (args.ticks // 2 + 1),
+        )
+        for window_size in args.window_sizes
+        for pacing in (False, True)
+    ]
+
+    print(f"{'Window':>6} {'Paced':>6} {'Goodput':>8} {'Peak queue':>11} {'p50 latency':>12} {'p99 latency':>12}")
+    for result in run_batch(configs, workers=args.workers):
+        latencies = packet_latencies(result.events)
+        peak_queue_depth = max(result.metrics["link_queue_depth"])
+        print(f"{result.config.window_size:>6} {str(result.config.pacing):>6} {result.goodput:>8.3f} "
+              f"{peak_queue_depth:>11.0f} {percentile(latencies, 0.5):>12} {percentile(latencies, 0.99):>12}")
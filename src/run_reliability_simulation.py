@@ -3,14 +3,19 @@ import argparse
 import random
 
 from network.network_interface import NetworkInterface
-from simulation import simulation_logger as log
-from simulation.clock import Clock
+from network.pacer import TokenBucketPacer
+from network.queue_discipline import QUEUE_DISCIPLINES
+from simulation.batch import build_host, build_timeout_calculator, save_rtt_profile
+from simulation.context import SimulationContext
+from simulation.memory_profiler import MemoryProfiler
+from simulation.metrics import MetricsCollector
+from simulation.path import parse_hop
 from simulation.simulatorv2 import SimulatorV2 as Simulator
-from util.timeout_bounds import TimeoutBounds
+from simulation.trace import TraceRecorder, TraceReplay
+from util.latency_histogram import PacketLatencyStats
+from util.rtt_profile_cache import RttProfileCache
+from util.rtt_sampler import PER_RTT, RTT_SAMPLE_MODES
 from util.timeout_calculator import TimeoutCalculator
-from host.stop_and_wait_host import StopAndWaitHost
-from host.sliding_window_host import SlidingWindowHost
-from host.aimd_host import AimdHost
 
 
 def rtt_type(arg: str):
@@ -66,6 +71,50 @@ if __name__ == "__main__":
         help="max. queue size of link queue, defaults to 1M packets, which is practically infinite",
         default=1000000,
     )
+    arg_def.add_argument(
+        "--queue-discipline",
+        dest="queue_discipline",
+        choices=QUEUE_DISCIPLINES,
+        help="how the link queue decides which packets to drop, defaults to drop-tail",
+        default="drop-tail",
+    )
+    arg_def.add_argument(
+        "--jitter",
+        dest="jitter",
+        type=int,
+        help="max. number of extra ticks of random delay added to each packet's RTT, default 0",
+        default=0,
+    )
+    arg_def.add_argument(
+        "--hop",
+        dest="hops",
+        type=str,
+        action="append",
+        default=None,
+        help="Add a hop to a multi-hop path as capacity,queue_limit,loss_ratio,prop_delay. Repeat for each hop, in "
+             "order. When given, the path replaces the single link, and --rtt-min, --loss-ratio, --queue-limit and "
+             "--jitter are ignored",
+    )
+    arg_def.add_argument(
+        "--pacing",
+        dest="pacing",
+        action="store_true",
+        help="Pace packets leaving the host with a token bucket, at the host's window / RTT unless --pacing-rate is set",
+    )
+    arg_def.add_argument(
+        "--pacing-rate",
+        dest="pacing_rate",
+        type=float,
+        default=None,
+        help="Fixed pacing rate in packets per tick, implies --pacing",
+    )
+    arg_def.add_argument(
+        "--pacing-burst",
+        dest="pacing_burst",
+        type=float,
+        default=1.0,
+        help="Max. number of packets the pacer releases at once after being idle, default 1",
+    )
     arg_def.add_argument(
         "--min-timeout",
         dest="min_timeout",
@@ -81,6 +130,67 @@ if __name__ == "__main__":
         help="The maximum timeout value possible for the TimeoutCalculator",
     )
 
+    arg_def.add_argument(
+        "--rtt-sampling",
+        dest="rtt_sample_mode",
+        choices=RTT_SAMPLE_MODES,
+        default=PER_RTT,
+        help="Whether hosts feed the TimeoutCalculator at most once per RTT, or on every ACK",
+    )
+    arg_def.add_argument(
+        "--rtt-cache",
+        dest="rtt_cache",
+        type=str,
+        default=None,
+        help="RTT profile cache file. The timeout calculator starts from the cached RTT estimates for this "
+             "--rtt-min, --loss-ratio and --queue-limit, and this run's estimates are saved back to it",
+    )
+    arg_def.add_argument(
+        "--metrics-csv",
+        dest="metrics_csv",
+        type=str,
+        default=None,
+        help="If set, sample per-tick metrics and write them to this CSV file",
+    )
+    arg_def.add_argument(
+        "--metrics-buckets",
+        dest="metrics_buckets",
+        type=int,
+        default=1024,
+        help="Number of time buckets kept by the metrics collector, runs longer than this are downsampled",
+    )
+    arg_def.add_argument(
+        "--memory-profile",
+        dest="memory_profile",
+        type=int,
+        default=None,
+        help="If set, sample the memory used by each component of the simulation every this many ticks, and print "
+             "a growth report at the end",
+    )
+    arg_def.add_argument(
+        "--latency-histograms",
+        dest="latency_histograms",
+        action="store_true",
+        help="Record histograms of send to ACK latencies, link queue times and retransmissions per sequence number, "
+             "and print their percentiles at the end",
+    )
+
+    arg_def.add_argument(
+        "--record-trace",
+        dest="record_trace",
+        type=str,
+        default=None,
+        help="Record the loss and delay of every packet leaving the link to this trace file",
+    )
+    arg_def.add_argument(
+        "--replay-trace",
+        dest="replay_trace",
+        type=str,
+        default=None,
+        help="Take the loss and delay of every packet leaving the link from this trace file, instead of "
+             "--loss-ratio and --jitter",
+    )
+
     # Create subparser for "Stop and Wait" host type
     stop_and_wait_args = arg_sub_parsers.add_parser("stop-and-wait", help="Create a simulation with a host implementing the \"stop and wait\" protocol")
 
@@ -96,34 +206,52 @@ if __name__ == "__main__":
 
     # Create subparser for "AIMD" host type
     aimd_args = arg_sub_parsers.add_parser("aimd", help="Create a simulation with a host implementing the \"AIMD\" protocol")
+    aimd_args.add_argument(
+        "--plot-path",
+        dest="plot_path",
+        type=str,
+        default="aimd-window-sizes.png",
+        help="Where to save the plot of the window size over time",
+    )
+
+    # Create subparser for "Vegas" host type
+    vegas_args = arg_sub_parsers.add_parser("vegas", help="Create a simulation with a host implementing a delay-based, \"Vegas\" style protocol")
 
     # Actually carry out parsing
     args = arg_def.parse_args()
     for arg in vars(args):
         print("%s: %s" % (arg, getattr(args, arg)))
 
-    clock = Clock()
-    network_interface = NetworkInterface(clock)
-    timeout_bounds = TimeoutBounds(args.min_timeout, args.max_timeout)
-    timeout_calculator = TimeoutCalculator(
-        alpha=0.125,
-        beta=0.25,
-        k=4.0,
-        bounds=timeout_bounds
-    )
+    context = SimulationContext.create(args.seed)
+    clock = context.clock
+    pacer = None
+    if args.pacing or args.pacing_rate is not None:
+        pacer = TokenBucketPacer(rate=args.pacing_rate, burst=args.pacing_burst)
+    latency_stats = PacketLatencyStats() if args.latency_histograms else None
+    network_interface = NetworkInterface(clock, pacer=pacer, logger=context.logger, latency_stats=latency_stats)
+    # Multi-hop paths aren't described by the cache's key, so they don't use it
+    rtt_cache = RttProfileCache(args.rtt_cache) if args.rtt_cache and not args.hops else None
+    profile = rtt_cache.lookup(args.rtt_min, args.loss_ratio, args.queue_limit) if rtt_cache else None
+    if profile is not None:
+        print(f"Starting from cached RTT profile: mean {profile.mean}, stddiv {profile.stddiv}")
+    timeout_calculator = build_timeout_calculator(args.min_timeout, args.max_timeout, profile)
 
     # Create the host based on the host_type, i.e., what protocol the host follows
-    if args.host_type == "stop-and-wait":
-        host = StopAndWaitHost(clock=clock, network_interface=network_interface, timeout_calculator=timeout_calculator)
-    elif args.host_type == "sliding-window":
-        host = SlidingWindowHost(clock=clock, network_interface=network_interface, timeout_calculator=timeout_calculator, window_size=args.window_size)
-    elif args.host_type == "aimd":
-        host = AimdHost(clock=clock, network_interface=network_interface, timeout_calculator=timeout_calculator)
-    else:
-        assert False
+    host = build_host(
+        host_type=args.host_type,
+        clock=clock,
+        network_interface=network_interface,
+        timeout_calculator=timeout_calculator,
+        window_size=getattr(args, "window_size", None),
+        rtt_sample_mode=args.rtt_sample_mode,
+        logger=context.logger,
+        plot_path=getattr(args, "plot_path", None),
+    )
+
+    metrics = MetricsCollector(capacity=args.metrics_buckets) if args.metrics_csv else None
+    memory_profiler = MemoryProfiler(interval=args.memory_profile) if args.memory_profile else None
 
     # Start and run the simulation
-    random.seed(args.seed)
     simulator = Simulator(
         host=host,
         clock=clock,
@@ -131,11 +259,46 @@ if __name__ == "__main__":
         loss_ratio=args.loss_ratio,
         queue_limit=args.queue_limit,
         rtt_min=args.rtt_min,
+        jitter=args.jitter,
+        queue_discipline=args.queue_discipline,
+        metrics=metrics,
+        hops=[parse_hop(hop, args.queue_discipline) for hop in args.hops] if args.hops else None,
+        rng=context.rng,
+        logger=context.logger,
+        memory_profiler=memory_profiler,
     )
 
-    log.set_clock(clock)
+    trace_recorder = TraceRecorder(args.record_trace) if args.record_trace else None
+    trace_replay = TraceReplay(args.replay_trace) if args.replay_trace else None
+    if trace_replay is not None:
+        trace_replay.attach(simulator)
+    if trace_recorder is not None:
+        trace_recorder.attach(simulator)
+
     simulator.run(duration=args.ticks)
-    log.print_logs()
+
+    if trace_recorder is not None:
+        trace_recorder.close()
+    if trace_replay is not None:
+        trace_replay.close()
+    context.logger.print_logs()
+
+    if rtt_cache is not None:
+        save_rtt_profile(rtt_cache, args.rtt_min, args.loss_ratio, args.queue_limit, host)
+
+    if metrics is not None:
+        metrics.to_csv(args.metrics_csv)
+
+    if memory_profiler is not None:
+        print(memory_profiler.report())
+
+    if latency_stats is not None:
+        print(latency_stats.report())
+
+    if pacer is not None:
+        print(f"Peak pacer queue depth {pacer.peak_queue_depth}")
+    if simulator.path is not None:
+        print(f"Peak queue depth per hop {simulator.path.peak_queue_depths()}")
 
     # Report the largest sequence number that has been received in order
     print(f"Maximum in order received sequence number {simulator.max_in_order_received_sequence_number()}")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import tempfile
+
+from simulation.batch import HOST_TYPES, SimulationConfig, run_simulation
+from simulation.packet_latency import first_event_ticks
+
+"""
+RTT Profile Cache Benchmark
+===========================
+
+Measures how much sooner short flows finish when the timeout calculator is warm-started from the RTT profile cache
+(see util/rtt_profile_cache.py). For each rtt_min, we:
+1. run a short flow with a cold timeout calculator
+2. run a long flow on the same path to fill a fresh cache
+3. run the short flow again, warm-started from the cache
+
+and report the tick the first --packets packets had all been delivered on, and the number of retransmissions.
+"""
+
+def completion_tick(events: list, packets: int) -> int | None:
+    first_receive = first_event_ticks(events, "Receive")
+    if any(sequence_number not in first_receive for sequence_number in range(packets)):
+        return None
+    return max(first_receive[sequence_number] for sequence_number in range(packets))
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(description="Compare short flow completion times with and without the RTT cache")
+    arg_def.add_argument("host_type", choices=HOST_TYPES)
+    arg_def.add_argument("--window-size", dest="window_size", type=int, default=None)
+    arg_def.add_argument("--rtt-mins", dest="rtt_mins", type=int, nargs="+", default=[20, 50, 150, 300])
+    arg_def.add_argument("--min-timeout", dest="min_timeout", type=int, default=None,
+                         help="Lower bound of the timeout, defaults to the TimeoutCalculator default")
+    arg_def.add_argument("--packets", dest="packets", type=int, default=10,
+                         help="Number of packets in a short flow")
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1)
+    args = arg_def.parse_args()
+
+    print(f"{'RTT min':>7} {'Cold completion':>16} {'Warm completion':>16} {'Cold retransmits':>17} "
+          f"{'Warm retransmits':>17}")
+    for rtt_min in args.rtt_mins:
+        with tempfile.TemporaryDirectory() as directory:
+            common = dict(
+                host_type=args.host_type,
+                rtt_min=rtt_min,
+                window_size=args.window_size,
+                seed=args.seed,
+                keep_events=True,
+            )
+            if args.min_timeout is not None:
+                common["min_timeout"] = args.min_timeout
+            cache_path = os.path.join(directory, "rtt_cache.json")
+            # Long enough for the short flow to finish, even when it is slowed down by timeouts
+            short_ticks = rtt_min * (args.packets + 2)
+
+            cold = run_simulation(SimulationConfig(ticks=short_ticks, **common))
+            run_simulation(SimulationConfig(ticks=rtt_min * 100, rtt_cache=cache_path, **common))
+            warm = run_simulation(SimulationConfig(ticks=short_ticks, rtt_cache=cache_path, **common))
+
+        results = []
+        for result in (cold, warm):
+            results.append(completion_tick(result.events, args.packets))
+            results.append(sum(1 for event in result.events if event.type == "Retransmit"))
+        cold_completion, cold_retransmits, warm_completion, warm_retransmits = results
+        print(f"{rtt_min:>7} {str(cold_completion):>16} {str(warm_completion):>16} {cold_retransmits:>17} "
+              f"{warm_retransmits:>17}")
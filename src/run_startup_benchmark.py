@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+"""
+Startup Benchmark
+=================
+
+Measures the cold-start import cost of a simulation CLI using the interpreter's "-X importtime" report.
+
+The target script is launched in a fresh interpreter several times. For each launch we sum the cumulative import
+time of every top-level import (the lines of the report with no nesting indent), and take the best launch as the
+startup time. This is the number that matters when a driver launches thousands of short runs.
+
+The benchmark fails (non-zero exit) if the startup time exceeds the target, or if any of the forbidden modules
+(by default matplotlib and NumPy, which should only be loaded lazily) were imported.
+"""
+
+# Heavy modules that should never be loaded by a run that doesn't plot
+DEFAULT_FORBIDDEN_MODULES = ["matplotlib", "numpy"]
+DEFAULT_TARGET_MS = 150.0
+
+
+@dataclass
+class ImportTimeReport:
+    # Sum of the cumulative import time of all top-level imports, in milliseconds
+    total_ms: float
+
+    # Every module that was imported, in import order
+    modules: List[str]
+
+
+def parse_import_time(stderr: str) -> ImportTimeReport:
+    total_us = 0
+    modules = []
+    for line in stderr.splitlines():
+        # Lines look like "import time:       123 |       4567 |   package.module"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            # This is the header line
+            continue
+        name = fields[2]
+        modules.append(name.strip())
+        # Nested imports are indented by two spaces per level, and are already included in their parent's cumulative
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(fields[1])
+    return ImportTimeReport(total_ms=total_us / 1000.0, modules=modules)
+
+
+def measure(script: str, script_args: List[str]) -> ImportTimeReport:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", script, *script_args],
+        cwd=os.path.dirname(os.path.abspath(script)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return parse_import_time(completed.stderr)
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(
+        description="Measure the cold start import time of a simulation CLI"
+    )
+    arg_def.add_argument(
+        "--script",
+        dest="script",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_reliability_simulation.py"),
+        help="The script to launch, defaults to run_reliability_simulation.py",
+    )
+    arg_def.add_argument(
+        "--runs",
+        dest="runs",
+        type=int,
+        default=5,
+        help="Number of cold starts to measure, the best one is reported",
+    )
+    arg_def.add_argument(
+        "--target-ms",
+        dest="target_ms",
+        type=float,
+        default=DEFAULT_TARGET_MS,
+        help=f"Maximum allowed import time in milliseconds, default {DEFAULT_TARGET_MS}",
+    )
+    arg_def.add_argument(
+        "--forbid",
+        dest="forbidden_modules",
+        nargs="*",
+        default=DEFAULT_FORBIDDEN_MODULES,
+        help="Top-level packages which must not be imported during startup",
+    )
+    arg_def.add_argument(
+        "script_args",
+        nargs=argparse.REMAINDER,
+        help="Arguments passed to the script, defaults to a one tick stop-and-wait run",
+    )
+
+    args = arg_def.parse_args()
+    script_args = args.script_args or ["--rtt-min", "10", "--ticks", "1", "stop-and-wait"]
+
+    reports = [measure(args.script, script_args) for _ in range(args.runs)]
+    best = min(reports, key=lambda report: report.total_ms)
+
+    print(f"Script: {args.script} {' '.join(script_args)}")
+    print(f"Best import time over {args.runs} runs: {best.total_ms:.1f} ms (target {args.target_ms:.1f} ms)")
+
+    failed = False
+    if best.total_ms > args.target_ms:
+        print("FAIL: import time is above the target")
+        failed = True
+
+    forbidden = sorted({module.split(".")[0] for module in best.modules} & set(args.forbidden_modules))
+    if forbidden:
+        print(f"FAIL: forbidden modules were imported at startup: {', '.join(forbidden)}")
+        failed = True
+
+    sys.exit(1 if failed else 0)
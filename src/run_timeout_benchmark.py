@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import time
+
+from util.quantile_timeout_calculator import QuantileTimeoutCalculator
+from util.rtt_scenarios import SCENARIOS, evaluate_timeouts
+from util.timeout_calculator import TimeoutCalculator
+
+"""
+Timeout Estimator Benchmark
+===========================
+
+Compares the EWMA timeout calculator against the quantile timeout calculator on every scenario of
+util/rtt_scenarios.py, replayed for --samples RTTs. The quantile estimator needs at least 1 / (1 - quantile) samples
+per sketch before P-Square takes over from the running max, so scenarios much shorter than its window don't measure
+it. For each scenario we report:
+ - the number of ACKs that would have been ignored (the RTT was above the timeout, so we retransmitted needlessly)
+ - the mean extra wait time, i.e. how far above the RTT the timeout was for the ACKs that weren't ignored
+ - the cost of one add_data_point() call, since hosts make this call on every ACK
+"""
+
+
+def update_cost_ns(make_calculator, samples: int) -> float:
+    calculator = make_calculator()
+    rtts = [random.uniform(10, 200) for _ in range(samples)]
+    start = time.perf_counter_ns()
+    for rtt in rtts:
+        calculator.add_data_point(rtt)
+    return (time.perf_counter_ns() - start) / samples
+
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(
+        description="Compare the EWMA and quantile timeout estimators"
+    )
+    arg_def.add_argument("-a", "--alpha", dest="alpha", type=float, default=0.125)
+    arg_def.add_argument("-b", "--beta", dest="beta", type=float, default=0.25)
+    arg_def.add_argument("-k", "--standard-deviations-for-timeout", dest="k", type=float, default=3)
+    arg_def.add_argument("-q", "--quantile", dest="quantile", type=float, default=0.99)
+    arg_def.add_argument("--window", dest="window", type=int, default=None,
+                         help="Number of samples the quantile estimator tracks, sized for the quantile by default")
+    arg_def.add_argument("--samples", dest="samples", type=int, default=200000,
+                         help="Number of RTTs each scenario is replayed for")
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1234,
+                         help="Seed of the high variance scenario, and of the RTTs used to time add_data_point()")
+    arg_def.add_argument("--cost-samples", dest="cost_samples", type=int, default=100000,
+                         help="Number of samples used to time add_data_point()")
+    args = arg_def.parse_args()
+
+    estimators = {
+        "ewma": lambda: TimeoutCalculator(alpha=args.alpha, beta=args.beta, k=args.k, initial_stddiv_estimate=0),
+        "quantile": lambda: QuantileTimeoutCalculator(quantile=args.quantile, window=args.window),
+    }
+
+    print(f"{'Scenario':<18} {'Estimator':<10} {'Ignored ACKs':>12} {'Mean extra wait':>16}")
+    for scenario_name, scenario in SCENARIOS.items():
+        for estimator_name, make_calculator in estimators.items():
+            # Same seed for every estimator, so they see the same RTTs
+            evaluation = evaluate_timeouts(scenario(args.samples, seed=args.seed), make_calculator())
+            print(f"{scenario_name:<18} {estimator_name:<10} {evaluation.ignored_acks:>12} "
+                  f"{evaluation.mean_extra_wait_time():>16.2f}")
+
+    print()
+    random.seed(args.seed)
+    for estimator_name, make_calculator in estimators.items():
+        print(f"{estimator_name} add_data_point(): {update_cost_ns(make_calculator, args.cost_samples):.0f} ns per sample")
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 import argparse
-import matplotlib.pyplot as plt
+import sys
 from dataclasses import dataclass
-from numpy import clip, random
 
+from util.quantile_timeout_calculator import QuantileTimeoutCalculator
 from util.timeout_calculator import TimeoutCalculator
 
 
@@ -68,6 +68,9 @@ class NetworkSimulator:
 
     @staticmethod
     def high_variance():
+        # NumPy is only needed by this scenario, so load it on first use
+        from numpy import clip, random
+
         previous = 1.0
         for ts in range(0, 100):
             yield SimulatedMessageTransmission(send_time=ts, rtt=previous)
@@ -75,10 +78,23 @@ class NetworkSimulator:
             previous = clip(previous + diff, 10, 200)
 
 
-def run_simulation(network_simulator, alpha: float, beta: float, k: float) -> list:
+"""
+Adapt the RTTs of a recorded trace (see simulation/trace.py) to a scenario like the NetworkSimulator ones.
+Traces don't record send times, so each packet's index in the trace stands in for its send time.
+"""
+def trace_scenario(trace):
+    def transmissions():
+        for packet_index, rtt in trace.rtts():
+            yield SimulatedMessageTransmission(send_time=packet_index, rtt=rtt)
+    return transmissions
+
+
+def run_simulation(network_simulator, alpha: float, beta: float, k: float, timeout_calculator=None) -> list:
     message_transmissions = []
     current_timeout = None
-    timeout_calculator = TimeoutCalculator(alpha=alpha, beta=beta, k=k, initial_stddiv_estimate=0)
+    # Any calculator with the TimeoutCalculator interface can be passed in, by default we use EWMA
+    if timeout_calculator is None:
+        timeout_calculator = TimeoutCalculator(alpha=alpha, beta=beta, k=k, initial_stddiv_estimate=0)
 
     for message in network_simulator():
         if current_timeout is None:
@@ -116,6 +132,8 @@ def run_simulation(network_simulator, alpha: float, beta: float, k: float) -> li
 
 
 def plot(message_transmissions: list):
+    import matplotlib.pyplot as plt
+
     # First, extract the two data sets
     actual_rtt_data = list(map(lambda message: message.packet_rtt, message_transmissions))
     mean_estimates = list(map(lambda message: message.transmission_rtt_mean_estimate, message_transmissions))
@@ -136,9 +154,16 @@ if __name__ == "__main__":
 
     arg_def.add_argument(
         "simulation_scenario",
-        choices=["short-spike", "long-spike", "high-variance", "permanent-change"],
+        choices=["short-spike", "long-spike", "high-variance", "permanent-change", "trace"],
         default="high-variance",
     )
+    arg_def.add_argument(
+        "--trace",
+        dest="trace",
+        type=str,
+        default=None,
+        help="Trace file recorded with run_reliability_simulation.py --record-trace, used by the \"trace\" scenario"
+    )
     arg_def.add_argument(
         "-a", "--alpha",
         dest="alpha",
@@ -151,15 +176,45 @@ if __name__ == "__main__":
         type=float,
         required=True
     )
+    arg_def.add_argument(
+        "--estimator",
+        dest="estimator",
+        choices=["ewma", "quantile"],
+        default="ewma",
+        help="ewma uses mean + k * stddiv as the timeout, quantile uses a high quantile of recent RTTs"
+    )
+    arg_def.add_argument(
+        "-q", "--quantile",
+        dest="quantile",
+        type=float,
+        default=0.99,
+        help="The RTT quantile used as the timeout by the quantile estimator"
+    )
     arg_def.add_argument(
         "-k", "--standard-deviations-for-timeout",
         dest="k",
         type=float,
         default=3
     )
+    arg_def.add_argument(
+        "--samples",
+        dest="samples",
+        type=int,
+        default=None,
+        help="Stream this many samples from the vectorized scenario generators and print summary statistics, "
+             "instead of simulating the 100 sample scenario and plotting it"
+    )
+    arg_def.add_argument(
+        "--seed",
+        dest="seed",
+        type=int,
+        default=1234,
+        help="Seed for the randomness in the scenario"
+    )
 
     args = arg_def.parse_args()
 
+    trace = None
     match args.simulation_scenario:
         case "short-spike":
             network_simulator = NetworkSimulator.short_spike
@@ -169,12 +224,39 @@ if __name__ == "__main__":
             network_simulator = NetworkSimulator.high_variance
         case "permanent-change":
             network_simulator = NetworkSimulator.permanent_change
-
-    random.seed(seed=1234)
-    message_transmissions = run_simulation(network_simulator, args.alpha, args.beta, args.k)
+        case "trace":
+            from simulation.trace import TraceReplay
+            assert args.trace is not None, "The trace scenario needs a --trace file"
+            assert args.samples is None, "Traces are already streamed, --samples isn't supported"
+            trace = TraceReplay(args.trace)
+            network_simulator = trace_scenario(trace)
+
+    timeout_calculator = None
+    if args.estimator == "quantile":
+        timeout_calculator = QuantileTimeoutCalculator(quantile=args.quantile)
+
+    if args.samples is not None:
+        from util.rtt_scenarios import SCENARIOS, evaluate_timeouts
+
+        if timeout_calculator is None:
+            timeout_calculator = TimeoutCalculator(alpha=args.alpha, beta=args.beta, k=args.k, initial_stddiv_estimate=0)
+        chunks = SCENARIOS[args.simulation_scenario](args.samples, seed=args.seed)
+        evaluation = evaluate_timeouts(chunks, timeout_calculator)
+        print(f"Samples: {evaluation.samples}")
+        print(f"Ignored ACKs: {evaluation.ignored_acks}")
+        print(f"Mean extra wait time: {evaluation.mean_extra_wait_time()}")
+        sys.exit(0)
+
+    from numpy import random
+    random.seed(seed=args.seed)
+    message_transmissions = run_simulation(network_simulator, args.alpha, args.beta, args.k, timeout_calculator)
+    if trace is not None:
+        trace.close()
     print(f"Alpha: {args.alpha}")
     print(f"Beta: {args.beta}")
-    print(f"EWMA at step 35: {message_transmissions[35].transmission_rtt_mean_estimate}")
-    print(f"EWMA at step 90: {message_transmissions[90].transmission_rtt_mean_estimate}")
+    # Traces can be shorter than the built in scenarios
+    for step in [35, 90]:
+        if step < len(message_transmissions):
+            print(f"EWMA at step {step}: {message_transmissions[step].transmission_rtt_mean_estimate}")
     print()
     plot(message_transmissions)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import argparse
+
+from simulation.batch import SimulationConfig, run_batch
+from simulation.packet_latency import packet_latencies, percentile
+
+"""
+AIMD vs Vegas
+=============
+
+Runs the loss-based AIMD host and the delay-based Vegas host on the same paths, and compares:
+ - the goodput
+ - the mean and peak link queue depth, sampled at the end of every tick
+ - the median and tail queueing delay, i.e. each packet's latency from its first transmission to its first delivery
+   back to the host, minus rtt_min
+
+AIMD only backs off once the link queue overflows, so its queueing delay grows with the queue limit. Vegas should
+keep the link busy with only a few packets queued, whatever the queue limit.
+"""
+
+if __name__ == "__main__":
+    arg_def = argparse.ArgumentParser(description="Compare the throughput and queueing delay of AIMD and Vegas")
+    arg_def.add_argument("--rtt-min", dest="rtt_min", type=int, default=20)
+    arg_def.add_argument("--ticks", dest="ticks", type=int, default=10000)
+    arg_def.add_argument("--seed", dest="seed", type=int, default=1)
+    arg_def.add_argument("--loss-ratio", dest="loss_ratio", type=float, default=0.0)
+    arg_def.add_argument("--queue-limits", dest="queue_limits", type=int, nargs="+", default=[20, 50, 200])
+    arg_def.add_argument("--workers", dest="workers", type=int, default=None)
+    args = arg_def.parse_args()
+
+    configs = [
+        SimulationConfig(
+            host_type=host_type,
+            rtt_min=args.rtt_min,
+            ticks=args.ticks,
+            loss_ratio=args.loss_ratio,
+            queue_limit=queue_limit,
+            seed=args.seed,
+            keep_events=True,
+            collect_metrics=True,
+            # More than one bucket per tick (a full buffer gets downsampled), so the peak isn't averaged away
+            metrics_capacity=2 * (args.ticks // 2 + 1),
+        )
+        for queue_limit in args.queue_limits
+        for host_type in ("aimd", "vegas")
+    ]
+
+    print(f"{'Queue limit':>11} {'Host':>6} {'Goodput':>8} {'Mean queue':>11} {'Peak queue':>11} "
+          f"{'p50 delay':>10} {'p99 delay':>10}")
+    for result in run_batch(configs, workers=args.workers):
+        delays = [latency - args.rtt_min for latency in packet_latencies(result.events)]
+        queue_depths = result.metrics["link_queue_depth"]
+        print(f"{result.config.queue_limit:>11} {result.config.host_type:>6} {result.goodput:>8.3f} "
+              f"{sum(queue_depths) / len(queue_depths):>11.1f} {max(queue_depths):>11.0f} "
+              f"{percentile(delays, 0.5):>10} {percentile(delays, 0.99):>10}")
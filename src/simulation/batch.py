@@ -0,0 +1,267 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List
+
+from host.aimd_host import AimdHost
+from host.host import Host
+from host.sliding_window_host import SlidingWindowHost
+from host.stop_and_wait_host import StopAndWaitHost
+from host.vegas_host import VegasHost
+from network.network_interface import NetworkInterface
+from network.pacer import TokenBucketPacer
+from simulation.clock import Clock
+from simulation.context import SimulationContext
+from simulation.metrics import MetricsCollector
+from simulation.simulation_logger import SimulationLogger
+from simulation.simulatorv2 import SimulatorV2 as Simulator
+from util.latency_histogram import PacketLatencyStats
+from util.rtt_profile_cache import RttProfile, RttProfileCache
+from util.rtt_sampler import PER_RTT
+from util.timeout_bounds import TimeoutBounds
+from util.timeout_calculator import TimeoutCalculator
+
+"""
+Batch API
+=========
+
+Runs simulations in-process, without going through the run_reliability_simulation.py command line.
+
+Each configuration gets its own SimulationContext (clock, logger and random number generator, see
+simulation/context.py), NetworkInterface, Host and Simulator, so nothing leaks from one simulation into the next.
+Configurations can optionally be spread over a pool of worker processes, or of worker threads.
+"""
+
+HOST_TYPES = ["stop-and-wait", "sliding-window", "aimd", "vegas"]
+
+
+@dataclass
+class SimulationConfig:
+    # One of HOST_TYPES
+    host_type: str
+
+    # Minimum round-trip time in tick units
+    rtt_min: int
+
+    # Number of ticks to run simulation for
+    ticks: int
+
+    # Window size in packets, only used by the sliding window host
+    window_size: int | None = None
+
+    # Independent and identically distributed loss probability
+    loss_ratio: float = 0.0
+
+    # Max size of the link queue in packets
+    queue_limit: int = 1000000
+
+    # How the link's queue drops packets, one of QUEUE_DISCIPLINES in network/queue_discipline.py
+    queue_discipline: str = "drop-tail"
+
+    # Max. number of extra ticks of random delay added to each packet on top of the RTT
+    jitter: int = 0
+
+    # If set, packets go through this multi-hop path (see simulation/path.py) instead of a single link, and
+    # loss_ratio, queue_limit, queue_discipline and jitter are ignored
+    hops: list | None = None
+
+    # Whether the network interface paces packets (see network/pacer.py). Setting pacing_rate fixes the rate in
+    # packets per tick and implies pacing, otherwise the rate is computed by the host
+    pacing: bool = False
+    pacing_rate: float | None = None
+    pacing_burst: float = 1.0
+
+    # If set, the path to an RTT profile cache (see util/rtt_profile_cache.py). The timeout calculator is warm-started
+    # from the cached profile of the path, and the run's estimates are saved back to the cache. Not used with hops.
+    rtt_cache: str | None = None
+
+    # Seed for the pseudo-randomness of the simulation, a random seed is picked if this is None
+    seed: int | None = None
+
+    min_timeout: int = TimeoutCalculator.DEFAULT_MIN_TIMEOUT
+    max_timeout: int = TimeoutCalculator.DEFAULT_MAX_TIMEOUT
+
+    # How hosts sample RTTs, one of RTT_SAMPLE_MODES in util/rtt_sampler.py
+    rtt_sample_mode: str = PER_RTT
+
+    # Whether to return the event log with the result. This can be very large for long runs.
+    keep_events: bool = False
+
+    # Whether to collect per-tick metrics, and how many buckets to keep (see simulation/metrics.py)
+    collect_metrics: bool = False
+    metrics_capacity: int = 1024
+
+    # Whether to record histograms of ACK latencies, link queue times and retransmissions (see
+    # util/latency_histogram.py). They are returned in SimulationResult.latencies.
+    collect_latencies: bool = False
+
+
+@dataclass
+class SimulationResult:
+    config: SimulationConfig
+
+    # The seed that was actually used, which is useful when the config didn't specify one
+    seed: int
+
+    # The largest sequence number such that all previous packets have been acknowledged
+    max_in_order_received_sequence_number: int
+
+    # Packets delivered in order per tick. Sequence numbers start at 0, so max_seq + 1 packets were delivered.
+    goodput: float
+
+    # Wall-clock time the simulation took, in seconds
+    wall_time: float
+
+    # Number of events logged during the simulation
+    event_count: int
+
+    # The logged events, only populated if the config asked for them
+    events: list | None = None
+
+    # The metrics time series keyed by series name, only populated if the config asked for them
+    metrics: dict | None = None
+
+    # The latency histograms, only populated if the config asked for them. Merge the histograms of several runs with
+    # PacketLatencyStats.merged().
+    latencies: PacketLatencyStats | None = None
+
+
+def build_timeout_calculator(min_timeout: int, max_timeout: int,
+                             profile: RttProfile | None = None) -> TimeoutCalculator:
+    # If we have an RTT profile from a previous run on the same path, start from its estimates
+    return TimeoutCalculator(
+        alpha=0.125,
+        beta=0.25,
+        k=4.0,
+        bounds=TimeoutBounds(min_timeout, max_timeout),
+        initial_mean_estimate=profile.mean if profile is not None else None,
+        initial_stddiv_estimate=profile.stddiv if profile is not None else None,
+    )
+
+
+def build_host(
+        host_type: str,
+        clock: Clock,
+        network_interface: NetworkInterface,
+        timeout_calculator: TimeoutCalculator,
+        window_size: int | None = None,
+        rtt_sample_mode: str = PER_RTT,
+        logger: SimulationLogger | None = None,
+        plot_path: str | None = None,
+) -> Host:
+    # Create the host based on the host_type, i.e., what protocol the host follows
+    if host_type == "stop-and-wait":
+        return StopAndWaitHost(clock=clock, network_interface=network_interface, timeout_calculator=timeout_calculator,
+                               rtt_sample_mode=rtt_sample_mode)
+    elif host_type == "sliding-window":
+        assert window_size is not None, "The sliding window host needs a window size"
+        return SlidingWindowHost(clock=clock, network_interface=network_interface,
+                                 timeout_calculator=timeout_calculator, window_size=window_size,
+                                 rtt_sample_mode=rtt_sample_mode)
+    elif host_type == "aimd":
+        return AimdHost(clock=clock, network_interface=network_interface, timeout_calculator=timeout_calculator,
+                        rtt_sample_mode=rtt_sample_mode, logger=logger, plot_path=plot_path)
+    elif host_type == "vegas":
+        return VegasHost(clock=clock, network_interface=network_interface, timeout_calculator=timeout_calculator,
+                         rtt_sample_mode=rtt_sample_mode, logger=logger)
+    raise ValueError(f"Unknown host type: {host_type}")
+
+
+"""
+Build the network interface, host and simulator of a configuration, in the given context. simulator_class can be any
+drop-in replacement for SimulatorV2, i.e. one taking the same arguments (see simulation/equivalence.py).
+"""
+def build_simulator(config: SimulationConfig, context: SimulationContext, metrics=None,
+                    profile: RttProfile | None = None, simulator_class=Simulator) -> Simulator:
+    clock = context.clock
+    pacer = None
+    if config.pacing or config.pacing_rate is not None:
+        pacer = TokenBucketPacer(rate=config.pacing_rate, burst=config.pacing_burst)
+    latency_stats = PacketLatencyStats() if config.collect_latencies else None
+    network_interface = NetworkInterface(clock, pacer=pacer, logger=context.logger, latency_stats=latency_stats)
+    timeout_calculator = build_timeout_calculator(config.min_timeout, config.max_timeout, profile)
+    host = build_host(config.host_type, clock, network_interface, timeout_calculator, config.window_size,
+                      config.rtt_sample_mode, logger=context.logger)
+
+    return simulator_class(
+        host=host,
+        clock=clock,
+        network_interface=network_interface,
+        loss_ratio=config.loss_ratio,
+        queue_limit=config.queue_limit,
+        rtt_min=config.rtt_min,
+        jitter=config.jitter,
+        queue_discipline=config.queue_discipline,
+        metrics=metrics,
+        hops=config.hops,
+        rng=context.rng,
+        logger=context.logger,
+    )
+
+
+def run_simulation(config: SimulationConfig) -> SimulationResult:
+    seed = config.seed if config.seed is not None else random.randint(1, 99999)
+
+    # Everything this run changes lives in its own context, so runs can share a process
+    context = SimulationContext.create(seed)
+    rtt_cache = RttProfileCache(config.rtt_cache) if config.rtt_cache and not config.hops else None
+    profile = rtt_cache.lookup(config.rtt_min, config.loss_ratio, config.queue_limit) if rtt_cache else None
+    metrics = MetricsCollector(capacity=config.metrics_capacity) if config.collect_metrics else None
+    simulator = build_simulator(config, context, metrics=metrics, profile=profile)
+    host = simulator.host
+
+    start = time.perf_counter()
+    simulator.run(duration=config.ticks)
+    wall_time = time.perf_counter() - start
+
+    events = context.logger.events()
+
+    if rtt_cache is not None:
+        save_rtt_profile(rtt_cache, config.rtt_min, config.loss_ratio, config.queue_limit, host)
+
+    max_seq = simulator.max_in_order_received_sequence_number()
+    return SimulationResult(
+        config=config,
+        seed=seed,
+        max_in_order_received_sequence_number=max_seq,
+        goodput=(max_seq + 1) / config.ticks if config.ticks else 0.0,
+        wall_time=wall_time,
+        event_count=len(events),
+        events=events if config.keep_events else None,
+        metrics=metrics.to_dict() if metrics is not None else None,
+        latencies=simulator.network_interface.latency_stats,
+    )
+
+
+"""
+Save the converged RTT estimates of the host's timeout calculator to the cache, if it took enough samples.
+"""
+def save_rtt_profile(rtt_cache: RttProfileCache, rtt_min: int, loss_ratio: float, queue_limit: int, host: Host):
+    rtt_sampler = host.rtt_sampler
+    stored = rtt_cache.store(
+        rtt_min=rtt_min,
+        loss_ratio=loss_ratio,
+        queue_limit=queue_limit,
+        mean=rtt_sampler.timeout_calculator.mean_estimate(),
+        stddiv=rtt_sampler.timeout_calculator.stddiv_estimate(),
+        samples=rtt_sampler.samples,
+    )
+    if stored:
+        rtt_cache.save()
+
+
+"""
+Run every configuration and return the results in the same order.
+If workers is greater than 1, the configurations are run on a pool of that many worker processes, or worker threads
+if threads is set. Each run has its own SimulationContext, so runs on threads don't share any state. Threads skip
+pickling the configs and results and starting processes, but only run in parallel on free-threaded Python builds.
+"""
+def run_batch(configs: List[SimulationConfig], workers: int | None = None,
+              threads: bool = False) -> List[SimulationResult]:
+    if workers is None or workers <= 1:
+        return [run_simulation(config) for config in configs]
+
+    pool = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with pool(max_workers=workers) as executor:
+        return list(executor.map(run_simulation, configs))
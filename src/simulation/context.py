@@ -0,0 +1,33 @@
+import random
+from dataclasses import dataclass
+
+from simulation.clock import Clock
+from simulation.simulation_logger import SimulationLogger
+
+"""
+Simulation Context
+==================
+
+The state a single simulation run owns: its clock, the logger its events go to, and the random number generator its
+losses and jitter are drawn from. Every component of the run is handed the same context's pieces instead of using
+module-level state, so several simulations can run in one process at the same time, e.g. on a ThreadPoolExecutor
+(see run_batch() in simulation/batch.py).
+
+Two runs with the same seed draw the same random numbers, whatever else is running in the process.
+"""
+
+
+@dataclass
+class SimulationContext:
+    clock: Clock
+
+    # Events of this run, stamped with the run's clock
+    logger: SimulationLogger
+
+    # Source of randomness for every random decision of this run
+    rng: random.Random
+
+    @staticmethod
+    def create(seed: int | None = None) -> "SimulationContext":
+        clock = Clock()
+        return SimulationContext(clock=clock, logger=SimulationLogger(clock), rng=random.Random(seed))
@@ -1,39 +1,89 @@
-from typing import List
+import heapq
+import random
+from typing import Callable, List
 
 from network.packet import Packet
+from network.packet_ring import PacketRing
 from simulation.clock import Clock
 
 """
 A class to delay packets by the propagation delay
 In our case, we'll use it to delay packets by the two-way propagation delay,
 i.e., RTT_min
+
+Each packet can be given its own delay. On top of the fixed propagation delay, the box can add random jitter
+(uniform between 0 and `jitter` extra ticks), or a delay_fn can compute the delay for each packet, e.g. to give each
+flow its own RTT. Packets are kept in a min-heap keyed by the tick they should be delivered on, so enqueue and dequeue
+cost O(log n) per packet no matter how many packets are being delayed.
+Packets that are due on the same tick are delivered in the order they were enqueued.
 """
 
 
 class DelayBox:
 
-    def __init__(self, clock: Clock,  prop_delay: int):
+    def __init__(self, clock: Clock, prop_delay: int, jitter: int = 0, rng: random.Random = None,
+                 delay_fn: Callable[[Packet], int] = None):
         self.clock = clock
-        # queue of packets being delayed
+        # heap of (delivery tick, enqueue order, packet) for the packets being delayed
         self.prop_delay_queue = []
         # how much to delay them by
         self.prop_delay = prop_delay
+        # max. number of extra ticks of random delay added to each packet
+        self.jitter = jitter
+        # source of randomness for the jitter, defaults to the global random module seeded by the simulation
+        self.rng = rng or random
+        # optional function computing the delay for each packet, overrides prop_delay and jitter
+        self.delay_fn = delay_fn
+        # number of packets enqueued so far, used to break ties between packets due on the same tick
+        self.enqueued = 0
 
-    def enqueue(self, packets: List[Packet]):
+    def __delay_for(self, packet: Packet) -> int:
+        if self.delay_fn is not None:
+            return self.delay_fn(packet)
+        return self.default_delay(packet)
+
+    def default_delay(self, packet: Packet) -> int:
+        # the delay used when there is no delay_fn: the propagation delay, plus jitter if enabled
+        if self.jitter:
+            return self.prop_delay + self.rng.randint(0, self.jitter)
+        return self.prop_delay
+
+    def __push(self, packet: Packet, now: int):
         # enqueue packet after timestamping it
+        packet.pdbox_time = now
+        packet.ack_flag = True
+        heapq.heappush(self.prop_delay_queue, (now + self.__delay_for(packet), self.enqueued, packet))
+        self.enqueued += 1
+
+    def enqueue(self, packets: List[Packet]):
+        now = self.clock.read_tick()
         for packet in packets:
-            packet.pdbox_time = self.clock.read_tick()
-            packet.ack_flag = True
-        self.prop_delay_queue += packets
+            self.__push(packet, now)
+
+    def enqueue_from(self, ring: PacketRing):
+        # same as enqueue(), but consumes the packets from a ring, leaving it empty
+        now = self.clock.read_tick()
+        while ring:
+            self.__push(ring.popleft(), now)
 
     def dequeue(self) -> List[Packet]:
         # execute this on every tick
         # packets that are delivered this tick
         to_deliver = []
-        for pkt in self.prop_delay_queue:
-            # if propagation delay has been exceeded
-            if pkt.pdbox_time + self.prop_delay <= self.clock.read_tick():
-                assert pkt.pdbox_time + self.prop_delay == self.clock.read_tick()
-                to_deliver += [pkt]
-        self.prop_delay_queue = [x for x in self.prop_delay_queue if x not in to_deliver]
+        self.drain_into(to_deliver)
         return to_deliver
+
+    def drain_into(self, sink):
+        # same as dequeue(), but appends the delivered packets to `sink` (a list or PacketRing)
+        now = self.clock.read_tick()
+        # pop every packet whose delay has elapsed
+        while self.prop_delay_queue and self.prop_delay_queue[0][0] <= now:
+            sink.append(heapq.heappop(self.prop_delay_queue)[2])
+
+    def next_delivery_tick(self) -> int | None:
+        # tick on which the next packet is due, or None if no packets are being delayed
+        return self.prop_delay_queue[0][0] if self.prop_delay_queue else None
+
+    def occupancy(self) -> int:
+        # number of packets currently being delayed
+        return len(self.prop_delay_queue)
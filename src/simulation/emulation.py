@@ -0,0 +1,248 @@
+import asyncio
+import multiprocessing
+import random
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from typing import Callable
+
+from network.link import Link
+from network.pacer import TokenBucketPacer
+from network.packet_ring import PacketRing
+from network.queue_discipline import make_queue_discipline
+from network.udp_network_interface import UdpNetworkInterface, decode_packet, encode_packet, enlarge_socket_buffers
+from simulation.batch import SimulationConfig, build_host, build_timeout_calculator
+from simulation.context import SimulationContext
+from simulation.delay_box import DelayBox
+
+"""
+Emulation
+=========
+
+Runs a host against real socket I/O instead of the simulator's tick loop, to see how the protocol logic behaves, and
+what it costs, under real event loop scheduling.
+
+The host talks to a UdpNetworkInterface (see network/udp_network_interface.py), which sends its packets as UDP
+datagrams on 127.0.0.1 to a link emulator running in a separate process. The emulator pushes them through the same
+Link and DelayBox the simulator uses, with the same loss ratio, queue limit, queue discipline, propagation delay and
+jitter, and sends the ACKs back.
+
+Ticks map to wall clock intervals of `tick_interval` seconds, counted from a start time both processes agree on. On
+every tick, the host process runs the host and flushes its interface, like steps 2 and 3 of SimulatorV2's tick. The
+emulator runs half a tick later, so the packets of a tick have arrived by then, and does steps 3 to 5. The ACKs it
+releases on a tick reach the host before the host's next tick, so a run sees the same RTTs it would in the simulator.
+Whenever a process falls behind, it runs the ticks it missed back to back, which keeps the link's rate per second
+right on average, and counts them as late.
+
+Multi-hop paths aren't supported.
+"""
+
+# How long both processes wait after agreeing on a start time, so that both are ready to run the first tick
+STARTUP_DELAY = 0.1
+
+
+@dataclass
+class EmulatorStats:
+    # Datagrams the emulator received from the host
+    received: int
+
+    # ACKs it sent back to the host
+    delivered: int
+
+    # Largest number of packets the link queue held
+    peak_queue_depth: int
+
+    # Ticks the emulator ran more than a tick late
+    late_ticks: int
+
+
+@dataclass
+class EmulationResult:
+    config: SimulationConfig
+    seed: int
+
+    # Length of a tick in seconds
+    tick_interval: float
+
+    # The largest sequence number such that all previous packets have been acknowledged
+    max_in_order_received_sequence_number: int
+
+    # Packets delivered in order per tick
+    goodput: float
+
+    # Wall clock time from the first to the last tick, and the CPU time the host process spent in that time, in seconds
+    wall_time: float
+    cpu_time: float
+
+    # Wall clock time spent in the host's run_one_tick(), in seconds
+    host_time: float
+
+    # Datagrams the host sent, and ACKs it received
+    sent_packets: int
+    received_packets: int
+
+    # Ticks the host ran more than a tick late
+    late_ticks: int
+
+    emulator: EmulatorStats
+
+
+"""
+Run run_tick(tick) for every tick, at start + (tick + offset) * tick_interval seconds on the event loop's clock,
+letting the event loop process I/O in between. Returns the number of ticks that ran more than a tick late.
+"""
+async def run_in_real_time(start: float, tick_interval: float, ticks: int, run_tick: Callable[[int], None],
+                           offset: float = 0.0) -> int:
+    loop = asyncio.get_running_loop()
+    late_ticks = 0
+    for tick in range(ticks):
+        delay = start + (tick + offset) * tick_interval - loop.time()
+        if delay < -tick_interval:
+            late_ticks += 1
+        # Even a late tick yields to the event loop, so that received datagrams are processed
+        await asyncio.sleep(max(0.0, delay))
+        run_tick(tick)
+    return late_ticks
+
+
+class LinkEmulator(asyncio.DatagramProtocol):
+
+    def __init__(self, config: SimulationConfig, context: SimulationContext):
+        self.clock = context.clock
+        self.link = Link(
+            loss_ratio=config.loss_ratio,
+            queue_limit=config.queue_limit,
+            clock=context.clock,
+            queue_discipline=make_queue_discipline(config.queue_discipline, config.queue_limit, rng=context.rng,
+                                                   logger=context.logger),
+            rng=context.rng,
+            logger=context.logger,
+        )
+        self.delay_box = DelayBox(clock=context.clock, prop_delay=config.rtt_min - 1, jitter=config.jitter,
+                                  rng=context.rng)
+        self.transport: asyncio.DatagramTransport | None = None
+        # Address the host sends from, learnt from its first datagram
+        self.host_address = None
+        # Packets received since the last tick, between the link and the delay box, and leaving the delay box
+        self.ingress = PacketRing()
+        self.link_egress = PacketRing()
+        self.delivered = PacketRing()
+        self.received_count = 0
+        self.delivered_count = 0
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        self.host_address = addr
+        packet, packet_id = decode_packet(data)
+        # Sent back with the packet's ACK, like the delay box stamps packets with pdbox_time
+        packet.emulation_id = packet_id
+        self.ingress.append(packet)
+        self.received_count += 1
+
+    def run_tick(self, tick: int):
+        self.clock.set_tick(tick)
+        self.link.enqueue_from(self.ingress)
+        self.link.drain_into(self.link_egress)
+        self.delay_box.enqueue_from(self.link_egress)
+        self.delay_box.drain_into(self.delivered)
+        while self.delivered:
+            packet = self.delivered.popleft()
+            self.transport.sendto(encode_packet(packet, packet.emulation_id), self.host_address)
+            self.delivered_count += 1
+
+
+"""
+Entry point of the emulator process. Sends the emulator's address over the connection, waits for the start time,
+emulates the link for config.ticks ticks and sends back its EmulatorStats.
+"""
+def run_emulator(config: SimulationConfig, seed: int, tick_interval: float, connection: Connection):
+    asyncio.run(_emulate(config, seed, tick_interval, connection))
+
+
+async def _emulate(config: SimulationConfig, seed: int, tick_interval: float, connection: Connection):
+    loop = asyncio.get_running_loop()
+    context = SimulationContext.create(seed)
+    transport, emulator = await loop.create_datagram_endpoint(lambda: LinkEmulator(config, context),
+                                                              local_addr=("127.0.0.1", 0))
+    enlarge_socket_buffers(transport)
+    connection.send(transport.get_extra_info("sockname"))
+    start = connection.recv()
+
+    late_ticks = await run_in_real_time(start, tick_interval, config.ticks, emulator.run_tick, offset=0.5)
+    transport.close()
+    connection.send(EmulatorStats(
+        received=emulator.received_count,
+        delivered=emulator.delivered_count,
+        peak_queue_depth=emulator.link.peak_queue_depth,
+        late_ticks=late_ticks,
+    ))
+
+
+"""
+Run the host of the config against the link emulator, with ticks of tick_interval seconds.
+"""
+def run_emulation(config: SimulationConfig, tick_interval: float = 0.002) -> EmulationResult:
+    assert not config.hops, "Emulating multi-hop paths isn't supported"
+    seed = config.seed if config.seed is not None else random.randint(1, 99999)
+
+    connection, emulator_connection = multiprocessing.Pipe()
+    emulator = multiprocessing.Process(target=run_emulator, args=(config, seed, tick_interval, emulator_connection))
+    emulator.start()
+    try:
+        return asyncio.run(_run_host(config, seed, tick_interval, connection))
+    finally:
+        emulator.join()
+
+
+async def _run_host(config: SimulationConfig, seed: int, tick_interval: float,
+                    connection: Connection) -> EmulationResult:
+    loop = asyncio.get_running_loop()
+    context = SimulationContext.create(seed)
+    clock = context.clock
+    pacer = None
+    if config.pacing or config.pacing_rate is not None:
+        pacer = TokenBucketPacer(rate=config.pacing_rate, burst=config.pacing_burst)
+    network_interface = UdpNetworkInterface(clock, pacer=pacer, logger=context.logger, max_timeout=config.max_timeout)
+    timeout_calculator = build_timeout_calculator(config.min_timeout, config.max_timeout)
+    host = build_host(config.host_type, clock, network_interface, timeout_calculator, config.window_size,
+                      config.rtt_sample_mode, logger=context.logger)
+
+    await network_interface.connect(connection.recv())
+    start = loop.time() + STARTUP_DELAY
+    connection.send(start)
+
+    max_seq = 0
+    host_time = 0.0
+
+    def run_tick(tick: int):
+        nonlocal max_seq, host_time
+        clock.set_tick(tick)
+        host_start = time.perf_counter()
+        max_seq = host.run_one_tick()
+        host_time += time.perf_counter() - host_start
+        network_interface.flush()
+
+    cpu_start = time.process_time()
+    late_ticks = await run_in_real_time(start, tick_interval, config.ticks, run_tick)
+    wall_time = loop.time() - start
+    cpu_time = time.process_time() - cpu_start
+    network_interface.close()
+    emulator_stats = connection.recv()
+    host.shutdown_hook()
+
+    return EmulationResult(
+        config=config,
+        seed=seed,
+        tick_interval=tick_interval,
+        max_in_order_received_sequence_number=max_seq,
+        goodput=(max_seq + 1) / config.ticks if config.ticks else 0.0,
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        host_time=host_time,
+        sent_packets=network_interface.sent_datagrams,
+        received_packets=network_interface.received_datagrams,
+        late_ticks=late_ticks,
+        emulator=emulator_stats,
+    )
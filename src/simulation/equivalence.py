@@ -0,0 +1,208 @@
+import hashlib
+import importlib
+import random
+import time
+from array import array
+from dataclasses import dataclass
+from typing import List
+
+from network.queue_discipline import QUEUE_DISCIPLINES
+from simulation.batch import HOST_TYPES, SimulationConfig, build_simulator
+from simulation.context import SimulationContext
+from simulation.path import Hop
+from simulation.simulatorv2 import SimulatorV2
+
+"""
+Equivalence Harness
+===================
+
+Checks that a faster engine behaves bit for bit like the reference SimulatorV2, and measures how much faster it is.
+
+An engine is a drop-in replacement for SimulatorV2: a class taking the same constructor arguments, with run(),
+max_in_order_received_sequence_number() and the clock and logger it was given as attributes. Variants of Link,
+DelayBox or the hosts are tested through a SimulatorV2 subclass that builds them instead of the originals.
+
+For every configuration, both engines are run with the same seed, and after every tick an EventStreamHasher folds
+what happened on that tick into a rolling hash: the tick, the sequence number the host returned, and the events that
+were logged on it (transmissions, retransmissions, drops and losses in the network, and ACKs delivered to the host).
+Events are hashed and then discarded, so memory doesn't grow with the length of the run. Only the reference's rolling
+hash after every tick is kept (8 bytes a tick). The candidate then runs against it and stops at the first tick whose
+hash differs, i.e. the first tick on which the two engines diverged. Both are then rerun up to that tick to show
+what each of them did on it.
+
+Both engines are then timed without any hashing, best of `repeats` runs. The time stops when the tick loop ends,
+before the host's shutdown_hook(), since e.g. the AIMD host can plot its window sizes there.
+
+The hasher and the stopwatch are handed to the engine as its metrics collector, since every engine calls the metrics
+collector's sample() after every tick, and flush() after the last.
+"""
+
+REFERENCE_ENGINE = "simulation.simulatorv2:SimulatorV2"
+
+
+class _Stop(Exception):
+    pass
+
+
+class EventStreamHasher:
+
+    def __init__(self, expected: array | None = None, capture_tick: int | None = None):
+        # Rolling hash after every tick
+        self.digests = array("Q")
+        self.state = bytes(8)
+        # The reference's rolling hashes, to stop at the first tick that differs from them
+        self.expected = expected
+        self.first_divergent_tick: int | None = None
+        # Tick whose events are kept, to show what happened on the divergent tick
+        self.capture_tick = capture_tick
+        self.captured: List[str] = []
+
+    def sample(self, simulator):
+        tick = simulator.clock.read_tick()
+        logger = simulator.logger
+        events = [f"{event.type}: {event.desc}" for event in logger.events()]
+        logger.clear()
+
+        payload = f"{tick}\n{simulator.max_in_order_received_sequence_number()}\n" + "\n".join(events)
+        self.state = hashlib.blake2b(self.state + payload.encode(), digest_size=8).digest()
+        digest = int.from_bytes(self.state, "little")
+        if tick == self.capture_tick:
+            self.captured = [f"returned sequence number {simulator.max_in_order_received_sequence_number()}"] + events
+            raise _Stop()
+
+        if self.expected is not None:
+            index = len(self.digests)
+            if index >= len(self.expected) or self.expected[index] != digest:
+                self.first_divergent_tick = tick
+                raise _Stop()
+        self.digests.append(digest)
+
+    def flush(self):
+        pass
+
+
+class _Stopwatch:
+
+    def __init__(self):
+        self.start: float | None = None
+        self.end: float | None = None
+
+    def sample(self, simulator):
+        pass
+
+    def flush(self):
+        self.end = time.perf_counter()
+
+
+@dataclass
+class EquivalenceResult:
+    config: SimulationConfig
+
+    # The first tick on which the engines did something different, None if they behaved identically
+    first_divergent_tick: int | None
+
+    # What each engine did on the first divergent tick: the sequence number its host returned, and its events
+    reference_events: List[str] | None
+    candidate_events: List[str] | None
+
+    # Best wall clock time of the tick loop of each engine, in seconds
+    reference_time: float
+    candidate_time: float
+
+    def identical(self) -> bool:
+        return self.first_divergent_tick is None
+
+    def speedup(self) -> float:
+        return self.reference_time / self.candidate_time if self.candidate_time else float("inf")
+
+
+"""
+Import an engine class given as "module:Class", e.g. "simulation.simulatorv2:SimulatorV2".
+"""
+def load_engine(name: str):
+    module_name, _, class_name = name.partition(":")
+    assert class_name, f"Engines are given as module:Class, got {name}"
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _run(config: SimulationConfig, engine, metrics):
+    context = SimulationContext.create(config.seed)
+    simulator = build_simulator(config, context, metrics=metrics, simulator_class=engine)
+    try:
+        simulator.run(duration=config.ticks)
+    except _Stop:
+        pass
+
+
+def _time_engine(config: SimulationConfig, engine, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        stopwatch = _Stopwatch()
+        simulator = build_simulator(config, SimulationContext.create(config.seed), metrics=stopwatch,
+                                    simulator_class=engine)
+        stopwatch.start = time.perf_counter()
+        simulator.run(duration=config.ticks)
+        best = min(best, stopwatch.end - stopwatch.start)
+    return best
+
+
+def check_equivalence(config: SimulationConfig, candidate, reference=SimulatorV2,
+                      repeats: int = 3) -> EquivalenceResult:
+    assert config.seed is not None, "Both engines need the same seed"
+
+    reference_hasher = EventStreamHasher()
+    _run(config, reference, reference_hasher)
+    candidate_hasher = EventStreamHasher(expected=reference_hasher.digests)
+    _run(config, candidate, candidate_hasher)
+    # A candidate that stopped early diverged on the tick after its last one
+    if candidate_hasher.first_divergent_tick is None and len(candidate_hasher.digests) < len(reference_hasher.digests):
+        candidate_hasher.first_divergent_tick = len(candidate_hasher.digests)
+
+    divergent_tick = candidate_hasher.first_divergent_tick
+    reference_events = candidate_events = None
+    if divergent_tick is not None:
+        capturing_reference = EventStreamHasher(capture_tick=divergent_tick)
+        _run(config, reference, capturing_reference)
+        capturing_candidate = EventStreamHasher(capture_tick=divergent_tick)
+        _run(config, candidate, capturing_candidate)
+        reference_events, candidate_events = capturing_reference.captured, capturing_candidate.captured
+
+    return EquivalenceResult(
+        config=config,
+        first_divergent_tick=divergent_tick,
+        reference_events=reference_events,
+        candidate_events=candidate_events,
+        reference_time=_time_engine(config, reference, repeats),
+        candidate_time=_time_engine(config, candidate, repeats),
+    )
+
+
+"""
+Draw `count` random configurations covering every host type and queue discipline, with and without loss, jitter and
+multi-hop paths.
+"""
+def random_configs(count: int, ticks: int, seed: int) -> List[SimulationConfig]:
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(count):
+        host_type = rng.choice(HOST_TYPES)
+        queue_discipline = rng.choice(QUEUE_DISCIPLINES)
+        hops = None
+        if rng.random() < 0.2:
+            hops = [Hop(capacity=rng.randint(1, 3), queue_limit=rng.choice([10, 50, 1000]),
+                        loss_ratio=rng.choice([0.0, 0.01]), prop_delay=rng.randint(0, 5),
+                        queue_discipline=queue_discipline)
+                    for _ in range(rng.randint(1, 4))]
+        configs.append(SimulationConfig(
+            host_type=host_type,
+            window_size=rng.choice([1, 5, 10, 20, 50, 100]) if host_type == "sliding-window" else None,
+            rtt_min=rng.randint(2, 50),
+            ticks=ticks,
+            loss_ratio=rng.choice([0.0, 0.0, 0.001, 0.01, 0.05]),
+            queue_limit=rng.choice([5, 20, 50, 1000000]),
+            queue_discipline=queue_discipline,
+            jitter=rng.choice([0, 0, 2]),
+            hops=hops,
+            seed=rng.randint(1, 99999),
+        ))
+    return configs
@@ -0,0 +1,354 @@
+import random
+import time
+from typing import List
+
+import numpy as np
+
+from simulation.batch import SimulationConfig, SimulationResult
+from util.rtt_sampler import EVERY_ACK, RttSampler
+
+"""
+Fluid Model Engine
+==================
+
+A fast approximation of SimulatorV2 for wide parameter sweeps. Instead of individual packets, it tracks amounts of
+traffic ("fluid") with difference equations stepped once per tick, and steps every configuration of a sweep at the
+same time as one NumPy array. The cost of a tick is a few dozen array operations whatever the number of
+configurations, so a sweep of hundreds of points takes about as long as a few packet-level runs.
+
+It takes the same SimulationConfig and returns the same SimulationResult as simulation/batch.py, for the
+"sliding-window" and "aimd" hosts on a single drop-tail link (no hops, pacing or jitter).
+
+The model follows the packet-level simulation as closely as fluid allows:
+ - Senders are ACK clocked: each tick they send new packets until int(window) unique packets are inflight.
+   AIMD grows its window by 1 per ACK in slow start, and by 1 / window per ACK after its first loss event.
+ - The link accepts packets until its queue reaches queue_limit and serves 1 packet per tick. Retransmissions get
+   the space first, since hosts retransmit before sending new packets. A packet at position j of the queue leaves the
+   link j - 1 ticks after it was queued, and its ACK is processed rtt_min ticks after that.
+ - Packets are lost on the link with probability loss_ratio.
+ - Packets time out timeout + 1 ticks after they are sent, where the timeout is the TimeoutCalculator's EWMA mean
+   + k * stddiv, backed off like RttSampler does. Lost packets are retransmitted when they time out. Packets whose
+   RTT is longer than that are retransmitted needlessly: the duplicate still uses the link, which is what drives
+   congestion collapse on long queues.
+ - RTT samples follow Karn's rule. In per-rtt mode a single packet is timed at a time, like RttSampler does: if it
+   is dropped, sampling stops until it is retransmitted, so the timeout keeps backing off. This is what drives
+   congestion collapse on short queues.
+ - Lost packets leave holes in the sequence, and the in-order sequence number stops at the oldest hole that hasn't
+   been filled by a retransmission yet. Holes are assumed to be filled in the order they were made.
+
+What fluid can't capture: queues are served in proportion to their mix of new, retransmitted and duplicate packets,
+random losses are spread evenly over time, and the hosts' own quirks aren't modeled. In particular the sliding window
+host stalls for good after its first retransmissions, which the model doesn't, so for that host the model only covers
+configurations where it never retransmits (see in_validity_range()): no random losses, and a window that fits in the
+queue and is ACKed before the minimum timeout. The congestion collapse region, past window sizes of about
+min_timeout - rtt_min or queue_limit, isn't covered, and run_fluid_batch() raises a ValueError for it rather than
+predicting the goodput of a host that keeps going. AIMD is modeled over its whole range, to within 0.11 packets per
+tick on the sweeps of run_fluid_validation.py, which shows how far the model is from SimulatorV2.
+
+To find holes, the model keeps the number of holes and of packets sent for the last max_timeout + rtt_min ticks of
+every configuration, and the oldest hole still open from before them, so its memory doesn't grow with the number of
+ticks.
+"""
+
+FLUID_HOST_TYPES = ["sliding-window", "aimd"]
+
+# Link capacity in packets per tick
+_CAPACITY = 1.0
+# Timeout calculator parameters used by simulation/batch.py's build_timeout_calculator()
+_ALPHA = 0.125
+_BETA = 0.25
+_K = 4.0
+# Amount of timed out fluid that counts as a timeout of one packet
+_TIMEOUT_THRESHOLD = 1.0
+# Amount of unfilled holes that counts as a missing packet
+_HOLE_THRESHOLD = 0.5
+
+
+def _check_supported(config: SimulationConfig):
+    if config.host_type not in FLUID_HOST_TYPES:
+        raise ValueError(f"The fluid model supports the {FLUID_HOST_TYPES} hosts, not {config.host_type}")
+    if config.host_type == "sliding-window" and config.window_size is None:
+        raise ValueError("The sliding window host needs a window size")
+    if config.hops or config.pacing or config.pacing_rate is not None or config.jitter:
+        raise ValueError("The fluid model only supports a single link without pacing or jitter")
+    if config.queue_discipline != "drop-tail":
+        raise ValueError("The fluid model only supports drop-tail queues")
+
+
+"""
+Whether the fluid model is valid for the configuration. AIMD always is. The sliding window host stalls after its first
+retransmission, which the model doesn't, so it's only valid when the host never retransmits: without random losses,
+with a first window that fits in the link's queue, and with a first window that is ACKed before the minimum timeout.
+The last packet of the first window waits behind the rest of it, and SimulatorV2 retransmits it once
+rtt_min + window_size > min_timeout + 2.
+"""
+def in_validity_range(config: SimulationConfig) -> bool:
+    if config.host_type == "aimd":
+        return True
+    return (config.loss_ratio == 0 and config.window_size <= config.queue_limit
+            and config.rtt_min + config.window_size <= config.min_timeout + 2)
+
+
+"""
+Number of packets ACKed in order, given the number of holes and of new packets sent before each of the ticks in the
+ring, in tick order and ending with the state after the last tick, and the number of packets sent before the first of
+them. The in-order sequence number stops at the oldest hole still open, i.e. the first tick by which there were more
+holes than have been filled.
+"""
+def _in_order(holes_by_tick: np.ndarray, sent_by_tick: np.ndarray, sent_before: float, acked: float,
+              repaired: float) -> float:
+    oldest_hole = np.searchsorted(holes_by_tick, repaired + _HOLE_THRESHOLD, side="right")
+    if oldest_hole == len(holes_by_tick):
+        return acked
+    return min(acked, sent_by_tick[oldest_hole - 1] if oldest_hole else sent_before)
+
+
+"""
+Run every configuration with the fluid model, and return the results in the same order.
+All configurations are stepped together, for as many ticks as the longest one asks for. Raises a ValueError if any of
+them is unsupported or outside of the model's validity range.
+"""
+def run_fluid_batch(configs: List[SimulationConfig]) -> List[SimulationResult]:
+    if not configs:
+        return []
+    for config in configs:
+        _check_supported(config)
+        if not in_validity_range(config):
+            raise ValueError(f"The fluid model isn't valid for {config}, see in_validity_range()")
+    start = time.perf_counter()
+
+    n = len(configs)
+    columns = np.arange(n)
+    ticks = np.array([config.ticks for config in configs])
+    rtt_min = np.array([config.rtt_min for config in configs], dtype=np.int64)
+    queue_limit = np.array([config.queue_limit for config in configs], dtype=np.float64)
+    loss_ratio = np.array([config.loss_ratio for config in configs], dtype=np.float64)
+    min_timeout = np.array([config.min_timeout for config in configs], dtype=np.float64)
+    max_timeout = np.array([config.max_timeout for config in configs], dtype=np.float64)
+    every_ack = np.array([config.rtt_sample_mode == EVERY_ACK for config in configs])
+    aimd = np.array([config.host_type == "aimd" for config in configs])
+    window = np.array([1.0 if config.host_type == "aimd" else float(config.window_size) for config in configs])
+    slow_start = aimd.copy()
+
+    # Packets that have been sent and not ACKed yet, including lost ones
+    inflight = np.zeros(n)
+    # The link queue, split into packets sent for the first time, retransmissions (or packets that will be
+    # retransmitted needlessly) whose ACK still counts, and duplicates whose ACK doesn't. Retransmissions of lost
+    # packets are also counted in queue_repair, since their ACKs fill holes in the sequence.
+    queue_fresh, queue_retransmitted, queue_duplicate = np.zeros(n), np.zeros(n), np.zeros(n)
+    queue_repair = np.zeros(n)
+    acked = np.zeros(n)
+    # Holes left by lost packets, and how many of them have been filled since. Holes are assumed to be filled in the
+    # order they were made.
+    holes, repaired = np.zeros(n), np.zeros(n)
+    sent = np.zeros(n)
+
+    # ACK delay lines, indexed by tick modulo their length
+    ack_length = int(rtt_min.max()) + 1
+    acks_fresh = np.zeros((ack_length, n))
+    acks_retransmitted = np.zeros((ack_length, n))
+    acks_repair = np.zeros((ack_length, n))
+    ack_rtt = np.zeros((ack_length, n))
+    # Timeout delay lines: lost packets to retransmit, and packets to retransmit needlessly
+    timeout_length = int(min(max_timeout.max(), ticks.max())) + 2
+    timeouts_lost = np.zeros((timeout_length, n))
+    timeouts_spurious = np.zeros((timeout_length, n))
+    # Number of holes and of new packets sent before each tick, to find where the oldest open hole is. Holes are
+    # usually filled within a timeout and an RTT, so only that many of the latest ticks are kept, indexed by tick modulo
+    # the length of the ring. Rows leaving the ring are checked for holes that are still open: the oldest of them is
+    # kept, with the number of packets sent before it, until it is filled.
+    history_length = min(int(ticks.max()) + 1, timeout_length + ack_length)
+    hole_history = np.zeros((history_length, n))
+    sent_history = np.zeros((history_length, n))
+    evicted_sent = np.zeros(n)
+    old_hole = np.zeros(n, dtype=bool)
+    old_hole_level, old_hole_sent = np.zeros(n), np.zeros(n)
+
+    # Timeout calculator and sampler state
+    has_estimate = np.zeros(n, dtype=bool)
+    mean, stddiv = np.zeros(n), np.zeros(n)
+    backoff = np.ones(n)
+    pending_timeouts = np.zeros(n)
+    loss_event_tick = np.full(n, -1)
+    # per-rtt mode times one packet at a time: the tick its ACK will be sampled on (or -1 if it won't be), its RTT,
+    # and the tick it will be retransmitted on instead. Random losses of timed packets are spread out by error
+    # diffusion: every timed packet adds loss_ratio to the credit, and the one that takes it over 1 is lost.
+    timing = np.zeros(n, dtype=bool)
+    timed_sample_tick, timed_clear_tick = np.full(n, -1), np.full(n, -1)
+    timed_rtt, timed_loss_credit = np.zeros(n), np.zeros(n)
+
+    # Results are read out when each configuration reaches its own number of ticks
+    final_in_order = np.zeros(n)
+
+    for tick in range(int(ticks.max())):
+        # STEP 1 - ACKs
+        slot = tick % ack_length
+        fresh = acks_fresh[slot].copy()
+        unique = fresh + acks_retransmitted[slot]
+        rtt = ack_rtt[slot].copy()
+        acks_fresh[slot] = 0
+        acks_retransmitted[slot] = 0
+        repaired += acks_repair[slot]
+        acks_repair[slot] = 0
+        inflight -= unique
+        acked += unique
+
+        # RTT samples follow Karn's rule, so they only come from packets that were sent once
+        timed_sampled = timing & (timed_sample_tick == tick)
+        timing &= ~timed_sampled & (timed_clear_tick != tick)
+        samples = np.where(every_ack, fresh, timed_sampled)
+        rtt = np.where(every_ack, rtt, timed_rtt)
+        sampled = samples > 1e-9
+        first = sampled & ~has_estimate
+        mean = np.where(first, rtt, mean)
+        stddiv = np.where(first, rtt / 2.0, stddiv)
+        update = sampled & has_estimate
+        mean_step = 1.0 - (1.0 - _ALPHA) ** samples
+        deviation_step = 1.0 - (1.0 - _BETA) ** samples
+        new_mean = mean + mean_step * (rtt - mean)
+        stddiv = np.where(update, stddiv + deviation_step * (np.abs(rtt - new_mean) - stddiv), stddiv)
+        mean = np.where(update, new_mean, mean)
+        has_estimate |= sampled
+        backoff = np.where(sampled, 1.0, backoff)
+
+        # AIMD grows its window on every unique ACK
+        growth = np.where(slow_start, unique, unique / window)
+        window = np.where(aimd, window + growth, window)
+
+        # STEP 2 - Timeouts
+        timeout = np.where(has_estimate, np.clip(mean + _K * stddiv, min_timeout, max_timeout), min_timeout)
+        timeout = np.floor(np.minimum(timeout * backoff, max_timeout))
+
+        slot = tick % timeout_length
+        retransmit = timeouts_lost[slot].copy()
+        duplicate = timeouts_spurious[slot].copy()
+        timeouts_lost[slot] = 0
+        timeouts_spurious[slot] = 0
+        pending_timeouts += retransmit + duplicate
+        timed_out = pending_timeouts >= _TIMEOUT_THRESHOLD
+        pending_timeouts = np.where(timed_out, 0.0, pending_timeouts)
+        # The sliding window host backs off on every tick with timeouts, AIMD once per loss event
+        new_loss_event = timed_out & (tick - timeout >= loss_event_tick)
+        backoff_now = np.where(aimd, new_loss_event, timed_out)
+        backoff = np.where(backoff_now, np.minimum(backoff * 2, RttSampler.MAX_BACKOFF), backoff)
+        shrink = aimd & new_loss_event
+        window = np.where(shrink, np.maximum(window / 2, 1.0), window)
+        slow_start &= ~shrink
+        loss_event_tick = np.where(new_loss_event, tick, loss_event_tick)
+
+        # STEP 3 - New packets
+        new = np.maximum(np.floor(window) - inflight, 0.0)
+        inflight += new
+        sent += new
+
+        # The link queue accepts packets until it is full. Hosts retransmit before they send new packets, so
+        # retransmissions get the space first.
+        queued = queue_fresh + queue_retransmitted + queue_duplicate
+        space = np.maximum(queue_limit - queued, 0.0)
+        retransmitting = retransmit + duplicate
+        retransmit_share = np.where(retransmitting > 0, np.minimum(1.0, space / np.maximum(retransmitting, 1e-12)), 1.0)
+        space = np.maximum(space - retransmitting * retransmit_share, 0.0)
+        new_share = np.where(new > 0, np.minimum(1.0, space / np.maximum(new, 1e-12)), 1.0)
+        accepted_new = new * new_share
+        accepted_retransmit = retransmit * retransmit_share
+        accepted_duplicate = duplicate * retransmit_share
+        accepted = accepted_new + accepted_retransmit + accepted_duplicate
+        accepted_unique = accepted_new + accepted_retransmit
+        dropped_unique = new + retransmit - accepted_unique
+        # Only losses of new packets make new holes, losing a retransmission leaves its hole open
+        holes += new - accepted_new + accepted_new * loss_ratio
+
+        # Packets at queue position j leave the link j - 1 ticks from now. Those whose RTT will be over the timeout
+        # + 1 are retransmitted needlessly, from the threshold position onwards
+        threshold = timeout + 2 - rtt_min
+        late_share = np.where(
+            accepted > 0,
+            np.clip((queued + accepted - np.maximum(queued, threshold)) / np.maximum(accepted, 1e-12), 0.0, 1.0),
+            0.0,
+        )
+        # Every unique packet that will be lost or is late times out
+        lost_later = accepted_unique * loss_ratio
+        late = accepted_unique * (1 - loss_ratio) * late_share
+        timeout_slot = (tick + timeout.astype(np.int64) + 1) % timeout_length
+        schedulable = timeout + 1 < timeout_length
+        timeouts_lost[timeout_slot, columns] += np.where(schedulable, dropped_unique + lost_later, 0.0)
+        timeouts_spurious[timeout_slot, columns] += np.where(schedulable, late, 0.0)
+
+        # per-rtt mode starts timing the first new packet, which waits behind the queue and this tick's retransmissions
+        position = queued + accepted_retransmit + accepted_duplicate
+        start_timing = ~every_ack & ~timing & (new > 0)
+        timed_loss_credit += np.where(start_timing, loss_ratio, 0.0)
+        timed_lost = start_timing & (timed_loss_credit >= 1.0)
+        timed_loss_credit -= timed_lost
+        timed_delivered = (queue_limit - position >= _HOLE_THRESHOLD) & (position < threshold) & ~timed_lost
+        timing |= start_timing
+        timed_rtt = np.where(start_timing, rtt_min + position, timed_rtt)
+        timed_sample_tick = np.where(start_timing, np.where(timed_delivered, tick + rtt_min + position, -1),
+                                     timed_sample_tick).astype(np.int64)
+        timed_clear_tick = np.where(start_timing, np.where(timed_delivered, -1, tick + timeout + 1),
+                                    timed_clear_tick).astype(np.int64)
+
+        queue_fresh += accepted_new * (1 - late_share)
+        queue_retransmitted += accepted_unique - accepted_new * (1 - late_share)
+        queue_repair += accepted_retransmit
+        queue_duplicate += accepted_duplicate
+
+        # STEP 4 - The link serves the queue, in proportion to its mix of packets
+        queued = queue_fresh + queue_retransmitted + queue_duplicate
+        served = np.minimum(queued, _CAPACITY)
+        served_share = np.where(queued > 0, served / np.maximum(queued, 1e-12), 0.0)
+        served_fresh = queue_fresh * served_share
+        served_retransmitted = queue_retransmitted * served_share
+        served_repair = queue_repair * served_share
+        queue_fresh -= served_fresh
+        queue_repair -= served_repair
+        queue_retransmitted -= served_retransmitted
+        queue_duplicate -= queue_duplicate * served_share
+
+        slot = (tick + rtt_min) % ack_length
+        acks_fresh[slot, columns] += served_fresh * (1 - loss_ratio)
+        acks_retransmitted[slot, columns] += served_retransmitted * (1 - loss_ratio)
+        acks_repair[slot, columns] += served_repair * (1 - loss_ratio)
+        # The packets served now waited behind roughly the rest of the queue
+        ack_rtt[slot, columns] = rtt_min + np.maximum(queued - _CAPACITY, 0.0) / _CAPACITY
+
+        row = (tick + 1) % history_length
+        if tick + 1 >= history_length:
+            old_hole &= old_hole_level > repaired + _HOLE_THRESHOLD
+            new_old_hole = ~old_hole & (hole_history[row] > repaired + _HOLE_THRESHOLD)
+            old_hole_level = np.where(new_old_hole, hole_history[row], old_hole_level)
+            old_hole_sent = np.where(new_old_hole, evicted_sent, old_hole_sent)
+            old_hole |= new_old_hole
+            evicted_sent = sent_history[row].copy()
+        hole_history[row] = holes
+        sent_history[row] = sent
+
+        finishing = np.flatnonzero(ticks == tick + 1)
+        if len(finishing):
+            # The rows of the ring in tick order, up to the state after this tick
+            rows = np.arange(max(tick + 2 - history_length, 0), tick + 2) % history_length
+            for index in finishing:
+                if old_hole[index]:
+                    final_in_order[index] = min(acked[index], old_hole_sent[index])
+                else:
+                    final_in_order[index] = _in_order(hole_history[rows, index], sent_history[rows, index],
+                                                      evicted_sent[index], acked[index], repaired[index])
+
+    wall_time = (time.perf_counter() - start) / n
+    results = []
+    for index, config in enumerate(configs):
+        max_seq = int(np.floor(final_in_order[index] + 1e-6)) - 1
+        results.append(SimulationResult(
+            config=config,
+            # The model is deterministic, the seed is only reported like simulation/batch.py does
+            seed=config.seed if config.seed is not None else random.randint(1, 99999),
+            max_in_order_received_sequence_number=max_seq,
+            goodput=(max_seq + 1) / config.ticks if config.ticks else 0.0,
+            wall_time=wall_time,
+            event_count=0,
+        ))
+    return results
+
+
+def run_fluid_simulation(config: SimulationConfig) -> SimulationResult:
+    return run_fluid_batch([config])[0]
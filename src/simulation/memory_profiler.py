@@ -0,0 +1,188 @@
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+"""
+Memory Profiler
+===============
+
+Attributes the memory growth of long simulation runs to the simulator's components.
+
+Like the metrics collector, the simulator calls sample() after every tick, and a disabled profiler is simply None, so
+it costs nothing. Every `interval` ticks the profiler records:
+ - the memory traced by tracemalloc (which the profiler starts, unless it was already tracing)
+ - the number of objects and bytes reachable from each component: the host, the link (or multi-hop path), the delay
+   box, the logger, the network interface and its buffers, and the metrics collector. An object reachable from several
+   components is counted once, for the first component in COMPONENTS order, so shared objects like the clock (which
+   isn't counted at all) don't inflate every component.
+ - a tracemalloc snapshot. Only the first and the latest snapshots are kept, to find the source lines that allocated
+   the growth.
+
+report() then ranks the components by how fast they grew, and lists the source lines with the most growth.
+
+Walking the objects reachable from a component takes time proportional to their number, e.g. a link queue holding
+a million packets, and tracemalloc slows every allocation down while it is tracing. Pick an interval large enough for
+the snapshots to be rare.
+"""
+
+# Components are measured in this order. The network interface comes before the host, so the host, which keeps a
+# reference to it, isn't charged for its buffers.
+COMPONENTS = ["logger", "network_interface", "link", "path", "delay_box", "metrics", "host"]
+
+# Objects that are part of the program rather than of the simulation's state, and aren't followed
+_SKIPPED_TYPES = (type, type(sys), type(len), type(lambda: None))
+
+
+@dataclass
+class ComponentSize:
+    objects: int
+    bytes: int
+
+
+@dataclass
+class MemorySample:
+    tick: int
+
+    # Memory currently allocated by Python, as traced by tracemalloc
+    traced_bytes: int
+
+    # Objects reachable from each component, by component name
+    components: Dict[str, ComponentSize] = field(default_factory=dict)
+
+
+def _components(simulator) -> Dict[str, object]:
+    found = {
+        "logger": simulator.logger,
+        "network_interface": simulator.network_interface,
+        "link": simulator.link if simulator.path is None else None,
+        "path": simulator.path,
+        "delay_box": simulator.delay_box if simulator.path is None else None,
+        "metrics": simulator.metrics,
+        "host": simulator.host,
+    }
+    return {name: found[name] for name in COMPONENTS if found[name] is not None}
+
+
+"""
+Count the objects reachable from root that haven't been seen yet, and their total size. Marks them as seen.
+"""
+def _deep_size(root, seen: set) -> ComponentSize:
+    objects = size = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        objects += 1
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return ComponentSize(objects=objects, bytes=size)
+
+
+class MemoryProfiler:
+
+    def __init__(self, interval: int = 1000, frames: int = 1, top: int = 10):
+        assert interval >= 1
+        # Ticks between two samples
+        self.interval = interval
+        # Number of stack frames tracemalloc records per allocation
+        self.frames = frames
+        # Number of source lines listed in the report
+        self.top = top
+
+        self.samples: List[MemorySample] = []
+        self.first_snapshot: tracemalloc.Snapshot | None = None
+        self.last_snapshot: tracemalloc.Snapshot | None = None
+        # Whether we started tracemalloc, and so should stop it
+        self.started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.started_tracing = True
+
+    """
+    Called by the simulator after every tick. Only does any work every `interval` ticks.
+    """
+    def sample(self, simulator):
+        tick = simulator.clock.read_tick()
+        if tick % self.interval == 0:
+            self.__take_sample(simulator, tick)
+
+    """
+    Take a last sample at the end of the run, and stop tracemalloc if we started it.
+    """
+    def finish(self, simulator):
+        tick = simulator.clock.read_tick()
+        if not self.samples or self.samples[-1].tick != tick:
+            self.__take_sample(simulator, tick)
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def __take_sample(self, simulator, tick: int):
+        traced_bytes = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        sample = MemorySample(tick=tick, traced_bytes=traced_bytes)
+        # The simulator and its clock are shared by every component, and the profiler isn't part of the simulation
+        seen = {id(simulator), id(simulator.clock), id(self)}
+        for name, component in _components(simulator).items():
+            sample.components[name] = _deep_size(component, seen)
+        self.samples.append(sample)
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+            if self.first_snapshot is None:
+                self.first_snapshot = snapshot
+            else:
+                self.last_snapshot = snapshot
+
+    """
+    Least squares slope of a component's size over the samples, in bytes per tick.
+    """
+    def growth_rate(self, name: str) -> float:
+        points = [(sample.tick, sample.components[name].bytes) for sample in self.samples if name in sample.components]
+        if len(points) < 2:
+            return 0.0
+        mean_tick = sum(tick for tick, _ in points) / len(points)
+        mean_bytes = sum(size for _, size in points) / len(points)
+        variance = sum((tick - mean_tick) ** 2 for tick, _ in points)
+        if variance == 0:
+            return 0.0
+        return sum((tick - mean_tick) * (size - mean_bytes) for tick, size in points) / variance
+
+    def report(self) -> str:
+        if len(self.samples) < 2:
+            return "Not enough memory samples for a growth report, run for longer than the interval"
+
+        first, last = self.samples[0], self.samples[-1]
+        ticks = last.tick - first.tick
+        lines = [
+            f"Memory growth over ticks {first.tick} to {last.tick} ({len(self.samples)} samples)",
+            f"Traced memory: {first.traced_bytes / 1e6:.2f} MB -> {last.traced_bytes / 1e6:.2f} MB",
+            "",
+            f"{'Component':<18} {'First MB':>9} {'Last MB':>9} {'New objects':>12} {'Bytes/1000 ticks':>17}",
+        ]
+        names = [name for name in COMPONENTS if name in last.components]
+        rates = {name: self.growth_rate(name) for name in names}
+        for name in sorted(names, key=lambda name: rates[name], reverse=True):
+            start = first.components.get(name, ComponentSize(0, 0))
+            end = last.components[name]
+            lines.append(f"{name:<18} {start.bytes / 1e6:>9.2f} {end.bytes / 1e6:>9.2f} "
+                         f"{end.objects - start.objects:>+12} {rates[name] * 1000:>17.0f}")
+
+        leader = max(names, key=lambda name: rates[name])
+        if rates[leader] > 0:
+            growth = last.components[leader].bytes - first.components.get(leader, ComponentSize(0, 0)).bytes
+            lines += ["", f"Fastest growing component: {leader}, +{growth / 1e6:.2f} MB over {ticks} ticks"]
+
+        if self.first_snapshot is not None and self.last_snapshot is not None:
+            lines += ["", "Source lines with the most growth:"]
+            for stat in self.last_snapshot.compare_to(self.first_snapshot, "lineno")[:self.top]:
+                lines.append(f"  {stat}")
+        return "\n".join(lines)
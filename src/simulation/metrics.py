@@ -0,0 +1,191 @@
+import csv
+from array import array
+from typing import Dict, List
+
+"""
+Metrics
+=======
+
+A streaming time-series collector for simulation runs.
+
+The simulator calls sample() once per tick. Gauges (queue depths, inflight count, timeout) are averaged and counters
+(delivered packets, transmissions, retransmissions) are summed over a bucket of ticks. When a bucket closes, one value
+per series is written into a fixed-size buffer, so memory stays constant regardless of how long the simulation runs.
+The timeout is the one the host uses, i.e. its RttSampler's, backoff included.
+
+Transmissions and retransmissions are stored as counts per bucket, and the retransmission rate is derived from them
+when the series are read, so that it stays exact when buckets are merged.
+
+When the buffer is full there are two options:
+ - downsample (default): adjacent buckets are merged pairwise and the bucket width doubles. The series always covers
+   the whole run, at a resolution that gets coarser as the run gets longer.
+ - ring: the oldest bucket is overwritten. The series covers the most recent `capacity` buckets at full resolution.
+"""
+
+# Series stored per bucket: per-tick averages, which are merged by taking their mean, and counts, which are merged by
+# adding them up
+AVERAGED_SERIES = [
+    "link_queue_depth",
+    "delay_box_occupancy",
+    "inflight",
+    "goodput",
+    "timeout",
+]
+COUNTED_SERIES = [
+    "transmissions",
+    "retransmissions",
+]
+# Every series returned, including the ones derived from the stored series
+SERIES = AVERAGED_SERIES + COUNTED_SERIES + ["retransmission_rate"]
+
+
+class MetricsCollector:
+
+    def __init__(self, capacity: int = 1024, bucket_ticks: int = 1, downsample: bool = True):
+        assert capacity >= 2 and capacity % 2 == 0, "Capacity must be an even number of buckets"
+        assert bucket_ticks >= 1
+        self.capacity = capacity
+        self.bucket_ticks = bucket_ticks
+        self.downsample = downsample
+
+        # One fixed-size column per series, plus the first tick of each bucket
+        self.ticks = array('q', [0] * capacity)
+        self.columns: Dict[str, array] = {name: array('d', [0.0] * capacity)
+                                          for name in AVERAGED_SERIES + COUNTED_SERIES}
+        # Index of the oldest bucket, and the number of buckets stored
+        self.start = 0
+        self.size = 0
+
+        # Accumulators for the bucket currently being filled
+        self.__reset_bucket()
+
+        # Counter values at the previous sample, so we can compute per-tick deltas
+        self.last_max_seq = -1
+        self.last_transmitted = 0
+        self.last_retransmitted = 0
+
+    def __reset_bucket(self):
+        self.bucket_start_tick = None
+        self.bucket_samples = 0
+        self.sum_link_queue_depth = 0
+        self.sum_delay_box_occupancy = 0
+        self.sum_inflight = 0
+        self.sum_timeout = 0
+        self.delivered = 0
+        self.transmitted = 0
+        self.retransmitted = 0
+
+    """
+    Record the state of the simulator for the current tick.
+    This is called by the simulator after every tick.
+    """
+    def sample(self, simulator):
+        tick = simulator.clock.read_tick()
+        if self.bucket_start_tick is None:
+            self.bucket_start_tick = tick
+
+        host = simulator.host
+        network_interface = simulator.network_interface
+
+        self.bucket_samples += 1
+        # With a multi-hop path, sum over all of its hops
+        path = simulator.path
+        self.sum_link_queue_depth += (path or simulator.link).queue_depth()
+        self.sum_delay_box_occupancy += (path or simulator.delay_box).occupancy()
+        self.sum_inflight += host.inflight_count() or 0
+        # The timeout the host actually waits for, backoff included, if it samples RTTs with an RttSampler
+        rtt_sampler = getattr(host, "rtt_sampler", None)
+        timeout_calculator = getattr(host, "timeout_calculator", None)
+        if rtt_sampler is not None:
+            self.sum_timeout += rtt_sampler.timeout()
+        elif timeout_calculator is not None:
+            self.sum_timeout += timeout_calculator.timeout()
+
+        max_seq = simulator.max_in_order_received_sequence_number()
+        if max_seq is not None and max_seq > self.last_max_seq:
+            self.delivered += max_seq - self.last_max_seq
+            self.last_max_seq = max_seq
+        self.transmitted += network_interface.transmitted_count - self.last_transmitted
+        self.retransmitted += network_interface.retransmitted_count - self.last_retransmitted
+        self.last_transmitted = network_interface.transmitted_count
+        self.last_retransmitted = network_interface.retransmitted_count
+
+        if self.bucket_samples == self.bucket_ticks:
+            self.flush()
+
+    """
+    Close the bucket that is currently being filled, even if it isn't complete.
+    The simulator calls this at the end of the run so that the last few ticks aren't lost.
+    """
+    def flush(self):
+        if self.bucket_samples == 0:
+            return
+
+        if self.size == self.capacity:
+            # Only reachable in ring mode, since downsample mode merges as soon as the buffer fills up.
+            # Overwrite the oldest bucket.
+            self.start = (self.start + 1) % self.capacity
+            self.size -= 1
+
+        n = self.bucket_samples
+        index = (self.start + self.size) % self.capacity
+        self.ticks[index] = self.bucket_start_tick
+        self.columns["link_queue_depth"][index] = self.sum_link_queue_depth / n
+        self.columns["delay_box_occupancy"][index] = self.sum_delay_box_occupancy / n
+        self.columns["inflight"][index] = self.sum_inflight / n
+        self.columns["goodput"][index] = self.delivered / n
+        self.columns["timeout"][index] = self.sum_timeout / n
+        self.columns["transmissions"][index] = self.transmitted + self.retransmitted
+        self.columns["retransmissions"][index] = self.retransmitted
+        self.size += 1
+
+        if self.downsample and self.size == self.capacity:
+            # Merge straight away, so the next bucket is filled using the new width
+            self.__merge_buckets()
+
+        self.__reset_bucket()
+
+    def __merge_buckets(self):
+        # Merge each pair of adjacent buckets into one, in place. Buckets have equal widths, so the merged value of a
+        # per-tick average is the mean of the pair, and the merged value of a count is their sum.
+        # In downsample mode the buffer never wraps, so start is always 0.
+        half = self.capacity // 2
+        for i in range(half):
+            self.ticks[i] = self.ticks[2 * i]
+            for name, column in self.columns.items():
+                merged = column[2 * i] + column[2 * i + 1]
+                column[i] = merged if name in COUNTED_SERIES else merged / 2.0
+        self.size = half
+        self.bucket_ticks *= 2
+
+    def __indices(self) -> List[int]:
+        return [(self.start + i) % self.capacity for i in range(self.size)]
+
+    """
+    Return the collected series as plain lists, keyed by series name. The bucket start ticks are under "tick".
+    """
+    def to_dict(self) -> Dict[str, list]:
+        indices = self.__indices()
+        result = {"tick": [self.ticks[i] for i in indices]}
+        for name, column in self.columns.items():
+            result[name] = [column[i] for i in indices]
+        result["retransmission_rate"] = [retransmissions / transmissions if transmissions else 0.0
+                                         for transmissions, retransmissions
+                                         in zip(result["transmissions"], result["retransmissions"])]
+        return result
+
+    """
+    Return the collected series as NumPy arrays, keyed by series name. The bucket start ticks are under "tick".
+    """
+    def to_numpy(self) -> dict:
+        import numpy as np
+
+        return {name: np.asarray(values) for name, values in self.to_dict().items()}
+
+    def to_csv(self, path: str):
+        series = self.to_dict()
+        names = list(series.keys())
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(series[name] for name in names)))
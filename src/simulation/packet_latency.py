@@ -0,0 +1,43 @@
+import re
+from typing import Dict
+
+"""
+Packet Latency
+==============
+
+Helpers for the benchmark scripts, which compare hosts by the latency of their packets as recorded in the event log
+of a run (see SimulationConfig.keep_events in batch.py).
+"""
+
+_SEQUENCE_NUMBER = re.compile(r"Sequence number: (\d+)")
+
+
+"""
+Return the tick of the first event of the given type (e.g. "Transmit" or "Receive") for every sequence number that has
+one, keyed by sequence number.
+"""
+def first_event_ticks(events: list, event_type: str) -> Dict[int, int]:
+    first_ticks = {}
+    for event in events:
+        if event.type == event_type:
+            first_ticks.setdefault(int(_SEQUENCE_NUMBER.search(event.desc).group(1)), event.tick)
+    return first_ticks
+
+
+"""
+Return the latency of every packet that was delivered, in ticks and sorted: the time from the first transmission of its
+sequence number to the first delivery of its ACK back to the host.
+"""
+def packet_latencies(events: list) -> list:
+    first_transmit = first_event_ticks(events, "Transmit")
+    first_receive = first_event_ticks(events, "Receive")
+    return sorted(tick - first_transmit[seq] for seq, tick in first_receive.items() if seq in first_transmit)
+
+
+"""
+Return the p-quantile (0 <= p <= 1) of sorted values, or NaN if there are none.
+"""
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(p * len(values)))]
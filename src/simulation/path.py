@@ -0,0 +1,177 @@
+import heapq
+import random
+from dataclasses import dataclass
+from typing import List
+
+from network.link import Link
+from network.packet_ring import PacketRing
+from network.queue_discipline import make_queue_discipline
+from simulation.clock import Clock
+from simulation.delay_box import DelayBox
+from simulation.simulation_logger import SimulationLogger
+
+"""
+Multi-hop Path
+==============
+
+A path is a chain of hops between the sender's network interface and the receiver. Each hop is a Link (with its own
+capacity, queue limit, queue discipline and loss ratio) followed by a DelayBox (with its own propagation delay).
+The packets a hop's delay box delivers on a tick are handed to the next hop's link in one batch, on the same tick.
+
+A single hop with capacity 1 and a propagation delay of rtt_min - 1 behaves exactly like SimulatorV2's own link and
+delay box.
+
+Most hops are idle on most ticks, so the path only visits the hops that have work to do:
+ - hops whose link queue had packets on the last visit, which need to send packets on every tick
+ - hops whose delay box has packets due, which are woken up by a heap of (tick, hop) wake ups
+Hops are visited in path order, so a packet can cross several zero delay hops in a single tick. The cost of a tick is
+proportional to the number of busy hops and packets moved, not to the length of the path.
+"""
+
+
+@dataclass
+class Hop:
+    # Max. number of packets the hop's link sends per tick
+    capacity: int = 1
+
+    # Max size of the hop's link queue in packets
+    queue_limit: int = 1000000
+
+    # Probability of the hop's link losing each packet it sends
+    loss_ratio: float = 0.0
+
+    # Number of ticks packets take to get from this hop to the next one
+    prop_delay: int = 0
+
+    # Max. number of extra ticks of random delay added to each packet's propagation delay
+    jitter: int = 0
+
+    # How the hop's link queue drops packets, one of QUEUE_DISCIPLINES in network/queue_discipline.py
+    queue_discipline: str = "drop-tail"
+
+
+"""
+Parse a hop from a "capacity,queue_limit,loss_ratio,prop_delay" string, as used on the command line.
+"""
+def parse_hop(spec: str, queue_discipline: str = "drop-tail") -> Hop:
+    fields = spec.split(",")
+    if len(fields) != 4:
+        raise ValueError(f"Expected capacity,queue_limit,loss_ratio,prop_delay but got \"{spec}\"")
+    capacity, queue_limit, loss_ratio, prop_delay = fields
+    return Hop(
+        capacity=int(capacity),
+        queue_limit=int(queue_limit),
+        loss_ratio=float(loss_ratio),
+        prop_delay=int(prop_delay),
+        queue_discipline=queue_discipline,
+    )
+
+
+class Path:
+
+    def __init__(self, clock: Clock, hops: List[Hop], rng: random.Random = None, logger: SimulationLogger = None):
+        assert hops, "A path needs at least one hop"
+        self.clock = clock
+        self.hops = hops
+        self.links = [
+            Link(
+                loss_ratio=hop.loss_ratio,
+                queue_limit=hop.queue_limit,
+                clock=clock,
+                queue_discipline=make_queue_discipline(hop.queue_discipline, hop.queue_limit, rng=rng, logger=logger),
+                capacity=hop.capacity,
+                rng=rng,
+                logger=logger,
+            )
+            for hop in hops
+        ]
+        self.delay_boxes = [DelayBox(clock=clock, prop_delay=hop.prop_delay, jitter=hop.jitter, rng=rng)
+                            for hop in hops]
+
+        # Indices of the hops whose link has to be visited on the next tick
+        self.busy_links = set()
+        # Heap of (tick, hop index) on which a hop's delay box has packets due
+        self.wakeups = []
+        # Earliest tick each hop is scheduled to wake up on, so a hop is only in the heap once per due tick
+        self.scheduled = [None] * len(hops)
+
+        # Reusable buffers for packets going from a link to its delay box, and from one hop to the next
+        self.link_egress = PacketRing()
+        self.handoff = PacketRing()
+
+    """
+    Put the packets in the ring on the first hop's link, leaving the ring empty.
+    """
+    def enqueue_from(self, ring: PacketRing):
+        if ring:
+            self.links[0].enqueue_from(ring)
+            self.busy_links.add(0)
+
+    """
+    Run every hop with work to do on this tick, and append the packets that reach the end of the path to `sink`
+    (a list or PacketRing).
+    """
+    def drain_into(self, sink):
+        now = self.clock.read_tick()
+        to_visit = list(self.busy_links)
+        while self.wakeups and self.wakeups[0][0] <= now:
+            to_visit.append(heapq.heappop(self.wakeups)[1])
+        heapq.heapify(to_visit)
+
+        last_visited = None
+        while to_visit:
+            index = heapq.heappop(to_visit)
+            # A hop can be both busy and woken up, duplicates come out of the heap one after the other
+            if index == last_visited:
+                continue
+            last_visited = index
+            if self.__run_hop(index, now, sink):
+                heapq.heappush(to_visit, index + 1)
+
+    """
+    Move packets through one hop. Returns whether packets were handed to the next hop.
+    """
+    def __run_hop(self, index: int, now: int, sink) -> bool:
+        link = self.links[index]
+        delay_box = self.delay_boxes[index]
+
+        # Keep visiting the link until a visit finds its queue empty, so queue disciplines see the same sequence of
+        # dequeues as a link that runs on every tick
+        if link.queue_depth():
+            self.busy_links.add(index)
+        else:
+            self.busy_links.discard(index)
+        link.drain_into(self.link_egress)
+        delay_box.enqueue_from(self.link_egress)
+
+        is_last = index == len(self.links) - 1
+        delay_box.drain_into(sink if is_last else self.handoff)
+
+        next_delivery = delay_box.next_delivery_tick()
+        scheduled = self.scheduled[index]
+        if next_delivery is not None and (scheduled is None or scheduled <= now or next_delivery < scheduled):
+            heapq.heappush(self.wakeups, (next_delivery, index))
+            self.scheduled[index] = next_delivery
+
+        if not is_last and self.handoff:
+            self.links[index + 1].enqueue_from(self.handoff)
+            return True
+        return False
+
+    """
+    Number of packets waiting in the link queues of the whole path
+    """
+    def queue_depth(self) -> int:
+        return sum(link.queue_depth() for link in self.links)
+
+    """
+    Number of packets propagating between hops on the whole path
+    """
+    def occupancy(self) -> int:
+        return sum(delay_box.occupancy() for delay_box in self.delay_boxes)
+
+    """
+    Largest number of packets each hop's link queue has held, in path order
+    """
+    def peak_queue_depths(self) -> List[int]:
+        return [link.peak_queue_depth for link in self.links]
@@ -0,0 +1,148 @@
+import math
+import statistics
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, replace
+from statistics import NormalDist
+from typing import Dict, List
+
+from simulation.batch import SimulationConfig, SimulationResult, run_simulation
+
+"""
+Sequential Runner
+=================
+
+Runs the same configuration with one seed after another until the confidence interval on a result metric is
+narrower than a target width, instead of picking the number of seeds up front.
+
+Seeds are run on a pool of worker processes. Results are used strictly in seed order, so that a parallel run stops
+after the same seeds, with the same interval, as a sequential one: a run that finishes early waits until the runs of
+all lower seeds have been used, and the interval is re-checked after every result that is used. Deterministic
+configurations (e.g. zero loss) give the same result for every seed, so they stop as soon as min_runs results are in,
+while noisy configurations keep going until the interval is tight enough or max_runs is reached.
+"""
+
+METRICS = ["max_in_order_received_sequence_number", "goodput"]
+
+
+@dataclass
+class ConfidenceIntervalResult:
+    # The metric the interval was computed for, one of METRICS
+    metric: str
+
+    mean: float
+
+    # The interval is mean +/- half_width
+    half_width: float
+
+    confidence: float
+
+    # Whether the interval got narrower than the target before max_runs was reached
+    converged: bool
+
+    # Every run that was used, in seed order
+    results: List[SimulationResult]
+
+    def runs(self) -> int:
+        return len(self.results)
+
+    def low(self) -> float:
+        return self.mean - self.half_width
+
+    def high(self) -> float:
+        return self.mean + self.half_width
+
+
+"""
+Critical value of Student's t distribution for a two-sided interval with the given confidence.
+The standard library has no t distribution, so we use the exact closed forms for 1 and 2 degrees of freedom, and a
+Cornish-Fisher expansion around the normal quantile (accurate to about 3 significant figures) for the rest.
+"""
+def t_critical(degrees_of_freedom: int, confidence: float) -> float:
+    p = 1 - (1 - confidence) / 2
+    if degrees_of_freedom == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if degrees_of_freedom == 2:
+        return (2 * p - 1) * math.sqrt(2 / (4 * p * (1 - p)))
+
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    n = degrees_of_freedom
+    return z + g1 / n + g2 / n ** 2 + g3 / n ** 3 + g4 / n ** 4
+
+
+def confidence_half_width(values: List[float], confidence: float) -> float:
+    if len(values) < 2:
+        return math.inf
+    return t_critical(len(values) - 1, confidence) * statistics.stdev(values) / math.sqrt(len(values))
+
+
+"""
+Run `config` with seeds first_seed, first_seed + 1, ... until the confidence interval on `metric` is at most
+target_width wide (i.e. mean +/- target_width / 2), or max_runs seeds have been run.
+The seed in `config` is ignored.
+"""
+def run_until_confident(
+        config: SimulationConfig,
+        target_width: float,
+        metric: str = "max_in_order_received_sequence_number",
+        confidence: float = 0.95,
+        min_runs: int = 3,
+        max_runs: int = 100,
+        workers: int = 1,
+        first_seed: int = 1,
+) -> ConfidenceIntervalResult:
+    assert metric in METRICS, f"Unknown metric: {metric}"
+    assert 2 <= min_runs <= max_runs
+
+    results: List[SimulationResult] = []
+    values: List[float] = []
+    next_seed = first_seed
+
+    def done() -> bool:
+        return len(values) >= min_runs and 2 * confidence_half_width(values, confidence) <= target_width
+
+    if workers <= 1:
+        while len(results) < max_runs and not done():
+            result = run_simulation(replace(config, seed=next_seed))
+            next_seed += 1
+            results.append(result)
+            values.append(getattr(result, metric))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            # Results that finished before the runs of some lower seed, by seed
+            finished_by_seed: Dict[int, SimulationResult] = {}
+            while not done():
+                # Keep every worker busy, without launching more seeds than we could ever use
+                while len(pending) < workers and next_seed - first_seed < max_runs:
+                    pending.add(executor.submit(run_simulation, replace(config, seed=next_seed)))
+                    next_seed += 1
+                if not pending:
+                    break
+
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    finished_by_seed[result.seed] = result
+
+                # Use the results in seed order, re-checking the interval after each one like a sequential run does
+                while first_seed + len(results) in finished_by_seed and not done():
+                    result = finished_by_seed.pop(first_seed + len(results))
+                    results.append(result)
+                    values.append(getattr(result, metric))
+
+            # Runs still in flight aren't needed any more
+            for future in pending:
+                future.cancel()
+
+    return ConfidenceIntervalResult(
+        metric=metric,
+        mean=statistics.fmean(values),
+        half_width=confidence_half_width(values, confidence),
+        confidence=confidence,
+        converged=done(),
+        results=results,
+    )
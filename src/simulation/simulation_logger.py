@@ -21,17 +21,72 @@ class _Row:
     desc: str
 
 
-_events = []
-_clock: Clock | None = None
+"""
+A log of the events of one simulation, each stamped with the tick of the simulation's clock it happened on.
+
+Every simulation should log to its own logger (see simulation/context.py), so that several simulations can run in the
+same process at the same time. The module-level functions below log to a default logger shared by the whole process,
+for scripts that only ever run one simulation at a time.
+"""
+class SimulationLogger:
+
+    def __init__(self, clock: Clock | None = None):
+        self._events = []
+        self._clock = clock
+
+    def add_event(self, desc: str = "", type: str = ""):
+        self._events.append(_Row(tick=self._clock.read_tick(), type=type, desc=desc))
+
+    """
+    Log one event per packet with a single call, describing each packet by its sequence number.
+    If retransmit_type is given, it is used instead of type for packets with the retransmission flag set.
+    """
+    def add_packet_events(self, packets, type: str, retransmit_type: str | None = None):
+        if not packets:
+            return
+        tick = self._clock.read_tick()
+        append = self._events.append
+        for packet in packets:
+            event_type = retransmit_type if retransmit_type is not None and packet.retransmission_flag else type
+            append(_Row(tick=tick, type=event_type, desc=f"Sequence number: {packet.sequence_number}"))
+
+    """
+    Return the events logged so far
+    """
+    def events(self) -> list:
+        return self._events
+
+    def set_clock(self, clock: Clock | None):
+        self._clock = clock
+
+    def print_logs(self):
+        _print_events(self._events)
+
+    def clear(self):
+        self._events = []
+
+
+_default_logger = SimulationLogger()
+
+
+def default_logger() -> SimulationLogger:
+    return _default_logger
 
 
 def add_event(desc: str = "", type: str = ""):
-    _events.append(_Row(tick=_clock.read_tick(), type=type, desc=desc))
+    _default_logger.add_event(desc=desc, type=type)
+
+
+def add_packet_events(packets, type: str, retransmit_type: str | None = None):
+    _default_logger.add_packet_events(packets, type=type, retransmit_type=retransmit_type)
+
 
+def events() -> list:
+    return _default_logger.events()
 
-def set_clock(clock: Clock):
-    global _clock
-    _clock = clock
+
+def set_clock(clock: Clock | None):
+    _default_logger.set_clock(clock)
 
 
 def _print_line(items: list):
@@ -66,23 +121,26 @@ def _print_edge(col_sizes: _ColSizes):
     print("-" * (col_sizes.type + col_sizes.ticks + col_sizes.desc + 10))
 
 
-def print_logs():
+def _print_events(events: list):
     col_sizes = _ColSizes(
-        ticks=max(len(_ticks_head), len(str(_events[-1].tick))),
-        type=max(len(_event_type_head), len(max(_events, key=lambda e: len(e.type)).type)),
-        desc=max(len(_event_description_head), len(max(_events, key=lambda e: len(e.desc)).desc))
+        ticks=max(len(_ticks_head), len(str(events[-1].tick))),
+        type=max(len(_event_type_head), len(max(events, key=lambda e: len(e.type)).type)),
+        desc=max(len(_event_description_head), len(max(events, key=lambda e: len(e.desc)).desc))
     )
 
     print()
     _print_edge(col_sizes)
     _print_head(col_sizes)
     _print_seperator(col_sizes)
-    for event in _events:
+    for event in events:
         _print_row(col_sizes, event.type, event.tick, event.desc)
     _print_edge(col_sizes)
     print()
 
 
+def print_logs():
+    _default_logger.print_logs()
+
+
 def clear():
-    global _events
-    _events = []
+    _default_logger.clear()
@@ -1,8 +1,18 @@
+import random
+from typing import List
+
 from host.host import Host
 from network.link import Link
+from network.queue_discipline import make_queue_discipline
 from network.network_interface import NetworkInterface
+from network.packet_ring import PacketRing
 from simulation.clock import Clock
 from simulation.delay_box import DelayBox
+from simulation.memory_profiler import MemoryProfiler
+from simulation.metrics import MetricsCollector
+from simulation.path import Hop, Path
+from simulation import simulation_logger as log
+from simulation.simulation_logger import SimulationLogger
 
 """
 Simulator
@@ -16,6 +26,17 @@ On each tick, we do the following:
 3. Flush packets from the network card to the link
 4. Flush the link to the delay box
 5. Flush the delay box to the network card ingress buffer
+6. If a metrics collector was given, sample the state of the simulation
+7. If a memory profiler was given, let it sample the memory used by the simulation (see memory_profiler.py)
+
+If a list of hops is given, steps 3 to 5 go through a multi-hop Path (see path.py) instead, and loss_ratio,
+queue_limit, rtt_min, jitter and queue_discipline are ignored in favour of each hop's own settings.
+
+Packets are handed between stages through reusable PacketRings, so a tick doesn't allocate any lists.
+
+Random losses and jitter are drawn from `rng`, and the network's events are logged to `logger`. Give each simulation
+its own (see simulation/context.py) to run several in one process at the same time. They default to the global random
+module and the process-wide logger.
 """
 class SimulatorV2:
     def __init__(
@@ -26,34 +47,73 @@ class SimulatorV2:
             loss_ratio: float,
             queue_limit: int,
             rtt_min: int,
+            jitter: int = 0,
+            queue_discipline: str = "drop-tail",
+            metrics: MetricsCollector | None = None,
+            hops: List[Hop] | None = None,
+            rng: random.Random = None,
+            logger: SimulationLogger = None,
+            memory_profiler: MemoryProfiler | None = None,
     ):
         self.network_interface = network_interface
         self.host = host
-        self.delay_box = DelayBox(clock=clock, prop_delay=rtt_min - 1)
-        self.link = Link(loss_ratio=loss_ratio, queue_limit=queue_limit)
+        self.delay_box = DelayBox(clock=clock, prop_delay=rtt_min - 1, jitter=jitter, rng=rng)
+        self.link = Link(
+            loss_ratio=loss_ratio,
+            queue_limit=queue_limit,
+            clock=clock,
+            queue_discipline=make_queue_discipline(queue_discipline, queue_limit, rng=rng, logger=logger),
+            rng=rng,
+            logger=logger,
+        )
+        self.path = Path(clock=clock, hops=hops, rng=rng, logger=logger) if hops else None
+        # If the network interface records latency stats, the links record how long packets spend in their queues
+        if network_interface.latency_stats is not None:
+            for link in self.path.links if self.path is not None else [self.link]:
+                link.queue_time_histogram = network_interface.latency_stats.queue_time
         self.clock = clock
         self.max_usable_seq_num = 0
+        self.metrics = metrics
+        self.memory_profiler = memory_profiler
+        self.logger = logger or log.default_logger()
+        # Reusable buffers for packets entering and leaving the link
+        self.link_ingress = PacketRing()
+        self.link_egress = PacketRing()
 
     def __run_tick(self):
         # First, run the host
         self.max_usable_seq_num = self.host.run_one_tick()
 
         # Move packets from host to link
-        host_packets = self.network_interface.pull_packets_from_network_interface()
-        self.link.enqueue(host_packets)
+        self.network_interface.drain_into(self.link_ingress)
+        if self.path is not None:
+            # Move packets along the path, and from its last hop to host
+            self.path.enqueue_from(self.link_ingress)
+            self.path.drain_into(self.network_interface.receive_buffer)
+            return
+        self.link.enqueue_from(self.link_ingress)
 
         # Move packets from link to delay box
-        link_packets = self.link.dequeue()
-        self.delay_box.enqueue(link_packets)
+        self.link.drain_into(self.link_egress)
+        self.delay_box.enqueue_from(self.link_egress)
 
         # Move packets from delay box to host
-        delay_box_packets = self.delay_box.dequeue()
-        self.network_interface.push_packets_to_network_interface(delay_box_packets)
+        self.delay_box.drain_into(self.network_interface.receive_buffer)
 
     def run(self, duration: int):
+        if self.memory_profiler is not None:
+            self.memory_profiler.start()
         for tick in range(0, duration):
             self.clock.set_tick(tick)
             self.__run_tick()
+            if self.metrics is not None:
+                self.metrics.sample(self)
+            if self.memory_profiler is not None:
+                self.memory_profiler.sample(self)
+        if self.metrics is not None:
+            self.metrics.flush()
+        if self.memory_profiler is not None:
+            self.memory_profiler.finish(self)
         self.host.shutdown_hook()
 
     def max_in_order_received_sequence_number(self):
@@ -0,0 +1,161 @@
+import mmap
+import struct
+import sys
+from array import array
+from typing import Iterator
+
+from network.packet import Packet
+
+"""
+RTT / Loss Traces
+=================
+
+A trace is the sequence of decisions the network made for each packet that left the Link: whether the packet was
+lost, and if not, how long the DelayBox delayed it. Recording a trace from one run and replaying it in another gives
+both runs exactly the same loss pattern and delays, without drawing any random numbers.
+
+File format
+-----------
+A 16 byte header (the magic b"SIMTRACE", a format version and the byte order), followed by one unsigned 32 bit
+record per packet, in the order the packets left the link:
+ - the top bit is set if the packet was lost
+ - the other 31 bits are the delay in ticks (0 for lost packets)
+
+Records are written in the machine's native byte order, so replay can index straight into the memory-mapped file
+without unpacking anything. Traces are read through mmap, so even multi-gigabyte traces are only paged in as
+they are replayed.
+"""
+
+MAGIC = b"SIMTRACE"
+VERSION = 1
+_HEADER = struct.Struct("<8sHH4x")
+_LOST_BIT = 1 << 31
+_DELAY_MASK = _LOST_BIT - 1
+_BYTE_ORDERS = {"little": 0, "big": 1}
+
+
+class TraceRecorder:
+    # Number of records to buffer before writing them to the file
+    BUFFER_RECORDS = 1 << 16
+
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(MAGIC, VERSION, _BYTE_ORDERS[sys.byteorder]))
+        self.buffer = array("I")
+        assert self.buffer.itemsize == 4
+        self.records = 0
+
+    def __append(self, record: int):
+        self.buffer.append(record)
+        self.records += 1
+        if len(self.buffer) >= self.BUFFER_RECORDS:
+            self.flush()
+
+    def record(self, lost: bool, delay: int = 0):
+        assert 0 <= delay <= _DELAY_MASK
+        self.__append(_LOST_BIT if lost else delay)
+
+    """
+    Make the simulator's link and delay box report their decisions to this recorder.
+    The decisions themselves are still made the usual way (randomly, or by any loss_fn / delay_fn already set).
+    """
+    def attach(self, simulator):
+        assert simulator.path is None, "Traces record a single link and delay box, multi-hop paths aren't supported"
+        link = simulator.link
+        delay_box = simulator.delay_box
+        decide_loss = link.loss_fn or link.random_loss
+        decide_delay = delay_box.delay_fn or delay_box.default_delay
+
+        def recording_loss(packet: Packet) -> bool:
+            lost = decide_loss(packet)
+            if lost:
+                self.record(lost=True)
+            return lost
+
+        def recording_delay(packet: Packet) -> int:
+            delay = decide_delay(packet)
+            self.record(lost=False, delay=delay)
+            return delay
+
+        link.loss_fn = recording_loss
+        delay_box.delay_fn = recording_delay
+
+    def flush(self):
+        self.buffer.tofile(self.file)
+        del self.buffer[:]
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class TraceReplay:
+
+    def __init__(self, path: str, loop: bool = True):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byte_order = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} simulation trace")
+        if byte_order != _BYTE_ORDERS[sys.byteorder]:
+            raise ValueError(f"{path} was recorded on a machine with a different byte order")
+
+        # Index the records directly in the mapped file
+        self.records = memoryview(self.map)[_HEADER.size:].cast("I")
+        if len(self.records) == 0:
+            raise ValueError(f"{path} has no records")
+        # When the trace runs out, start again from the beginning, otherwise raise an error
+        self.loop = loop
+        self.position = 0
+        # Delay decided along with the last loss decision, returned by the next call to delay()
+        self.pending_delay = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def next_record(self) -> tuple[bool, int]:
+        if self.position == len(self.records):
+            if not self.loop:
+                raise EOFError("The trace has no more records")
+            self.position = 0
+        record = self.records[self.position]
+        self.position += 1
+        return record >= _LOST_BIT, record & _DELAY_MASK
+
+    def loss(self, packet: Packet) -> bool:
+        lost, self.pending_delay = self.next_record()
+        return lost
+
+    def delay(self, packet: Packet) -> int:
+        if self.pending_delay is None:
+            # The delay box was used without the link, just take the next delivered packet's delay
+            lost, delay = self.next_record()
+            while lost:
+                lost, delay = self.next_record()
+            return delay
+        delay, self.pending_delay = self.pending_delay, None
+        return delay
+
+    """
+    Make the simulator's link and delay box take their decisions from this trace.
+    """
+    def attach(self, simulator):
+        assert simulator.path is None, "Traces replay a single link and delay box, multi-hop paths aren't supported"
+        simulator.link.loss_fn = self.loss
+        simulator.delay_box.delay_fn = self.delay
+
+    """
+    Yield the (packet index, RTT) of every delivered packet, e.g. to replay the trace through a timeout calculator like
+    run_timeout_simulation.py does. The packet index is the packet's position in the trace, i.e. the order it left the
+    link in, counting lost packets. Traces don't record when packets were sent, so it isn't a tick. Each packet's RTT is
+    its delay plus the one tick it spends on the link, which is how SimulatorV2 derives the DelayBox delay from rtt_min.
+    """
+    def rtts(self) -> Iterator[tuple[int, int]]:
+        for packet_index, record in enumerate(self.records):
+            if record < _LOST_BIT:
+                yield packet_index, record + 1
+
+    def close(self):
+        self.records.release()
+        self.map.close()
+        self.file.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulator's modules are imported from src/, like the run_*.py scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+import random
+
+from network.packet import Packet
+from simulation.clock import Clock
+from simulation.delay_box import DelayBox
+
+
+def started_clock() -> Clock:
+    clock = Clock()
+    clock.set_tick(0)
+    return clock
+
+
+def run_until_empty(clock: Clock, delay_box: DelayBox) -> dict:
+    delivered = {}
+    while delay_box.occupancy():
+        clock.set_tick(clock.read_tick() + 1)
+        for packet in delay_box.dequeue():
+            delivered[packet.sequence_number] = clock.read_tick()
+    return delivered
+
+
+def test_jittered_packets_are_delivered_on_their_own_tick():
+    clock = started_clock()
+    delay_box = DelayBox(clock, prop_delay=5, jitter=10, rng=random.Random(3))
+    # Draw the same delays the box will, to know when each packet is due
+    expected_delays = random.Random(3)
+    packets = [Packet(sent_timestamp=0, sequence_number=sequence_number) for sequence_number in range(200)]
+    delay_box.enqueue(packets)
+    due = {packet.sequence_number: 5 + expected_delays.randint(0, 10) for packet in packets}
+
+    assert run_until_empty(clock, delay_box) == due
+    # Jitter reorders packets, a later packet can overtake an earlier one
+    assert any(due[sequence_number] > due[sequence_number + 1] for sequence_number in range(199))
+
+
+def test_packets_due_on_the_same_tick_keep_their_order():
+    clock = started_clock()
+    # Every packet gets a delay of 1 or 2, so many share a delivery tick
+    delay_box = DelayBox(clock, prop_delay=1, jitter=1, rng=random.Random(8))
+    delay_box.enqueue([Packet(sent_timestamp=0, sequence_number=sequence_number) for sequence_number in range(50)])
+
+    delivered = []
+    while delay_box.occupancy():
+        clock.set_tick(clock.read_tick() + 1)
+        delivered.append([packet.sequence_number for packet in delay_box.dequeue()])
+    assert len(delivered) == 2
+    for batch in delivered:
+        assert batch == sorted(batch)
+
+
+def test_delay_fn_overrides_the_propagation_delay():
+    clock = started_clock()
+    delay_box = DelayBox(clock, prop_delay=100, jitter=5, delay_fn=lambda packet: 10 - packet.sequence_number)
+    delay_box.enqueue([Packet(sent_timestamp=0, sequence_number=sequence_number) for sequence_number in range(10)])
+
+    assert delay_box.next_delivery_tick() == 1
+    assert run_until_empty(clock, delay_box) == {sequence_number: 10 - sequence_number for sequence_number in range(10)}
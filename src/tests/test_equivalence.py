@@ -0,0 +1,41 @@
+from simulation.batch import SimulationConfig
+from simulation.equivalence import check_equivalence
+from simulation.simulatorv2 import SimulatorV2
+
+CONFIG = SimulationConfig(host_type="sliding-window", window_size=20, rtt_min=10, ticks=300, seed=5)
+
+# The tick from which DroppingSimulator's link loses every packet
+DROP_TICK = 100
+
+
+class DroppingSimulator(SimulatorV2):
+    # Behaves like SimulatorV2 until DROP_TICK, then its link loses everything
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.link.loss_fn = lambda packet: self.clock.read_tick() >= DROP_TICK
+
+
+class ShortSimulator(SimulatorV2):
+    # Stops 10 ticks early
+    def run(self, duration: int):
+        super().run(duration - 10)
+
+
+def test_identical_engines_do_not_diverge():
+    result = check_equivalence(CONFIG, SimulatorV2, repeats=1)
+    assert result.identical()
+    assert result.reference_events is None and result.candidate_events is None
+
+
+def test_a_diverging_engine_is_flagged_on_the_tick_it_diverges():
+    result = check_equivalence(CONFIG, DroppingSimulator, repeats=1)
+    assert not result.identical()
+    # With a window of 20 and an RTT of 10, the link sends a packet on every tick, so the first loss is on DROP_TICK
+    assert result.first_divergent_tick == DROP_TICK
+    assert "Randomly dropping data in network" not in " ".join(result.reference_events)
+    assert "Randomly dropping data in network" in " ".join(result.candidate_events)
+
+
+def test_an_engine_that_stops_early_diverges_after_its_last_tick():
+    result = check_equivalence(CONFIG, ShortSimulator, repeats=1)
+    assert result.first_divergent_tick == CONFIG.ticks - 10
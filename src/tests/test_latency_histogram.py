@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from util.latency_histogram import LatencyHistogram, PacketLatencyStats
+
+
+def test_every_value_falls_in_a_bucket_whose_bounds_contain_it():
+    histogram = LatencyHistogram(sub_bucket_bits=3, max_value=1 << 12)
+    previous_index = -1
+    for value in range(histogram.max_value + 1):
+        index = histogram.bucket_index(value)
+        # Buckets are contiguous: each value is in the same bucket as the one before it, or in the next one
+        assert index in (previous_index, previous_index + 1)
+        if index != previous_index and previous_index >= 0:
+            # ... and a new bucket starts right after the upper bound of the previous one
+            assert histogram.bucket_upper_bound(previous_index) == value - 1
+        assert value <= histogram.bucket_upper_bound(index)
+        previous_index = index
+    assert previous_index == len(histogram.counts) - 1
+
+
+def test_bucket_bounds_are_within_the_relative_error():
+    histogram = LatencyHistogram()
+    rng = random.Random(1)
+    for value in [0, 1, 127, 128, 129, 255, 256, 1000, 65535, 65536] + [rng.randrange(1 << 32) for _ in range(1000)]:
+        upper_bound = histogram.bucket_upper_bound(histogram.bucket_index(value))
+        if value < histogram.sub_bucket_count:
+            assert upper_bound == value
+        else:
+            assert value <= upper_bound <= value * (1 + 2 ** -(histogram.sub_bucket_bits - 1))
+
+
+def test_values_above_the_max_value_go_in_the_last_bucket():
+    histogram = LatencyHistogram(sub_bucket_bits=3, max_value=1 << 10)
+    histogram.record(1 << 20)
+    assert histogram.counts[-1] == 1
+    assert histogram.max == 1 << 20
+
+
+def test_percentiles_are_bucket_upper_bounds_capped_at_the_max():
+    histogram = LatencyHistogram(sub_bucket_bits=3)
+    for value in range(1, 101):
+        histogram.record(value)
+    assert histogram.value_at_percentile(0) == 1
+    assert histogram.value_at_percentile(5) == 5
+    # 50 falls in the bucket [48, 55]
+    assert histogram.value_at_percentile(50) == 55
+    # 99 falls in the bucket [96, 111], but nothing above 100 was recorded
+    assert histogram.value_at_percentile(99) == 100
+    assert histogram.value_at_percentile(100) == 100
+    assert histogram.mean() == 50.5
+    assert LatencyHistogram().value_at_percentile(50) is None
+
+
+def test_merging_is_the_same_as_recording_everything_in_one_histogram():
+    rng = random.Random(2)
+    values = [rng.randrange(10000) for _ in range(2000)]
+    combined = LatencyHistogram()
+    parts = [LatencyHistogram() for _ in range(3)]
+    for i, value in enumerate(values):
+        combined.record(value)
+        parts[i % 3].record(value)
+
+    merged = LatencyHistogram()
+    merged.merge(LatencyHistogram())
+    for part in parts:
+        merged.merge(part)
+    assert merged.counts == combined.counts
+    assert (merged.total, merged.sum, merged.min, merged.max) == (combined.total, combined.sum, combined.min,
+                                                                  combined.max)
+    assert merged.summary() == combined.summary()
+
+
+def test_only_histograms_with_the_same_settings_merge():
+    with pytest.raises(AssertionError):
+        LatencyHistogram(sub_bucket_bits=7).merge(LatencyHistogram(sub_bucket_bits=5))
+
+
+def test_merged_packet_latency_stats():
+    first, second = PacketLatencyStats(), PacketLatencyStats()
+    first.ack_latency.record(10)
+    second.ack_latency.record(30)
+    second.retransmissions.record(2)
+
+    merged = PacketLatencyStats.merged([first, second])
+    assert merged is not first and merged is not second
+    assert (merged.ack_latency.total, merged.ack_latency.min, merged.ack_latency.max) == (2, 10, 30)
+    assert merged.retransmissions.total == 1 and merged.queue_time.total == 0
+    # The runs' own stats are left alone
+    assert first.ack_latency.total == 1
+    assert PacketLatencyStats.merged([]).ack_latency.total == 0
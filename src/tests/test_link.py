@@ -0,0 +1,26 @@
+from network.link import Link
+from network.queue_discipline import DRR, QUEUE_DISCIPLINES, RED, CoDel, DropTail, make_queue_discipline
+from simulation.clock import Clock
+
+EXPECTED_QUEUE_TYPES = {
+    "drop-tail": DropTail,
+    "red": RED,
+    "codel": CoDel,
+    "drr": DRR,
+}
+
+
+def test_every_discipline_has_an_expected_type():
+    assert set(EXPECTED_QUEUE_TYPES) == set(QUEUE_DISCIPLINES)
+
+
+def test_link_uses_the_discipline_it_was_given():
+    # A new discipline is empty, and so falsy, which must not make the link fall back to drop-tail
+    for name in QUEUE_DISCIPLINES:
+        link = Link(loss_ratio=0.0, queue_limit=10, clock=Clock(), queue_discipline=make_queue_discipline(name, 10))
+        assert type(link.link_queue) is EXPECTED_QUEUE_TYPES[name], name
+
+
+def test_link_defaults_to_drop_tail():
+    link = Link(loss_ratio=0.0, queue_limit=10, clock=Clock())
+    assert type(link.link_queue) is DropTail
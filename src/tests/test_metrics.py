@@ -0,0 +1,35 @@
+from simulation.batch import SimulationConfig, build_simulator
+from simulation.context import SimulationContext
+from simulation.metrics import MetricsCollector
+
+
+def run_with_metrics(config: SimulationConfig, metrics: MetricsCollector):
+    simulator = build_simulator(config, SimulationContext.create(config.seed), metrics=metrics)
+    simulator.run(duration=config.ticks)
+    return simulator
+
+
+def test_downsampled_retransmission_rate_is_derived_from_counts():
+    config = SimulationConfig(host_type="aimd", rtt_min=10, ticks=1000, loss_ratio=0.05, queue_limit=20, seed=2)
+    metrics = MetricsCollector(capacity=8)
+    simulator = run_with_metrics(config, metrics)
+    series = metrics.to_dict()
+
+    network_interface = simulator.network_interface
+    assert sum(series["transmissions"]) == network_interface.transmitted_count + network_interface.retransmitted_count
+    assert sum(series["retransmissions"]) == network_interface.retransmitted_count
+    for transmissions, retransmissions, rate in zip(series["transmissions"], series["retransmissions"],
+                                                    series["retransmission_rate"]):
+        assert rate == (retransmissions / transmissions if transmissions else 0.0)
+
+
+def test_timeout_series_includes_backoff():
+    # Every packet is lost, so the host keeps backing off its timeout
+    config = SimulationConfig(host_type="sliding-window", window_size=1, rtt_min=10, ticks=2000, loss_ratio=1.0,
+                              min_timeout=100, max_timeout=10000, seed=1)
+    metrics = MetricsCollector(capacity=4096)
+    simulator = run_with_metrics(config, metrics)
+    timeouts = metrics.to_dict()["timeout"]
+
+    assert timeouts[-1] == simulator.host.rtt_sampler.timeout()
+    assert timeouts[-1] > simulator.host.timeout_calculator.timeout()
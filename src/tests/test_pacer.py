@@ -0,0 +1,28 @@
+from network.pacer import TokenBucketPacer
+from network.packet import Packet
+from network.packet_ring import PacketRing
+from simulation.batch import SimulationConfig, run_simulation
+
+
+def test_packets_are_stamped_when_the_pacer_releases_them():
+    pacer = TokenBucketPacer(rate=0.5)
+    pending, released = PacketRing(), PacketRing()
+    pending.extend(Packet(sent_timestamp=0, sequence_number=i) for i in range(3))
+
+    release_ticks = {}
+    for tick in range(6):
+        pacer.release_into(pending, released, tick)
+        while released:
+            packet = released.popleft()
+            assert not packet.awaiting_release
+            release_ticks[packet.sequence_number] = packet.sent_timestamp
+        # Packets that are still waiting haven't been sent, and are left alone until they are released
+        assert all(packet.awaiting_release and packet.sent_timestamp == 0 for packet in pacer.release_queue)
+    assert release_ticks == {0: 0, 1: 2, 2: 4}
+
+
+def test_time_in_the_pacer_does_not_cause_timeouts():
+    config = SimulationConfig(host_type="sliding-window", window_size=50, rtt_min=10, ticks=3000, pacing_rate=0.5,
+                              seed=3)
+    # The pacer releases one packet every other tick, and nothing else limits the host
+    assert run_simulation(config).max_in_order_received_sequence_number >= 1450
@@ -0,0 +1,62 @@
+from network.packet import Packet
+from network.packet_ring import PacketRing
+
+
+def packets(first: int, count: int) -> list:
+    return [Packet(sent_timestamp=0, sequence_number=sequence_number) for sequence_number in range(first, first + count)]
+
+
+def sequence_numbers(ring: PacketRing) -> list:
+    return [packet.sequence_number for packet in ring]
+
+
+def test_capacity_rounds_up_to_a_power_of_two():
+    assert len(PacketRing(5).slots) == 8
+    assert len(PacketRing(8).slots) == 8
+    assert len(PacketRing(0).slots) == 1
+
+
+def test_wraps_around_without_growing():
+    ring = PacketRing(4)
+    next_in, next_out = 0, 0
+    # Keep the ring between 1 and 4 packets, so the head moves all the way around it several times
+    for _ in range(10):
+        for packet in packets(next_in, 3):
+            ring.append(packet)
+        next_in += 3
+        for _ in range(3):
+            assert ring.popleft().sequence_number == next_out
+            next_out += 1
+    assert len(ring.slots) == 4
+    assert len(ring) == 0
+
+
+def test_grows_when_full_and_keeps_the_order():
+    ring = PacketRing(4)
+    ring.extend(packets(0, 3))
+    # Move the head off index 0 so the ring has wrapped when it grows
+    ring.popleft()
+    ring.popleft()
+    ring.extend(packets(3, 10))
+    assert len(ring.slots) == 16
+    assert len(ring) == 11
+    assert sequence_numbers(ring) == list(range(2, 13))
+
+
+def test_popleft_releases_the_slot():
+    ring = PacketRing(4)
+    ring.extend(packets(0, 2))
+    ring.popleft()
+    assert all(slot is None or slot.sequence_number == 1 for slot in ring.slots)
+
+
+def test_drain_into_moves_everything_in_order():
+    ring, other, listed = PacketRing(2), PacketRing(2), []
+    ring.extend(packets(0, 5))
+    other.extend(packets(100, 1))
+    ring.drain_into(other)
+    assert len(ring) == 0
+    assert sequence_numbers(other) == [100, 0, 1, 2, 3, 4]
+    other.drain_into_list(listed)
+    assert [packet.sequence_number for packet in listed] == [100, 0, 1, 2, 3, 4]
+    assert not other
@@ -0,0 +1,25 @@
+from dataclasses import replace
+
+import pytest
+
+from network.queue_discipline import QUEUE_DISCIPLINES
+from simulation.batch import SimulationConfig, build_simulator
+from simulation.context import SimulationContext
+from simulation.equivalence import EventStreamHasher
+from simulation.path import Hop
+
+
+def event_stream_digests(config: SimulationConfig):
+    hasher = EventStreamHasher()
+    build_simulator(config, SimulationContext.create(config.seed), metrics=hasher).run(duration=config.ticks)
+    return hasher.digests
+
+
+@pytest.mark.parametrize("queue_discipline", QUEUE_DISCIPLINES)
+@pytest.mark.parametrize("host_type", ["sliding-window", "aimd", "stop-and-wait"])
+def test_single_hop_path_matches_the_built_in_link(host_type, queue_discipline):
+    config = SimulationConfig(host_type=host_type, window_size=30, rtt_min=10, ticks=1500, loss_ratio=0.01,
+                              queue_limit=20, queue_discipline=queue_discipline, seed=4)
+    # A hop's propagation delay is the DelayBox delay, which the built-in link derives as rtt_min - 1
+    hop = Hop(capacity=1, queue_limit=20, loss_ratio=0.01, prop_delay=9, queue_discipline=queue_discipline)
+    assert event_stream_digests(replace(config, hops=[hop])) == event_stream_digests(config)
@@ -0,0 +1,27 @@
+import random
+
+import pytest
+
+from util.quantile_timeout_calculator import QuantileTimeoutCalculator
+
+
+def test_default_window_gives_each_sketch_enough_samples():
+    assert QuantileTimeoutCalculator(quantile=0.99).window // 2 >= 100
+    assert QuantileTimeoutCalculator(quantile=0.9).window // 2 >= 10
+
+
+def test_window_too_small_for_the_quantile_is_rejected():
+    with pytest.raises(AssertionError):
+        QuantileTimeoutCalculator(quantile=0.99, window=100)
+
+
+def test_estimate_tracks_the_quantile_rather_than_the_max():
+    rng = random.Random(1)
+    samples = [rng.uniform(0, 1000) for _ in range(5000)]
+    calculator = QuantileTimeoutCalculator(quantile=0.99)
+    for sample in samples:
+        calculator.add_data_point(sample)
+    estimate = calculator.quantile_estimate()
+    # A sketch that falls back to its max returns one of the samples, the P-Square middle marker is interpolated
+    assert estimate not in samples
+    assert 975 < estimate < 997
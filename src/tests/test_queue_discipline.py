@@ -0,0 +1,91 @@
+from network.packet import Packet
+from network.queue_discipline import DRR
+from simulation.clock import Clock
+from simulation.simulation_logger import SimulationLogger
+
+
+def drr(queue_limit: int, quantum: int = 1) -> DRR:
+    clock = Clock()
+    clock.set_tick(0)
+    return DRR(queue_limit, quantum=quantum, logger=SimulationLogger(clock))
+
+
+def enqueue(queue: DRR, flow_id: int, count: int, first_sequence_number: int = 0) -> list:
+    return [queue.enqueue(Packet(sent_timestamp=0, sequence_number=first_sequence_number + i, flow_id=flow_id), 0)
+            for i in range(count)]
+
+
+def drain(queue: DRR) -> list:
+    packets = []
+    while (packet := queue.dequeue(0)) is not None:
+        packets.append((packet.flow_id, packet.sequence_number))
+    return packets
+
+
+def test_backlogged_flows_take_turns():
+    queue = drr(queue_limit=100)
+    enqueue(queue, flow_id=1, count=4)
+    enqueue(queue, flow_id=2, count=4)
+    assert [flow_id for flow_id, _ in drain(queue)] == [1, 2, 1, 2, 1, 2, 1, 2]
+
+
+def test_quantum_is_the_number_of_packets_per_turn():
+    queue = drr(queue_limit=100, quantum=2)
+    enqueue(queue, flow_id=1, count=4)
+    enqueue(queue, flow_id=2, count=4)
+    assert [flow_id for flow_id, _ in drain(queue)] == [1, 1, 2, 2, 1, 1, 2, 2]
+
+
+def test_a_heavy_flow_does_not_delay_a_light_one():
+    queue = drr(queue_limit=100)
+    enqueue(queue, flow_id=1, count=50)
+    enqueue(queue, flow_id=2, count=3)
+    # The light flow gets every other slot, rather than waiting behind the 50 packets of the heavy one
+    packets = drain(queue)
+    assert packets[:6] == [(1, 0), (2, 0), (1, 1), (2, 1), (1, 2), (2, 2)]
+    # Each flow's packets still leave in order
+    assert [sequence_number for flow_id, sequence_number in packets if flow_id == 1] == list(range(50))
+
+
+def test_flows_that_become_active_wait_for_their_turn_at_the_back():
+    queue = drr(queue_limit=100)
+    enqueue(queue, flow_id=1, count=3)
+    enqueue(queue, flow_id=2, count=3)
+    assert queue.dequeue(0).flow_id == 1
+    enqueue(queue, flow_id=3, count=3)
+    assert [flow_id for flow_id, _ in drain(queue)] == [2, 1, 3, 2, 1, 3, 2, 3]
+
+
+def test_a_full_queue_drops_from_the_longest_flow():
+    queue = drr(queue_limit=10)
+    assert all(enqueue(queue, flow_id=1, count=10))
+    # The heavy flow already has the most packets queued, so it loses its new packet
+    assert enqueue(queue, flow_id=1, count=1, first_sequence_number=10) == [False]
+    # A light flow's packet is accepted, and the heavy flow loses its oldest one to make room
+    assert enqueue(queue, flow_id=2, count=2) == [True, True]
+    assert len(queue) == 10
+    packets = drain(queue)
+    assert packets[:4] == [(1, 2), (2, 0), (1, 3), (2, 1)]
+    assert len(packets) == 10
+
+
+def test_flows_share_a_full_queue_evenly():
+    queue = drr(queue_limit=12)
+    # Three flows keep the queue full, and the longest flow always loses
+    for sequence_number in range(20):
+        for flow_id in (1, 2, 3):
+            enqueue(queue, flow_id=flow_id, count=1, first_sequence_number=sequence_number)
+    flow_ids = [flow_id for flow_id, _ in drain(queue)]
+    assert sorted(flow_ids.count(flow_id) for flow_id in (1, 2, 3)) == [4, 4, 4]
+
+
+def test_a_flow_emptied_by_overflow_drops_is_skipped():
+    queue = drr(queue_limit=2)
+    enqueue(queue, flow_id=1, count=1)
+    enqueue(queue, flow_id=2, count=1)
+    # Flow 1 and flow 2 are tied for the longest, so one of them loses its only packet to flow 3
+    assert enqueue(queue, flow_id=3, count=1) == [True]
+    assert len(queue) == 2
+    packets = drain(queue)
+    assert len(packets) == 2 and packets[-1] == (3, 0)
+    assert queue.dequeue(0) is None and len(queue) == 0
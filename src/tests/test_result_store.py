@@ -0,0 +1,80 @@
+import numpy as np
+
+from util.result_store import ResultStore
+
+
+def sweep_store(path) -> ResultStore:
+    store = ResultStore(str(path))
+    store.append({
+        "window_size": [10, 50, 100, 150],
+        "queue_limit": [50, 50, 50, 50],
+        "goodput": [0.9, 0.95, 0.2, 0.1],
+    }, labels={"code_version": "old"})
+    store.append({
+        "window_size": [10, 50, 100, 150],
+        "queue_limit": [1000, 1000, 1000, 1000],
+        "goodput": [0.99, 0.99, 0.98, 0.5],
+    }, labels={"code_version": "new"})
+    return store
+
+
+def test_query_filters_by_value_list_and_function(tmp_path):
+    store = sweep_store(tmp_path)
+
+    result = store.query(["window_size", "goodput"], queue_limit=50)
+    assert result["window_size"].tolist() == [10, 50, 100, 150]
+    assert result["goodput"].tolist() == [0.9, 0.95, 0.2, 0.1]
+
+    result = store.query(["goodput"], window_size=[10, 150])
+    assert result["goodput"].tolist() == [0.9, 0.1, 0.99, 0.5]
+
+    # Filters combine, and rows come back in the order they were appended
+    result = store.query(["queue_limit", "window_size"], window_size=lambda window: window >= 100,
+                         goodput=lambda goodput: goodput > 0.15)
+    assert result["queue_limit"].tolist() == [50, 1000, 1000]
+    assert result["window_size"].tolist() == [100, 100, 150]
+
+
+def test_query_selects_chunks_by_label(tmp_path):
+    store = sweep_store(tmp_path)
+    result = store.query(["goodput"], labels={"code_version": "new"}, window_size=100)
+    assert result["goodput"].tolist() == [0.98]
+    assert store.query(["goodput"], labels={"code_version": "missing"})["goodput"].size == 0
+
+
+def test_query_skips_chunks_without_the_columns(tmp_path):
+    store = sweep_store(tmp_path)
+    store.append({"window_size": [10], "loss_ratio": [0.01]})
+
+    # The sweep chunks don't have loss_ratio, and the last chunk doesn't have goodput
+    assert store.query(["goodput"], loss_ratio=0.01)["goodput"].size == 0
+    assert store.query(["window_size"], loss_ratio=0.01)["window_size"].tolist() == [10]
+    assert store.query(["goodput"], window_size=10)["goodput"].tolist() == [0.9, 0.99]
+
+    # Without columns, every column of the selected chunks is returned
+    assert set(store.query(window_size=10)) == {"window_size", "queue_limit", "goodput", "loss_ratio"}
+
+
+def test_query_returns_copies(tmp_path):
+    store = sweep_store(tmp_path)
+    goodput = store.query(["goodput"], queue_limit=50)["goodput"]
+    assert not isinstance(goodput, np.memmap)
+    goodput[:] = 0
+    assert store.query(["goodput"], queue_limit=50)["goodput"].tolist() == [0.9, 0.95, 0.2, 0.1]
+
+
+def test_a_reopened_store_sees_the_appended_chunks(tmp_path):
+    sweep_store(tmp_path)
+    ResultStore(str(tmp_path)).append({"window_size": [300], "host": ["aimd"]}, labels={"code_version": "new"})
+
+    store = ResultStore(str(tmp_path))
+    assert [chunk.labels["code_version"] for chunk in store.chunks] == ["old", "new", "new"]
+    assert store.query(["host"], window_size=300)["host"].tolist() == ["aimd"]
+    assert store.query(["window_size"], host="aimd")["window_size"].tolist() == [300]
+
+
+def test_an_unreadable_index_gives_an_empty_store(tmp_path):
+    (tmp_path / "index.json").write_text("{not json")
+    store = ResultStore(str(tmp_path))
+    assert store.chunks == []
+    assert store.query(["goodput"])["goodput"].size == 0
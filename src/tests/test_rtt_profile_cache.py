@@ -0,0 +1,76 @@
+import json
+
+from util.rtt_profile_cache import RttProfileCache
+
+
+class FakeClock:
+
+    def __init__(self, now: float = 1000.0):
+        self.time = now
+
+    def __call__(self) -> float:
+        return self.time
+
+
+def test_stale_profiles_are_evicted_on_lookup(tmp_path):
+    clock = FakeClock()
+    cache = RttProfileCache(str(tmp_path / "cache.json"), max_age=100, now=clock)
+    assert cache.store(20, 0.0, 50, mean=21.0, stddiv=2.0, samples=50)
+    clock.time += 100
+    assert cache.lookup(20, 0.0, 50).mean == 21.0
+    clock.time += 1
+    assert cache.lookup(20, 0.0, 50) is None
+    assert not cache.profiles
+
+
+def test_least_recently_updated_profiles_are_evicted(tmp_path):
+    clock = FakeClock()
+    cache = RttProfileCache(str(tmp_path / "cache.json"), max_entries=2, now=clock)
+    for rtt_min in (10, 20, 30):
+        cache.store(rtt_min, 0.0, 50, mean=float(rtt_min), stddiv=1.0, samples=50)
+        clock.time += 1
+    assert cache.lookup(10, 0.0, 50) is None
+    assert cache.lookup(20, 0.0, 50) is not None
+    assert cache.lookup(30, 0.0, 50) is not None
+
+
+def test_unconverged_profiles_are_not_stored(tmp_path):
+    cache = RttProfileCache(str(tmp_path / "cache.json"))
+    assert not cache.store(20, 0.0, 50, mean=21.0, stddiv=2.0, samples=RttProfileCache.MIN_SAMPLES - 1)
+    assert not cache.store(20, 0.0, 50, mean=None, stddiv=None, samples=100)
+    assert cache.lookup(20, 0.0, 50) is None
+
+
+def test_stale_profiles_are_dropped_when_loading(tmp_path):
+    path = str(tmp_path / "cache.json")
+    clock = FakeClock()
+    cache = RttProfileCache(path, max_age=100, now=clock)
+    cache.store(20, 0.0, 50, mean=21.0, stddiv=2.0, samples=50)
+    clock.time += 50
+    cache.store(50, 0.0, 50, mean=51.0, stddiv=2.0, samples=50)
+    cache.save()
+
+    clock.time += 60
+    reloaded = RttProfileCache(path, max_age=100, now=clock)
+    assert list(reloaded.profiles) == [RttProfileCache.key(50, 0.0, 50)]
+
+
+def test_save_keeps_the_newest_profile_of_each_path(tmp_path):
+    path = str(tmp_path / "cache.json")
+    clock = FakeClock()
+    first = RttProfileCache(path, now=clock)
+    second = RttProfileCache(path, now=clock)
+    first.store(20, 0.0, 50, mean=21.0, stddiv=2.0, samples=50)
+    clock.time += 1
+    second.store(20, 0.0, 50, mean=25.0, stddiv=3.0, samples=50)
+    second.store(50, 0.0, 50, mean=51.0, stddiv=2.0, samples=50)
+    second.save()
+    # The older profile of the first cache doesn't overwrite the second's
+    first.save()
+
+    with open(path) as file:
+        profiles = json.load(file)["profiles"]
+    assert profiles[RttProfileCache.key(20, 0.0, 50)]["mean"] == 25.0
+    assert RttProfileCache.key(50, 0.0, 50) in profiles
+    # Keys are normalized, so an integer and a float rtt_min share a profile
+    assert RttProfileCache(path, now=clock).lookup(20.0, 0, 50).mean == 25.0
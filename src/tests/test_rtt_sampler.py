@@ -0,0 +1,75 @@
+from network.packet import Packet
+from simulation.batch import build_timeout_calculator
+from util.rtt_sampler import EVERY_ACK, PER_RTT, RttSampler
+
+
+def sampler(mode: str = PER_RTT, min_timeout: int = 100, max_timeout: int = 10000) -> RttSampler:
+    return RttSampler(build_timeout_calculator(min_timeout, max_timeout), mode=mode)
+
+
+def packet(sequence_number: int, sent_timestamp: int = 0, retransmission: bool = False) -> Packet:
+    return Packet(sent_timestamp=sent_timestamp, sequence_number=sequence_number, retransmission_flag=retransmission)
+
+
+def test_per_rtt_times_one_packet_at_a_time():
+    rtt_sampler = sampler(PER_RTT)
+    first, second = packet(0), packet(1)
+    rtt_sampler.on_transmit(first)
+    rtt_sampler.on_transmit(second)
+    rtt_sampler.on_ack(first, 10)
+    rtt_sampler.on_ack(second, 11)
+    assert rtt_sampler.samples == 1
+    assert rtt_sampler.timeout_calculator.mean_estimate() == 10
+
+
+def test_per_rtt_stops_timing_a_retransmitted_packet():
+    rtt_sampler = sampler(PER_RTT)
+    original = packet(0)
+    rtt_sampler.on_transmit(original)
+    rtt_sampler.on_transmit(packet(0, sent_timestamp=200, retransmission=True))
+    # The ACK is ambiguous, so it isn't a sample
+    rtt_sampler.on_ack(original, 210)
+    assert rtt_sampler.samples == 0
+    # The next new packet is timed instead
+    following = packet(1, sent_timestamp=210)
+    rtt_sampler.on_transmit(following)
+    rtt_sampler.on_ack(following, 222)
+    assert rtt_sampler.samples == 1
+    assert rtt_sampler.timeout_calculator.mean_estimate() == 12
+
+
+def test_every_ack_skips_retransmitted_sequence_numbers():
+    rtt_sampler = sampler(EVERY_ACK)
+    packets = [packet(sequence_number) for sequence_number in range(3)]
+    for each in packets:
+        rtt_sampler.on_transmit(each)
+    rtt_sampler.on_transmit(packet(1, sent_timestamp=150, retransmission=True))
+    for each in packets:
+        rtt_sampler.on_ack(each, 10)
+    assert rtt_sampler.samples == 2
+    # Once ACKed, the sequence number is forgotten
+    assert not rtt_sampler.retransmitted
+
+
+def test_timeouts_back_off_up_to_the_max_timeout():
+    rtt_sampler = sampler(min_timeout=100, max_timeout=1000)
+    assert rtt_sampler.timeout() == 100
+    expected = [200, 400, 800, 1000, 1000]
+    for timeout in expected:
+        rtt_sampler.on_timeout()
+        assert rtt_sampler.timeout() == timeout
+    for _ in range(10):
+        rtt_sampler.on_timeout()
+    assert rtt_sampler.backoff == RttSampler.MAX_BACKOFF
+
+
+def test_a_valid_sample_resets_the_backoff():
+    rtt_sampler = sampler(min_timeout=100)
+    rtt_sampler.on_timeout()
+    rtt_sampler.on_timeout()
+    assert rtt_sampler.timeout() == 400
+    timed = packet(5, sent_timestamp=1000)
+    rtt_sampler.on_transmit(timed)
+    rtt_sampler.on_ack(timed, 1010)
+    assert rtt_sampler.backoff == 1
+    assert rtt_sampler.timeout() == 100
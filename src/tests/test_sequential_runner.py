@@ -0,0 +1,14 @@
+from simulation.batch import SimulationConfig
+from simulation.sequential_runner import run_until_confident
+
+
+def test_parallel_runs_match_sequential_runs():
+    config = SimulationConfig(host_type="sliding-window", window_size=5, rtt_min=5, ticks=300, loss_ratio=0.1)
+    # Converges after 5 seeds, while 3 workers have already started on seeds 6 and 7
+    sequential = run_until_confident(config, target_width=20, min_runs=3, max_runs=8)
+    parallel = run_until_confident(config, target_width=20, min_runs=3, max_runs=8, workers=3)
+
+    assert sequential.converged and sequential.runs() == 5
+    assert [result.seed for result in parallel.results] == [result.seed for result in sequential.results]
+    assert (parallel.mean, parallel.half_width, parallel.converged) == \
+           (sequential.mean, sequential.half_width, sequential.converged)
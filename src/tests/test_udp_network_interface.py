@@ -0,0 +1,58 @@
+from network.packet import Packet
+from network.udp_network_interface import UdpNetworkInterface, decode_packet, encode_packet
+from simulation.clock import Clock
+from simulation.simulation_logger import SimulationLogger
+
+
+class RecordingTransport:
+    # Stands in for the socket, keeping the datagrams the interface sends
+    def __init__(self):
+        self.datagrams = []
+
+    def sendto(self, data: bytes):
+        self.datagrams.append(data)
+
+
+def interface(max_timeout: int) -> tuple[UdpNetworkInterface, Clock, RecordingTransport]:
+    clock = Clock()
+    network_interface = UdpNetworkInterface(clock, logger=SimulationLogger(clock), max_timeout=max_timeout)
+    network_interface.transport = RecordingTransport()
+    return network_interface, clock, network_interface.transport
+
+
+def send(network_interface: UdpNetworkInterface, clock: Clock, tick: int, packet: Packet):
+    clock.set_tick(tick)
+    network_interface.transmit(packet)
+    network_interface.flush()
+
+
+def ack(network_interface: UdpNetworkInterface, data: bytes) -> Packet:
+    packet, packet_id = decode_packet(data)
+    packet.ack_flag = True
+    network_interface.datagram_received(encode_packet(packet, packet_id))
+    return network_interface.receive_buffer.popleft()
+
+
+def test_acks_hand_back_the_packet_that_was_sent():
+    network_interface, clock, transport = interface(max_timeout=100)
+    packet = Packet(sent_timestamp=0, sequence_number=7)
+    send(network_interface, clock, 0, packet)
+    assert ack(network_interface, transport.datagrams[0]) is packet
+    assert packet.ack_flag
+    assert not network_interface.unacked and len(network_interface.send_ticks) == 1
+
+
+def test_lost_packets_are_forgotten_after_the_max_timeout():
+    network_interface, clock, transport = interface(max_timeout=100)
+    for tick in range(1000):
+        send(network_interface, clock, tick, Packet(sent_timestamp=tick, sequence_number=tick))
+    # Nothing was ACKed, but only the packets of the last max_timeout + 1 ticks are kept
+    assert len(network_interface.unacked) == 101
+    assert min(network_interface.unacked) == 899
+    assert len(network_interface.send_ticks) == 101
+
+    # A late ACK of a forgotten packet gets a copy of it
+    late = ack(network_interface, transport.datagrams[0])
+    assert late == Packet(sent_timestamp=0, sequence_number=0, ack_flag=True)
+    recent = ack(network_interface, transport.datagrams[-1])
+    assert recent.sequence_number == 999 and 999 not in network_interface.unacked
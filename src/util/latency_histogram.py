@@ -0,0 +1,147 @@
+import math
+from array import array
+from typing import Iterable
+
+"""
+Latency Histograms
+==================
+
+A log-bucketed histogram in the style of HdrHistogram, for recording latencies in ticks (or any other non-negative
+integers) in constant memory and O(1) time per value.
+
+Values below 2 ** sub_bucket_bits each get a bucket of their own. Above that, every power of two range [2^k, 2^(k+1))
+is split into 2 ** (sub_bucket_bits - 1) equal buckets, so a value is known to within a relative error of
+2 ** -(sub_bucket_bits - 1), about 1.6% with the default 7 bits. Values above max_value are counted in the last bucket.
+Percentiles are reported as the largest value of the bucket they fall in, capped at the largest value recorded.
+
+Histograms with the same settings merge by adding their bucket counts, so histograms from runs in parallel processes
+can be combined without keeping the values.
+
+PacketLatencyStats groups the histograms the simulation records when asked to:
+ - ack_latency: ticks from sending a packet to receiving its ACK, recorded by the NetworkInterface on every ACK
+ - queue_time: ticks a packet spent in a Link's queue, recorded by the link (once per hop on multi-hop paths)
+ - retransmissions: how many times each sequence number was retransmitted before its first ACK, recorded by the
+   NetworkInterface
+run_reliability_simulation.py prints them at the end of a run. Batch runs return them in their SimulationResult.
+"""
+
+REPORTED_PERCENTILES = [50.0, 99.0, 99.9]
+
+
+class LatencyHistogram:
+
+    def __init__(self, sub_bucket_bits: int = 7, max_value: int = 1 << 32):
+        assert sub_bucket_bits >= 1
+        assert max_value >= 1 << sub_bucket_bits
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value = max_value
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_sub_bucket_count = self.sub_bucket_count >> 1
+        self.counts = array("q", [0]) * (self.bucket_index(max_value) + 1)
+        # Running totals, so the count, mean and extremes don't need a pass over the buckets
+        self.total = 0
+        self.sum = 0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    def bucket_index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        value = min(value, self.max_value)
+        exponent = value.bit_length() - 1
+        shift = exponent - self.sub_bucket_bits + 1
+        return (self.sub_bucket_count + (exponent - self.sub_bucket_bits) * self.half_sub_bucket_count
+                + (value >> shift) - self.half_sub_bucket_count)
+
+    """
+    The largest value that falls in the bucket with the given index.
+    """
+    def bucket_upper_bound(self, index: int) -> int:
+        if index < self.sub_bucket_count:
+            return index
+        octave, sub_bucket = divmod(index - self.sub_bucket_count, self.half_sub_bucket_count)
+        shift = octave + 1
+        return ((sub_bucket + self.half_sub_bucket_count + 1) << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        assert value >= 0, "Histograms only record non-negative values"
+        self.counts[self.bucket_index(value)] += count
+        self.total += count
+        self.sum += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    """
+    Add the counts of another histogram with the same settings to this one.
+    """
+    def merge(self, other: "LatencyHistogram"):
+        assert (self.sub_bucket_bits, self.max_value) == (other.sub_bucket_bits, other.max_value), \
+            "Only histograms with the same settings can be merged"
+        if not other.total:
+            return
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.total += other.total
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    """
+    The value below which `percentile` percent of the recorded values fall, or None if nothing was recorded.
+    """
+    def value_at_percentile(self, percentile: float) -> int | None:
+        if not self.total:
+            return None
+        # The rank of the value we're after, counting from 1
+        rank = max(1, min(self.total, math.ceil(self.total * percentile / 100)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def summary(self, percentiles: Iterable[float] = REPORTED_PERCENTILES) -> str:
+        if not self.total:
+            return "no samples"
+        values = ", ".join(f"p{percentile:g}={self.value_at_percentile(percentile)}" for percentile in percentiles)
+        return f"count={self.total}, mean={self.mean():.2f}, {values}, max={self.max}"
+
+
+class PacketLatencyStats:
+
+    def __init__(self, sub_bucket_bits: int = 7):
+        self.ack_latency = LatencyHistogram(sub_bucket_bits)
+        self.queue_time = LatencyHistogram(sub_bucket_bits)
+        self.retransmissions = LatencyHistogram(sub_bucket_bits)
+
+    def merge(self, other: "PacketLatencyStats"):
+        self.ack_latency.merge(other.ack_latency)
+        self.queue_time.merge(other.queue_time)
+        self.retransmissions.merge(other.retransmissions)
+
+    """
+    Merge the stats of several runs, e.g. the results of a batch, into new stats.
+    """
+    @staticmethod
+    def merged(all_stats: Iterable["PacketLatencyStats"]) -> "PacketLatencyStats":
+        result = None
+        for stats in all_stats:
+            if result is None:
+                result = PacketLatencyStats(stats.ack_latency.sub_bucket_bits)
+            result.merge(stats)
+        return result if result is not None else PacketLatencyStats()
+
+    def report(self) -> str:
+        return "\n".join([
+            f"Send to ACK latency (ticks): {self.ack_latency.summary()}",
+            f"Link queue time (ticks): {self.queue_time.summary()}",
+            f"Retransmissions per sequence number: {self.retransmissions.summary()}",
+        ])
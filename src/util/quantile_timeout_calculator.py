@@ -0,0 +1,198 @@
+import math
+
+from .timeout_bounds import TimeoutBounds
+
+
+class P2Quantile:
+    """
+    Streaming estimate of a single quantile using the P-Square algorithm (Jain & Chlamtac, 1985).
+    It keeps 5 markers whose heights approximate the min, p/2, p, (1+p)/2 quantiles and the max, so memory is
+    constant and each update is O(1).
+    """
+
+    def __init__(self, p: float):
+        assert 0 < p < 1
+        self.p = p
+        self.count = 0
+        # marker heights
+        self.heights = []
+        # actual marker positions (1-indexed, as in the paper)
+        self.positions = [1, 2, 3, 4, 5]
+        # desired marker positions, and how much they move with each new observation
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        self.count += 1
+        if self.count <= 5:
+            # Until we have 5 observations, just keep them sorted
+            self.heights.append(x)
+            self.heights.sort()
+            return
+
+        q = self.heights
+        n = self.positions
+
+        # Find the cell k such that q[k] <= x < q[k + 1], extending the extremes if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the heights of the middle markers if they are off their desired position
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self.__parabolic(i, step)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = self.__linear(i, step)
+                q[i] = height
+                n[i] += step
+
+    def __parabolic(self, i: int, d: int) -> float:
+        q = self.heights
+        n = self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def __linear(self, i: int, d: int) -> float:
+        q = self.heights
+        n = self.positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    def value(self) -> float | None:
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            # Exact quantile of the few observations we have
+            return self.heights[min(len(self.heights) - 1, int(self.p * len(self.heights)))]
+        if self.count * (1 - self.p) < 1:
+            # With fewer than 1 / (1 - p) observations the sample p-quantile is the max, which the last marker tracks
+            # exactly. The middle marker would still be climbing towards it.
+            return self.heights[4]
+        return self.heights[2]
+
+
+class QuantileTimeoutCalculator:
+    TAIL_SAMPLES = 5
+    """
+    Quantile Timeout Calculator sets the timeout to a high quantile of the recent RTTs, instead of mean + k * stddiv.
+    It has the same interface as TimeoutCalculator, so the two can be used interchangeably.
+
+    The quantile is tracked over a sliding window of roughly `window` samples using two P-Square sketches. Every
+    window / 2 samples the older sketch is thrown away and a new one is started. The timeout uses the larger of the two
+    estimates, so it reacts to a spike as soon as the newer sketch sees it, and forgets the spike within one window.
+    Memory is constant and every update is O(1).
+
+    A sketch needs at least 1 / (1 - quantile) samples before its p-quantile is anything but the max, so each sketch
+    must see at least that many. By default the window is sized so that each one sees about TAIL_SAMPLES samples above
+    the quantile, e.g. 1000 samples for the p99.
+
+    The mean and stddiv estimates are kept over the samples seen by the newer sketch, for reporting only.
+    """
+
+    def __init__(
+            self,
+            quantile: float = 0.99,
+            window: int | None = None,
+            multiplier: float = 1.0,
+            bounds: TimeoutBounds = None,
+            initial_timeout: float = None,
+    ):
+        # Samples a sketch needs before the quantile isn't just the max (rounded, since 1 / (1 - 0.99) isn't exactly 100)
+        min_sketch_samples = math.ceil(round(1 / (1 - quantile), 6))
+        if window is None:
+            window = max(10, 2 * self.TAIL_SAMPLES * min_sketch_samples)
+        assert window >= 10, "The window must be large enough for the sketches to be meaningful"
+        assert window // 2 >= min_sketch_samples, \
+            f"Each sketch sees window / 2 samples, which must be at least 1 / (1 - quantile) = {min_sketch_samples}"
+        self.quantile = quantile
+        self.window = window
+        # The timeout is the estimated quantile scaled by this much, to leave some headroom
+        self.multiplier = multiplier
+
+        # If a bound is "None", no trimming should occur
+        self.bounds = bounds or TimeoutBounds(min=None, max=None)
+
+        self.older = None
+        self.newer = P2Quantile(quantile)
+        self.__reset_moments()
+
+        self.current_mean_estimate = None
+        self.current_stddiv_estimate = None
+        self.current_timeout = initial_timeout or self.bounds.min or 1.0
+
+    def __reset_moments(self):
+        self.sample_count = 0
+        self.sample_sum = 0.0
+        self.sample_sum_of_squares = 0.0
+
+    @staticmethod
+    def __trim(timeout: float, bounds: TimeoutBounds) -> float:
+        # Same trimming as TimeoutCalculator
+        if bounds.min != None and timeout < bounds.min:
+            timeout = bounds.min
+        elif bounds.max != None and timeout > bounds.max:
+            timeout = bounds.max
+        return timeout
+
+    """
+    Return the most up-to-date mean estimate
+    """
+    def mean_estimate(self) -> float:
+        return self.current_mean_estimate
+
+    """
+    Return the most up-to-date standard deviation estimate
+    """
+    def stddiv_estimate(self) -> float:
+        return self.current_stddiv_estimate
+
+    """
+    Return the most up-to-date estimate of the configured RTT quantile
+    """
+    def quantile_estimate(self) -> float | None:
+        estimates = [sketch.value() for sketch in (self.older, self.newer) if sketch is not None and sketch.count]
+        return max(estimates) if estimates else None
+
+    """
+    Return the timeout recommendation based on the most up-to-date RTT data
+    """
+    def timeout(self) -> int:
+        # Rounded up: P-Square approaches a quantile from below, and truncating e.g. 199.99 would ignore every ACK
+        # with an RTT of exactly the quantile
+        return math.ceil(self.current_timeout)
+
+    """
+    Add a new RTT data point and update the quantile, mean and standard deviation estimates.
+    Then, update the timeout recommendation.
+    """
+    def add_data_point(self, packet_rtt):
+        if self.newer.count >= self.window // 2:
+            self.older = self.newer
+            self.newer = P2Quantile(self.quantile)
+            self.__reset_moments()
+        self.newer.add(packet_rtt)
+
+        self.sample_count += 1
+        self.sample_sum += packet_rtt
+        self.sample_sum_of_squares += packet_rtt * packet_rtt
+        self.current_mean_estimate = self.sample_sum / self.sample_count
+        variance = self.sample_sum_of_squares / self.sample_count - self.current_mean_estimate ** 2
+        self.current_stddiv_estimate = max(variance, 0.0) ** 0.5
+
+        self.current_timeout = self.__trim(self.quantile_estimate() * self.multiplier, self.bounds)
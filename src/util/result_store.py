@@ -0,0 +1,187 @@
+import json
+import os
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+"""
+Result Store
+============
+
+A columnar store for the results of parameter sweeps, so they can be analysed and compared across code versions
+without rerunning the sweep or parsing its output.
+
+A store is a directory. Every append() writes one chunk: a sub-directory with one .npy file per column, i.e. per
+sweep parameter (window_size, queue_limit, ...) and per metric (goodput, ...), all with one row per sweep point.
+A small JSON index lists the chunks, their row counts and column types, and the labels they were appended with,
+e.g. the code version that produced them.
+
+Columns are loaded with memory mapping, so only the pages a query actually reads are loaded from disk. (An .npz
+archive can't be memory mapped, which is why every column has its own .npy file.) query() filters chunks by their
+labels using the index alone, then filters rows by parameter values, and only copies the matching rows.
+
+Appending merges the new chunk into the index as it currently is on disk, and replaces the index atomically. Two
+processes appending at exactly the same time can still lose one of their index entries (the chunk itself stays on
+disk), so sweeps that run on many workers should append from the process that collects the results.
+"""
+
+_VERSION = 1
+_INDEX_FILE = "index.json"
+
+
+@dataclass
+class ChunkInfo:
+    # Name of the chunk's directory inside the store
+    name: str
+
+    # Number of rows of every column of the chunk
+    rows: int
+
+    # NumPy dtype string of each column, by column name
+    columns: Dict[str, str]
+
+    # Free-form labels of the chunk, e.g. {"code_version": "1a2b3c4"}
+    labels: Dict[str, str] = field(default_factory=dict)
+
+    # Wall clock time (seconds since the epoch) the chunk was appended
+    created: float = 0.0
+
+
+"""
+The commit the code was checked out at, with a "-dirty" suffix if there are uncommitted changes, or "unknown" outside
+of a git checkout.
+"""
+def code_version() -> str:
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=directory, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=directory,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if status else commit
+
+
+class ResultStore:
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chunks: List[ChunkInfo] = []
+        self.load_index()
+
+    """
+    Read the index. A missing or unreadable index gives an empty store.
+    """
+    def load_index(self):
+        self.chunks = []
+        try:
+            with open(os.path.join(self.path, _INDEX_FILE)) as file:
+                contents = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if contents.get("version") != _VERSION:
+            return
+        self.chunks = [ChunkInfo(**chunk) for chunk in contents.get("chunks", [])]
+
+    """
+    Write the columns, which must all have the same length, as a new chunk and add it to the index. Strings are stored
+    as fixed-width unicode columns, which can be memory mapped like any other. Returns the new chunk's info.
+    """
+    def append(self, columns: Dict[str, Iterable], labels: Dict[str, str] | None = None) -> ChunkInfo:
+        arrays = {name: np.asarray(values) for name, values in columns.items()}
+        assert arrays, "A chunk needs at least one column"
+        rows = {len(array) for array in arrays.values()}
+        assert len(rows) == 1, f"All columns of a chunk must have the same length, got {sorted(rows)}"
+        assert all(array.dtype != object for array in arrays.values()), "Columns must have a fixed-size dtype"
+
+        chunk = ChunkInfo(
+            name=f"chunk-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}",
+            rows=rows.pop(),
+            columns={name: array.dtype.str for name, array in arrays.items()},
+            labels=dict(labels or {}),
+            created=time.time(),
+        )
+        directory = os.path.join(self.path, chunk.name)
+        os.makedirs(directory)
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), array, allow_pickle=False)
+
+        # Merge with whatever other runs appended since we read the index
+        self.load_index()
+        self.chunks.append(chunk)
+        self.__save_index()
+        return chunk
+
+    def __save_index(self):
+        contents = {
+            "version": _VERSION,
+            "chunks": [asdict(chunk) for chunk in self.chunks],
+        }
+        index_path = os.path.join(self.path, _INDEX_FILE)
+        temporary_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(contents, file, indent=2, sort_keys=True)
+        os.replace(temporary_path, index_path)
+
+    """
+    Memory map the columns of a chunk, all of them if columns is None.
+    """
+    def load_chunk(self, chunk: ChunkInfo, columns: Iterable[str] | None = None) -> Dict[str, np.ndarray]:
+        names = list(chunk.columns) if columns is None else list(columns)
+        directory = os.path.join(self.path, chunk.name)
+        return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+                for name in names}
+
+    """
+    Return the chunks whose labels have all of the given values.
+    """
+    def select_chunks(self, labels: Dict[str, str] | None = None) -> List[ChunkInfo]:
+        labels = labels or {}
+        return [chunk for chunk in self.chunks
+                if all(chunk.labels.get(name) == value for name, value in labels.items())]
+
+    """
+    Return the rows that match every filter, as one array per column (all columns if columns is None), in the order
+    they were appended. Only chunks with the given labels, and with all the filtered and requested columns, are read.
+
+    A filter on a column is either a value the column must equal, a list, tuple or set of values it must be one of,
+    or a function mapping the column to a boolean mask, e.g.:
+
+        store.query(["window_size", "goodput"], labels={"code_version": "1a2b3c4"},
+                    queue_limit=50, window_size=lambda window: window >= 100)
+    """
+    def query(self, columns: List[str] | None = None, labels: Dict[str, str] | None = None,
+              **filters) -> Dict[str, np.ndarray]:
+        chunks = self.select_chunks(labels)
+        if columns is None:
+            columns = list(dict.fromkeys(name for chunk in chunks for name in chunk.columns))
+        needed = set(columns) | set(filters)
+
+        matches: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+        for chunk in chunks:
+            if chunk.rows == 0 or not needed <= set(chunk.columns):
+                continue
+            arrays = self.load_chunk(chunk, needed)
+            mask = np.ones(chunk.rows, dtype=bool)
+            for name, condition in filters.items():
+                mask &= _filter_mask(arrays[name], condition)
+            if not mask.any():
+                continue
+            for name in columns:
+                matches[name].append(arrays[name][mask])
+
+        return {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in matches.items()}
+
+
+def _filter_mask(column: np.ndarray, condition) -> np.ndarray:
+    if callable(condition):
+        return np.asarray(condition(column), dtype=bool)
+    if isinstance(condition, (list, tuple, set, frozenset)):
+        return np.isin(column, list(condition))
+    return column == condition
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict
+
+"""
+RTT Profile Cache
+=================
+
+A new TimeoutCalculator knows nothing about the path, so until the first RTT samples come back its timeout is just
+the lower bound (or 1 tick). On paths whose RTT is far from that, the first packets are either retransmitted needlessly
+or wait far too long, which dominates the completion time of short flows.
+
+This cache remembers the converged mean and standard deviation estimates of previous runs, keyed by the parameters of
+the path (rtt_min, loss ratio and queue limit), and persists them in a small JSON file. New runs on the same path seed
+their TimeoutCalculator with them.
+
+Profiles older than max_age seconds are stale: the code or the path model may have changed since, so they are evicted
+instead of being used. When there are more than max_entries profiles, the least recently updated ones are evicted.
+Profiles based on fewer than MIN_SAMPLES RTT samples haven't converged, and aren't stored.
+
+Saving merges the profiles with the ones currently in the file, keeping the most recently updated profile for each
+path, and replaces the file atomically, so runs in parallel processes or threads can share a cache file. If two runs
+save at exactly the same time one of their updates can be lost, which is fine for a cache.
+"""
+
+_VERSION = 1
+
+
+@dataclass
+class RttProfile:
+    # Converged EWMA estimates of the RTT mean and standard deviation
+    mean: float
+    stddiv: float
+
+    # Number of RTT samples the estimates are based on
+    samples: int
+
+    # Wall clock time (seconds since the epoch) the profile was last updated
+    updated: float
+
+
+class RttProfileCache:
+    # A week
+    DEFAULT_MAX_AGE = 7 * 24 * 60 * 60
+    DEFAULT_MAX_ENTRIES = 1024
+    MIN_SAMPLES = 8
+
+    def __init__(self, path: str, max_age: float = DEFAULT_MAX_AGE, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 now: Callable[[], float] = time.time):
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        # Source of the wall clock time, can be replaced to test eviction
+        self.now = now
+        self.profiles: Dict[str, RttProfile] = {}
+        self.load()
+
+    @staticmethod
+    def key(rtt_min: float, loss_ratio: float, queue_limit: int) -> str:
+        # Normalize the types, so that e.g. an rtt_min of 20 and 20.0 share a profile
+        return f"rtt_min={float(rtt_min)!r},loss_ratio={float(loss_ratio)!r},queue_limit={int(queue_limit)}"
+
+    """
+    Read the cache file, dropping stale profiles. A missing or unreadable file gives an empty cache.
+    """
+    def load(self):
+        self.profiles = {}
+        try:
+            with open(self.path) as file:
+                contents = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if contents.get("version") != _VERSION:
+            return
+        for key, profile in contents.get("profiles", {}).items():
+            self.profiles[key] = RttProfile(**profile)
+        self.evict()
+
+    """
+    Drop stale profiles, then the least recently updated ones until there are at most max_entries.
+    """
+    def evict(self):
+        oldest_allowed = self.now() - self.max_age
+        self.profiles = {key: profile for key, profile in self.profiles.items() if profile.updated >= oldest_allowed}
+        if len(self.profiles) > self.max_entries:
+            newest = sorted(self.profiles.items(), key=lambda item: item[1].updated, reverse=True)[:self.max_entries]
+            self.profiles = dict(newest)
+
+    """
+    Return the profile for the path, or None if there is no fresh one.
+    """
+    def lookup(self, rtt_min: float, loss_ratio: float, queue_limit: int) -> RttProfile | None:
+        key = self.key(rtt_min, loss_ratio, queue_limit)
+        profile = self.profiles.get(key)
+        if profile is not None and profile.updated < self.now() - self.max_age:
+            del self.profiles[key]
+            return None
+        return profile
+
+    """
+    Remember the estimates of a run on the path, if they are based on enough samples. Returns whether they were stored.
+    Call save() to persist them.
+    """
+    def store(self, rtt_min: float, loss_ratio: float, queue_limit: int, mean: float | None, stddiv: float | None,
+              samples: int) -> bool:
+        if mean is None or stddiv is None or samples < self.MIN_SAMPLES:
+            return False
+        key = self.key(rtt_min, loss_ratio, queue_limit)
+        self.profiles[key] = RttProfile(mean=mean, stddiv=stddiv, samples=samples, updated=self.now())
+        self.evict()
+        return True
+
+    def save(self):
+        # Merge with whatever other runs saved since we loaded the file
+        ours = self.profiles
+        self.load()
+        for key, profile in ours.items():
+            if key not in self.profiles or self.profiles[key].updated <= profile.updated:
+                self.profiles[key] = profile
+        self.evict()
+
+        contents = {
+            "version": _VERSION,
+            "profiles": {key: asdict(profile) for key, profile in self.profiles.items()},
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(contents, file, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,88 @@
+from network.packet import Packet
+from .timeout_calculator import TimeoutCalculator
+
+"""
+RTT Sampler
+===========
+
+Measures the RTT of packets as their ACKs come back, feeds those measurements to a TimeoutCalculator, and backs the
+timeout off exponentially when packets time out.
+
+Hosts should call:
+ - on_transmit() for every packet they transmit, including retransmissions
+ - on_ack() for every ACK they receive
+ - on_timeout() once each time they detect a timeout and retransmit
+ - timeout() to get the current retransmission timeout
+
+Samples follow Karn's rule: we never take an RTT sample from a sequence number that has been retransmitted, since we
+can't be sure which transmission the ACK belongs to.
+
+There are two sampling modes:
+ - per-rtt: only one packet is timed at a time. A new packet is timed once the previous timed packet has been ACKed
+   (or retransmitted), so the calculator gets at most one sample per RTT. This is what TCP traditionally does.
+ - every-ack: every ACK of a non-retransmitted packet is a sample.
+"""
+
+PER_RTT = "per-rtt"
+EVERY_ACK = "every-ack"
+RTT_SAMPLE_MODES = [PER_RTT, EVERY_ACK]
+
+
+class RttSampler:
+    # Largest factor the timeout can be multiplied by after consecutive timeouts
+    MAX_BACKOFF = 64
+
+    def __init__(self, timeout_calculator: TimeoutCalculator, mode: str = PER_RTT):
+        assert mode in RTT_SAMPLE_MODES, f"Unknown RTT sample mode: {mode}"
+        self.timeout_calculator = timeout_calculator
+        self.mode = mode
+
+        # Multiplier applied to the calculator's timeout, doubled on every consecutive timeout
+        self.backoff = 1
+
+        # per-rtt mode: the packet we are currently timing, if any
+        self.timed_packet: Packet | None = None
+
+        # every-ack mode: sequence numbers that have been retransmitted and not ACKed yet
+        self.retransmitted = set()
+
+        # Number of RTT samples fed to the timeout calculator so far
+        self.samples = 0
+
+    def on_transmit(self, packet: Packet):
+        if packet.retransmission_flag:
+            # Karn's rule: the sequence number is now ambiguous, so don't sample it
+            if self.mode == PER_RTT:
+                if self.timed_packet is not None and self.timed_packet.sequence_number == packet.sequence_number:
+                    self.timed_packet = None
+            else:
+                self.retransmitted.add(packet.sequence_number)
+        elif self.mode == PER_RTT and self.timed_packet is None:
+            self.timed_packet = packet
+
+    def on_ack(self, packet: Packet, now: int):
+        if self.mode == PER_RTT:
+            if packet is not self.timed_packet:
+                return
+            self.timed_packet = None
+        else:
+            if packet.sequence_number in self.retransmitted:
+                self.retransmitted.discard(packet.sequence_number)
+                return
+            if packet.retransmission_flag:
+                return
+
+        self.timeout_calculator.add_data_point(now - packet.sent_timestamp)
+        self.samples += 1
+        # A valid sample means the path is delivering again, so stop backing off
+        self.backoff = 1
+
+    def on_timeout(self):
+        self.backoff = min(self.backoff * 2, self.MAX_BACKOFF)
+
+    def timeout(self) -> int:
+        timeout = self.timeout_calculator.timeout() * self.backoff
+        max_timeout = self.timeout_calculator.bounds.max
+        if max_timeout is not None and timeout > max_timeout:
+            timeout = max_timeout
+        return int(timeout)
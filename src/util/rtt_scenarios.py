@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+
+"""
+RTT Scenarios
+=============
+
+Vectorized versions of the scenarios in run_timeout_simulation.py's NetworkSimulator.
+
+Every generator takes the number of samples to produce and a seed, and yields the RTTs as NumPy arrays of at most
+chunk_size samples. Only one chunk is in memory at a time, so scenarios of 10^8 samples or more can be streamed
+straight into evaluate_timeouts() below.
+
+The spike scenarios repeat their 100 sample pattern for as long as needed. The permanent change happens after the
+first 20 samples, like in NetworkSimulator, and lasts for the rest of the scenario.
+The high variance scenario is the same clipped random walk as NetworkSimulator.high_variance, but generated in bulk.
+"""
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# The pattern of each deterministic scenario, as (number of samples, RTT) segments
+_PATTERNS = {
+    "short-spike": [(10, 100), (2, 200), (88, 100)],
+    "long-spike": [(10, 100), (20, 200), (70, 100)],
+}
+
+
+def _chunk_sizes(length: int, chunk_size: int) -> Iterator[int]:
+    for start in range(0, length, chunk_size):
+        yield min(chunk_size, length - start)
+
+
+def _repeating(pattern: list, length: int, chunk_size: int) -> Iterator[np.ndarray]:
+    period = np.concatenate([np.full(count, rtt, dtype=np.float64) for count, rtt in pattern])
+    offset = 0
+    for size in _chunk_sizes(length, chunk_size):
+        yield period[(offset + np.arange(size)) % len(period)]
+        offset = (offset + size) % len(period)
+
+
+def short_spike(length: int, seed: int | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    return _repeating(_PATTERNS["short-spike"], length, chunk_size)
+
+
+def long_spike(length: int, seed: int | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    return _repeating(_PATTERNS["long-spike"], length, chunk_size)
+
+
+def permanent_change(length: int, seed: int | None = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    # The change is permanent, so rather than repeating, only the first 20 samples are at the old RTT
+    offset = 0
+    for size in _chunk_sizes(length, chunk_size):
+        yield np.where(offset + np.arange(size) < 20, 100.0, 200.0)
+        offset += size
+
+
+"""
+Return the random walk starting at `start` whose steps are `steps`, where every value is clipped to [low, high]
+before the next step is taken. The start value itself is not included.
+
+Clipping makes each value depend on the previous one, so the walk can't be computed with a single cumulative sum.
+But each step is a function x -> clip(x + step, lo, hi), and composing two such functions gives another one:
+applying (s1, lo1, hi1) then (s2, lo2, hi2) is (s1 + s2, clip(lo1 + s2, lo2, hi2), clip(hi1 + s2, lo2, hi2)).
+So we compute the prefix compositions with a parallel (Hillis-Steele) scan, which takes log2(n) vectorized passes,
+and apply each prefix to the start value.
+"""
+def _clipped_walk(steps: np.ndarray, start: float, low: float, high: float) -> np.ndarray:
+    shift = steps.astype(np.float64, copy=True)
+    lo = np.full(len(steps), low, dtype=np.float64)
+    hi = np.full(len(steps), high, dtype=np.float64)
+    distance = 1
+    while distance < len(steps):
+        # Compose the prefix ending `distance` steps earlier (applied first) with the segment ending here
+        earlier_shift, earlier_lo, earlier_hi = shift[:-distance], lo[:-distance], hi[:-distance]
+        later_shift, later_lo, later_hi = shift[distance:], lo[distance:], hi[distance:]
+        new_lo = np.clip(earlier_lo + later_shift, later_lo, later_hi)
+        new_hi = np.clip(earlier_hi + later_shift, later_lo, later_hi)
+        new_shift = earlier_shift + later_shift
+        shift[distance:], lo[distance:], hi[distance:] = new_shift, new_lo, new_hi
+        distance *= 2
+    return np.clip(start + shift, lo, hi)
+
+
+def high_variance(length: int, seed: int | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  scale: float = 25, low: float = 10, high: float = 200) -> Iterator[np.ndarray]:
+    rng = np.random.default_rng(seed)
+    # Like NetworkSimulator.high_variance, the first RTT is 1.0 and every step after that is clipped
+    current = 1.0
+    for size in _chunk_sizes(length, chunk_size):
+        steps = rng.normal(loc=0, scale=scale, size=size)
+        walk = _clipped_walk(steps, current, low, high)
+        # The chunk starts with the current value, and the walk's values follow it
+        chunk = np.empty(size)
+        chunk[0] = current
+        chunk[1:] = walk[:-1]
+        current = walk[-1]
+        yield chunk
+
+
+SCENARIOS = {
+    "short-spike": short_spike,
+    "long-spike": long_spike,
+    "permanent-change": permanent_change,
+    "high-variance": high_variance,
+}
+
+
+@dataclass
+class TimeoutEvaluation:
+    # Number of RTT samples evaluated
+    samples: int = 0
+
+    # Number of ACKs that arrived after the timeout, and would have been ignored
+    ignored_acks: int = 0
+
+    # Total time the timeout was above the RTT, over the ACKs that weren't ignored
+    total_extra_wait_time: float = 0.0
+
+    def mean_extra_wait_time(self) -> float:
+        accepted = self.samples - self.ignored_acks
+        return self.total_extra_wait_time / accepted if accepted else 0.0
+
+
+"""
+Replay RTT chunks through a timeout calculator, the same way run_timeout_simulation.run_simulation does, but only
+keeping running totals instead of one result object per sample.
+Any calculator with the TimeoutCalculator interface works, and its state carries over from one chunk to the next.
+"""
+def evaluate_timeouts(chunks: Iterable[np.ndarray], timeout_calculator) -> TimeoutEvaluation:
+    evaluation = TimeoutEvaluation()
+    current_timeout = None
+    add_data_point = timeout_calculator.add_data_point
+    for chunk in chunks:
+        ignored = 0
+        extra_wait = 0.0
+        # The calculator is inherently sequential, so iterate over plain floats, which is much faster than
+        # indexing into the array
+        for rtt in chunk.tolist():
+            if current_timeout is None:
+                current_timeout = rtt
+            if rtt > current_timeout:
+                ignored += 1
+            else:
+                extra_wait += current_timeout - rtt
+            add_data_point(rtt)
+            current_timeout = timeout_calculator.timeout()
+        evaluation.samples += len(chunk)
+        evaluation.ignored_acks += ignored
+        evaluation.total_extra_wait_time += extra_wait
+    return evaluation
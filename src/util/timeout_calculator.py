@@ -32,6 +32,14 @@ class TimeoutCalculator:
         self.current_mean_estimate = initial_mean_estimate
         self.current_stddiv_estimate = initial_stddiv_estimate
         self.current_timeout = initial_timeout or self.bounds.min or 1.0
+        if initial_timeout is None and initial_mean_estimate is not None and initial_stddiv_estimate is not None:
+            # Warm start, e.g. from an RTT profile of a previous run on the same path
+            self.current_timeout = self.__compute_timeout(
+                mean=initial_mean_estimate,
+                stddiv=initial_stddiv_estimate,
+                k=self.k,
+                bounds=self.bounds,
+            )
 
     """
     Helper Functions